@@ -0,0 +1,117 @@
+"""
+Batch question answering for offline jobs (ticket backlogs, regression runs).
+
+Runs many independent questions through the graph with `abatch_as_completed`:
+1. At most CHAT_BATCH_CONCURRENCY graph runs are in flight at once
+2. Runs are stateless (no checkpointer), so nothing is persisted per question
+3. Their query embeddings are coalesced into shared requests by the
+   embeddings client (see `app.rag.embeddings`)
+4. Answers are yielded as they complete, tagged with the question's index
+"""
+
+import asyncio
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+from langchain_core.messages import HumanMessage
+from langchain_core.runnables import RunnableConfig
+import structlog
+
+from app.agent.context import context_from_messages
+from app.core.config import settings
+
+logger = structlog.get_logger(__name__)
+
+
+def build_inputs(message: str, sources: Optional[List[str]] = None, tenant_id: Optional[str] = None) -> Dict[str, Any]:
+    """Graph input for one question. `sources` is always set so no scope leaks between turns."""
+    return {
+        "messages": [HumanMessage(content=message)],
+        "sources": sources or [],
+        "tenant_id": tenant_id,
+    }
+
+
+def extract_answer(result: Dict[str, Any]) -> Tuple[str, List[str], List[Dict[str, Any]]]:
+    """
+    Pull the final answer and the retrieved context out of a graph result.
+
+    Returns:
+        (response text, one "source: snippet" string per retrieved chunk,
+        the chunks' structured references: id, source, score, snippet)
+    """
+    response = result["messages"][-1].content
+    context, references = context_from_messages(result["messages"])
+    return response, context, references
+
+
+async def answer_batch(
+    graph,
+    questions: Sequence[Dict[str, Any]],
+    concurrency: int = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Answer independent questions concurrently, yielding results as they complete.
+
+    Args:
+        graph: Compiled graph (see `create_graph`); a checkpointer is not needed
+        questions: Dicts with `message` and optional `id`, `sources`, `tenant_id`
+        concurrency: Max graph runs in flight (defaults to CHAT_BATCH_CONCURRENCY)
+
+    Yields:
+        Dicts with `index`, `id`, `response`, `context`, `references`, `elapsed` (seconds since
+        the batch started) and `error` (None on success). A failing question
+        does not stop the batch.
+    """
+    concurrency = concurrency or settings.CHAT_BATCH_CONCURRENCY
+    inputs = [build_inputs(q["message"], q.get("sources"), q.get("tenant_id")) for q in questions]
+    config = RunnableConfig(max_concurrency=concurrency)
+
+    logger.info("Starting batch", questions=len(inputs), concurrency=concurrency)
+    start = time.perf_counter()
+    failed = 0
+
+    async for index, result in graph.abatch_as_completed(inputs, config=config, return_exceptions=True):
+        item = {
+            "index": index,
+            "id": questions[index].get("id"),
+            "response": None,
+            "context": [],
+            "references": [],
+            "elapsed": round(time.perf_counter() - start, 2),
+            "error": None,
+        }
+        if isinstance(result, Exception):
+            failed += 1
+            item["error"] = str(result)
+            logger.warning("Batch question failed", index=index, error=str(result))
+        else:
+            item["response"], item["context"], item["references"] = extract_answer(result)
+        yield item
+
+    logger.info("Batch complete", questions=len(inputs), failed=failed, seconds=round(time.perf_counter() - start, 2))
+
+
+def answer_questions(
+    questions: Sequence[Dict[str, Any]],
+    graph=None,
+    concurrency: int = None,
+) -> List[Dict[str, Any]]:
+    """
+    Synchronous wrapper around `answer_batch` for scripts.
+
+    Args:
+        questions: See `answer_batch`
+        graph: Compiled graph (defaults to a new stateless graph)
+        concurrency: Max graph runs in flight
+
+    Returns:
+        Results in input order
+    """
+    if graph is None:
+        from app.agent.graph import create_graph
+        graph = create_graph()
+
+    async def collect():
+        return [item async for item in answer_batch(graph, questions, concurrency)]
+
+    return sorted(asyncio.run(collect()), key=lambda item: item["index"])
@@ -0,0 +1,145 @@
+"""
+Retrieval payloads exchanged between the search tools and the model.
+
+The search tools return `(content, artifact)` (LangChain `content_and_artifact`):
+1. The artifact is the structured result: per chunk its id, similarity score,
+   source file and a snippet truncated to RETRIEVAL_SNIPPET_CHARS
+2. The content, which is what the checkpoint keeps and earlier turns show the
+   model, is a one-line list of references (source and chunk id)
+3. For the tool messages of the current turn, `prepare_messages` swaps the
+   content for the snippets, rendered best-first; each message gets a fixed
+   share of RETRIEVAL_CONTEXT_TOKENS (one per allowed tool round), so a later
+   tool round never changes how earlier results render
+
+So a thread's history carries references instead of full chunk text, and a
+turn's prompt only holds the context budget's worth of retrieved text.
+"""
+
+from typing import Any, Dict, List, Sequence, Tuple
+from langchain_core.documents import Document
+from langchain_core.messages import BaseMessage, HumanMessage, ToolMessage
+
+from app.core.config import settings
+
+# Rough token estimate for budgeting (Llama-family tokenizers on English text)
+CHARS_PER_TOKEN = 4
+
+NO_RESULTS = "No relevant information found in the knowledge base."
+
+
+def _snippet(text: str, max_chars: int) -> str:
+    text = " ".join(text.split())
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rsplit(" ", 1)[0] + " ..."
+
+
+def build_artifact(results: Sequence[Tuple[Document, float]], query: Any) -> Dict[str, Any]:
+    """
+    Structured retrieval result.
+
+    Args:
+        results: (Document, cosine distance) pairs, best first
+        query: The query (or list of sub-queries) searched
+
+    Returns:
+        {"query", "chunks": [{"id", "source", "score", "snippet"}]}, where
+        `score` is the cosine similarity
+    """
+    return {
+        "query": query,
+        "chunks": [
+            {
+                "id": doc.id,
+                "source": doc.metadata.get("source_file", "unknown"),
+                "score": round(1.0 - distance, 4),
+                "snippet": _snippet(doc.page_content, settings.RETRIEVAL_SNIPPET_CHARS),
+            }
+            for doc, distance in results
+        ],
+    }
+
+
+def render_references(artifact: Dict[str, Any]) -> str:
+    """Compact content stored in the thread: one reference per chunk."""
+    chunks = artifact["chunks"]
+    if not chunks:
+        return NO_RESULTS
+    refs = "; ".join(f"[{i}] {c['source']} ({c['id']})" for i, c in enumerate(chunks, 1))
+    return f"Retrieved {len(chunks)} chunks: {refs}"
+
+
+def render_for_model(artifact: Dict[str, Any], token_budget: int) -> str:
+    """
+    Render a retrieval result for the model, best chunks first, within a token budget.
+
+    The output only depends on the artifact, so re-rendering the same result
+    is byte-identical (keeps the prompt prefix cacheable).
+    """
+    chunks = artifact["chunks"]
+    if not chunks:
+        return NO_RESULTS
+    remaining = token_budget * CHARS_PER_TOKEN
+    blocks: List[str] = []
+    for i, chunk in enumerate(chunks, 1):
+        block = f"[{i}] Source: {chunk['source']}\nContent: {chunk['snippet']}"
+        if len(block) > remaining:
+            if not blocks:  # Always show (the start of) the best chunk
+                blocks.append(block[:remaining])
+            break
+        blocks.append(block)
+        remaining -= len(block)
+    return "\n\n".join(blocks)
+
+
+def prepare_messages(messages: Sequence[BaseMessage]) -> List[BaseMessage]:
+    """
+    Messages as sent to the model: current-turn retrieval results rendered in full.
+
+    Tool messages after the last user message carry a retrieval artifact; each
+    is rendered within RETRIEVAL_CONTEXT_TOKENS / AGENT_MAX_TOOL_ITERATIONS.
+    The budget does not depend on how many results follow, so a message renders
+    the same on every model call of the turn and the prompt prefix up to it
+    stays cacheable. Earlier turns keep their stored references.
+    """
+    last_human = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=-1)
+    current = [
+        i for i, m in enumerate(messages)
+        if i > last_human and isinstance(m, ToolMessage) and isinstance(m.artifact, dict) and "chunks" in m.artifact
+    ]
+    if not current:
+        return list(messages)
+
+    budget = settings.RETRIEVAL_CONTEXT_TOKENS // max(settings.AGENT_MAX_TOOL_ITERATIONS, 1)
+    prepared = list(messages)
+    for i in current:
+        prepared[i] = messages[i].model_copy(update={"content": render_for_model(messages[i].artifact, budget)})
+    return prepared
+
+
+def context_from_messages(messages: Sequence[BaseMessage]) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """
+    Retrieved context of a graph result, for API responses.
+
+    Returns:
+        (one "source: snippet" string per chunk, the chunk dicts)
+    """
+    chunks = [
+        chunk
+        for m in messages
+        if isinstance(m, ToolMessage) and isinstance(m.artifact, dict)
+        for chunk in m.artifact.get("chunks", [])
+    ]
+    return [f"{c['source']}: {c['snippet']}" for c in chunks], chunks
+
+
+def fallback_answer(messages: Sequence[BaseMessage]) -> str:
+    """
+    Answer without the model (the deadline passed): the current turn's best excerpts.
+    """
+    last_human = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=-1)
+    _, chunks = context_from_messages(messages[last_human + 1:])
+    if not chunks:
+        return "I could not answer within the time available. Please try again or narrow the question."
+    excerpts = "\n".join(f"- {c['source']}: {c['snippet']}" for c in chunks[:3])
+    return f"I could not complete the answer within the time available. The most relevant excerpts found:\n{excerpts}"
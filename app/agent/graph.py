@@ -1,7 +1,10 @@
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, START, END
-from langgraph.prebuilt import ToolNode
 from app.agent.state import AgentState
-from app.agent.nodes import call_model, should_continue, tools
+from app.agent.nodes import (
+    aanswer, acall_model, afinalize, after_tools, answer, call_model, finalize, should_continue, tools,
+)
+from app.agent.tool_node import create_tool_node
 
 def create_graph(checkpointer=None):
     """
@@ -9,28 +12,50 @@ def create_graph(checkpointer=None):
     
     Args:
         checkpointer: An initialized checkpointer instance (e.g., PostgresSaver).
+    
+    Runs can carry a deadline (`config["configurable"]["deadline"]`, a
+    `time.monotonic()` value): when it is near, or after AGENT_MAX_TOOL_ITERATIONS
+    tool rounds, the agent answers from the context it has ('finalize').
+    
+    With ROUTER_MODEL and ANSWER_MODEL set to different models, 'agent' only
+    routes (tool calls, intent) and 'answer' writes the reply with the larger model.
     """
     workflow = StateGraph(AgentState)
 
     # Nodes
-    workflow.add_node("agent", call_model)
-    workflow.add_node("tools", ToolNode(tools)) # Prebuilt ToolNode handles tool execution
+    # Sync and async variants: async runs (the API) can cancel in-flight model calls
+    workflow.add_node("agent", RunnableLambda(call_model, afunc=acall_model))
+    workflow.add_node("answer", RunnableLambda(answer, afunc=aanswer))
+    workflow.add_node("finalize", RunnableLambda(finalize, afunc=afinalize))
+    workflow.add_node("tools", create_tool_node(tools)) # Prebuilt ToolNode, concurrent and cached (tool_node.py)
 
     # Edges (Flow)
     workflow.add_edge(START, "agent")
     
-    # Conditional Edge: Agent -> (Tools OR End)
+    # Conditional Edge: Agent -> (Tools OR Answer OR Finalize OR End)
     workflow.add_conditional_edges(
         "agent",
         should_continue,
         {
             "tools": "tools",
+            "answer": "answer",
+            "finalize": "finalize",
             "__end__": END
         }
     )
     
     # If tool was used, loop back to agent to generate final response
-    workflow.add_edge("tools", "agent")
+    # (or answer right away when the time budget is nearly used up)
+    workflow.add_conditional_edges(
+        "tools",
+        after_tools,
+        {
+            "agent": "agent",
+            "finalize": "finalize"
+        }
+    )
+    workflow.add_edge("answer", END)
+    workflow.add_edge("finalize", END)
 
     # Compile the graph
     return workflow.compile(checkpointer=checkpointer)
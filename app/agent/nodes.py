@@ -1,10 +1,17 @@
+import asyncio
 import os
-from langchain_ollama import ChatOllama
-from langchain_core.messages import SystemMessage, ToolMessage
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, SystemMessage, ToolMessage
 from langchain_core.runnables import RunnableConfig
+from app.agent.context import fallback_answer, prepare_messages
+from app.agent.speculative import discard_prefetch, start_prefetch
 from app.agent.state import AgentState
-from app.agent.tools import search_knowledge_base
+from app.agent.tools import search_knowledge_base, search_knowledge_base_multi
 from app.core.config import settings
+from app.core.latency import timed
 import structlog
 
 logger = structlog.get_logger(__name__)
@@ -12,55 +19,385 @@ logger = structlog.get_logger(__name__)
 # Initialize model with tools
 # We use the model defined in config, ensuring it supports tool calling
 # Llama 3.1 supports tool calling natively
-tools = [search_knowledge_base]
+tools = [search_knowledge_base, search_knowledge_base_multi]
 
-# Initialize the model with the configuration
-# bind_tools tells the model which tools are available
-model = ChatOllama(
-    model=settings.LLM_MODEL, 
-    base_url=settings.OLLAMA_BASE_URL,
-    temperature=0
-).bind_tools(tools)
+# Static system prompt: it is the start of every prompt, so it must not carry
+# per-request data (dates, user names, retrieved context). Together with the
+# append-only message history this keeps the prompt prefix identical across
+# turns, and Ollama can reuse its KV cache instead of re-processing it.
+SYSTEM_PROMPT = """You are an Expert Consultant Agent.
 
-def call_model(state: AgentState, config: RunnableConfig):
+Your goal is to help the user with technical questions, log analysis, and documentation.
+
+CRITICAL INSTRUCTIONS:
+1. Whenever the user asks a technical question or about a specific process/error, YOU MUST USE the 'search_knowledge_base' tool.
+2. If the question has several parts (comparisons, multiple errors or systems), use 'search_knowledge_base_multi' with one query per part instead.
+3. Do not invent information. If the tool returns no results, state that you don't know based on the available knowledge.
+4. Be concise and professional.
+"""
+
+# Appended (not stored) when the agent must answer without more tool calls
+FINALIZE_INSTRUCTION = (
+    "Answer my question now using only the information above, without calling any tools. "
+    "If that information is incomplete, say so briefly."
+)
+
+# Classification prompt of the router tier (sets `intent` in the state)
+INTENT_PROMPT = (
+    "Classify the user's message. Reply with exactly one word: "
+    "consultation (processes, manuals, documentation), "
+    "log_analysis (logs, errors, stack traces) or other."
+)
+INTENTS = ("consultation", "log_analysis", "other")
+
+# Models are built on first use (or by the startup warm-up), not at import time;
+# one per chat backend and tier
+_models = {}
+
+def tier_model(tier: str) -> str:
     """
-    Main node that calls the LLM.
+    Ollama model of a tier.
+    
+    'router' (decides on tool calls, classifies intent) uses ROUTER_MODEL,
+    'answer' (writes the reply) uses ANSWER_MODEL; both default to LLM_MODEL.
     """
-    messages = state["messages"]
+    if tier == "answer":
+        return settings.ANSWER_MODEL or settings.LLM_MODEL
+    return settings.ROUTER_MODEL or settings.LLM_MODEL
+
+def tiered() -> bool:
+    """True when routing and answering use different models."""
+    return tier_model("router") != tier_model("answer")
+
+def chat_backend(route_key: str | None = None) -> str:
+    """
+    Pick the Ollama backend for a conversation.
     
-    # System Prompt to define the persona and tool usage
-    # We only add the system message if it's not already there (or as the first message)
-    # This logic checks if the first message is a SystemMessage, if not prepends one.
+    The same route key (thread id) always maps to the same backend, whose
+    KV cache already holds the thread's earlier turns.
+    """
+    backends = settings.chat_backends()
+    if route_key is None or len(backends) == 1:
+        return backends[0]
+    return backends[zlib.crc32(route_key.encode("utf-8")) % len(backends)]
+
+def get_backend_model(base_url: str, tier: str = "router"):
+    """
+    Get the chat model of one Ollama backend and tier.
     
-    system_prompt = """You are an Expert Consultant Agent.
+    bind_tools tells the router which tools are available. `keep_alive` keeps
+    the model loaded in Ollama between requests, and the fixed `num_ctx`
+    avoids reloads (which drop the prompt cache) between calls.
     
-    Your goal is to help the user with technical questions, log analysis, and documentation.
+    Without separate tiers, 'answer' is the router model itself (same
+    object, same prompt prefix). With them, the router's output is capped at
+    ROUTER_MAX_TOKENS (a tool call fits; its prose drafts are discarded) and
+    the answer model has no tools bound.
     
-    CRITICAL INSTRUCTIONS:
-    1. Whenever the user asks a technical question or about a specific process/error, YOU MUST USE the 'search_knowledge_base' tool.
-    2. Do not invent information. If the tool returns no results, state that you don't know based on the available knowledge.
-    3. Be concise and professional.
+    Args:
+        base_url: Ollama backend
+        tier: 'router', 'answer' or 'intent' (router model, one-word output)
     """
+    if tier == "answer" and not tiered():
+        tier = "router"
+    key = (base_url, tier)
+    if key not in _models:
+        from langchain_ollama import ChatOllama
+        num_predict = None
+        if tier == "intent":
+            num_predict = 4
+        elif tier == "router" and tiered():
+            num_predict = settings.ROUTER_MAX_TOKENS
+        model = ChatOllama(
+            model=tier_model(tier), 
+            base_url=base_url,
+            temperature=0,
+            num_ctx=settings.OLLAMA_NUM_CTX,
+            num_predict=num_predict,
+            keep_alive=settings.OLLAMA_KEEP_ALIVE,
+        )
+        _models[key] = model.bind_tools(tools) if tier == "router" else model
+    return _models[key]
+
+def get_model(route_key: str | None = None, tier: str = "router"):
+    """
+    Get the chat model for a conversation.
     
+    Args:
+        route_key: Conversation key used to pin the thread to a backend
+        tier: 'router', 'answer' or 'intent'
+    """
+    return get_backend_model(chat_backend(route_key), tier)
+
+def streams_reply(node: str) -> bool:
+    """Whether a node's model output is the reply itself (streamed by /chat/stream)."""
+    return node in ("answer", "finalize") or (node == "agent" and not tiered())
+
+def _route_key(state: AgentState, config: RunnableConfig) -> str | None:
+    """Thread id, or the first user message for runs without a thread."""
+    thread_id = (config or {}).get("configurable", {}).get("thread_id")
+    if thread_id is not None:
+        return str(thread_id)
+    first = next((m for m in state["messages"] if isinstance(m, HumanMessage)), None)
+    return first.content if first is not None and isinstance(first.content, str) else None
+
+def time_left(config: RunnableConfig) -> float | None:
+    """
+    Seconds until the request's deadline (`configurable.deadline`, a
+    `time.monotonic()` value), or None when the run has no deadline.
+    """
+    deadline = (config or {}).get("configurable", {}).get("deadline")
+    return None if deadline is None else deadline - time.monotonic()
+
+def _tool_iterations(messages) -> int:
+    """Model turns that requested tools since the last user message."""
+    count = 0
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage):
+            break
+        if isinstance(message, AIMessage) and message.tool_calls:
+            count += 1
+    return count
+
+def _model_messages(state: AgentState) -> list:
+    messages = state["messages"]
+    
+    # The system prompt is prepended on every call (it is not stored in the
+    # thread), unless the caller already provided one
     if not messages or not isinstance(messages[0], SystemMessage):
-        sys_msg = SystemMessage(content=system_prompt)
-        messages = [sys_msg] + messages
+        messages = [SystemMessage(content=SYSTEM_PROMPT)] + messages
+    
+    # Retrieval results of this turn are rendered within the context budget;
+    # earlier turns only carry chunk references
+    return prepare_messages(messages)
+
+def _maybe_prefetch(state: AgentState) -> None:
+    """Speculative mode: search for the user's message while the model decides (first call of a turn)."""
+    if settings.SPECULATIVE_RETRIEVAL and _tool_iterations(state["messages"]) == 0:
+        start_prefetch(state)
+
+def _settle_prefetch(state: AgentState, response) -> None:
+    if settings.SPECULATIVE_RETRIEVAL and not response.tool_calls:
+        discard_prefetch(state["messages"])
+
+def _fallback(state: AgentState) -> AIMessage:
+    return AIMessage(content=fallback_answer(state["messages"]))
+
+def _expired(config: RunnableConfig) -> bool:
+    remaining = time_left(config)
+    if remaining is not None and remaining <= 0:
+        logger.warning("Deadline passed before the model call")
+        return True
+    return False
+
+async def _ainvoke(model, messages: list, config: RunnableConfig):
+    """
+    Call a model within the request's deadline.
+    
+    Returns:
+        The response, or None when the deadline cut the call off
+    """
+    try:
+        return await asyncio.wait_for(model.ainvoke(messages), timeout=time_left(config))
+    except asyncio.TimeoutError:
+        logger.warning("Model call hit the deadline")
+        return None
+
+def _needs_intent(state: AgentState) -> bool:
+    """The router tier classifies each new user message (only with separate tiers)."""
+    return tiered() and isinstance(state["messages"][-1], HumanMessage)
+
+def _intent_messages(state: AgentState) -> list:
+    return [SystemMessage(content=INTENT_PROMPT), state["messages"][-1]]
+
+def _parse_intent(response) -> str:
+    word = str(getattr(response, "content", "")).strip().lower()
+    return next((intent for intent in INTENTS if intent in word), "other")
+
+def _router_update(state: AgentState, response, intent: str | None) -> dict:
+    """
+    State update of the router step.
+    
+    With separate tiers, a router response without tool calls is dropped:
+    the answer tier writes the reply ('answer' node).
+    """
+    _settle_prefetch(state, response)
+    update = {} if intent is None else {"intent": intent}
+    if tiered() and not response.tool_calls:
+        return update
+    update["messages"] = [response]
+    return update
+
+_intent_executor: ThreadPoolExecutor | None = None
+_intent_executor_lock = threading.Lock()
+
+def _classify_in_background(route_key: str | None, state: AgentState):
+    """Start intent classification on a worker thread (sync path); returns its future."""
+    global _intent_executor
+    with _intent_executor_lock:
+        if _intent_executor is None:
+            _intent_executor = ThreadPoolExecutor(max_workers=settings.TOOL_CONCURRENCY, thread_name_prefix="intent")
+    return _intent_executor.submit(get_model(route_key, "intent").invoke, _intent_messages(state))
+
+def call_model(state: AgentState, config: RunnableConfig):
+    """
+    Main node that calls the LLM (router tier): decides on tool calls.
     
-    logger.info("Calling model", model=settings.LLM_MODEL)
-    response = model.invoke(messages)
-    return {"messages": [response]}
+    With a single tier its reply without tool calls is the final answer.
+    Intent classification runs on a worker thread, concurrently with the
+    routing call.
+    """
+    with timed("node:agent"):
+        if _expired(config):
+            return {"messages": [_fallback(state)]}
+        
+        route_key = _route_key(state, config)
+        _maybe_prefetch(state)
+        intent_future = _classify_in_background(route_key, state) if _needs_intent(state) else None
+        logger.info("Calling model", model=tier_model("router"), tier="router")
+        try:
+            response = get_model(route_key).invoke(_model_messages(state))
+        except BaseException:
+            if intent_future is not None:
+                intent_future.cancel()
+            raise
+        intent = None
+        if intent_future is not None:
+            try:
+                intent = _parse_intent(intent_future.result())
+            except Exception:
+                intent = "other"
+        return _router_update(state, response, intent)
 
-def should_continue(state: AgentState):
+async def acall_model(state: AgentState, config: RunnableConfig):
+    """
+    Async variant of `call_model` (used by the API).
+    
+    The model call is cut off at the request's deadline, and cancelling the
+    run (client disconnect) closes the request to Ollama, which stops
+    generating. Intent classification runs concurrently with the routing call.
+    """
+    with timed("node:agent"):
+        if _expired(config):
+            return {"messages": [_fallback(state)]}
+        
+        route_key = _route_key(state, config)
+        _maybe_prefetch(state)
+        logger.info("Calling model", model=tier_model("router"), tier="router")
+        calls = [_ainvoke(get_model(route_key), _model_messages(state), config)]
+        if _needs_intent(state):
+            calls.append(_ainvoke(get_model(route_key, "intent"), _intent_messages(state), config))
+        results = await asyncio.gather(*calls, return_exceptions=True)
+        
+        response = results[0]
+        if isinstance(response, BaseException):
+            raise response
+        if response is None:
+            return {"messages": [_fallback(state)]}
+        intent = None
+        if len(results) > 1:
+            intent = "other" if isinstance(results[1], BaseException) else _parse_intent(results[1])
+        return _router_update(state, response, intent)
+
+def answer(state: AgentState, config: RunnableConfig):
+    """
+    Write the reply with the answer tier (separate tiers only), from the
+    conversation and the context retrieved in this turn.
+    """
+    with timed("node:answer"):
+        if _expired(config):
+            return {"messages": [_fallback(state)]}
+        logger.info("Calling model", model=tier_model("answer"), tier="answer")
+        response = get_model(_route_key(state, config), "answer").invoke(_model_messages(state))
+        return {"messages": [response]}
+
+async def aanswer(state: AgentState, config: RunnableConfig):
+    """Async variant of `answer`, cut off at the deadline."""
+    with timed("node:answer"):
+        if _expired(config):
+            return {"messages": [_fallback(state)]}
+        logger.info("Calling model", model=tier_model("answer"), tier="answer")
+        response = await _ainvoke(get_model(_route_key(state, config), "answer"), _model_messages(state), config)
+        return {"messages": [response if response is not None else _fallback(state)]}
+
+def _finalize_prompt(state: AgentState) -> tuple[list, list]:
+    """
+    Messages for the final answer, and state updates dropping a pending tool
+    request (so the thread never keeps a tool call without its result).
+    """
+    messages = state["messages"]
+    updates = []
+    if isinstance(messages[-1], AIMessage) and messages[-1].tool_calls:
+        updates.append(RemoveMessage(id=messages[-1].id))
+        messages = messages[:-1]
+    prompt = _model_messages({**state, "messages": messages}) + [HumanMessage(content=FINALIZE_INSTRUCTION)]
+    return prompt, updates
+
+def _final_answer(response, messages) -> AIMessage:
+    # Without separate tiers the tools stay bound (same prompt prefix as the
+    # other calls); a model that still asks for a tool gets the extractive fallback
+    if response is None or response.tool_calls or not response.content:
+        return AIMessage(content=fallback_answer(messages))
+    return AIMessage(content=response.content)
+
+def finalize(state: AgentState, config: RunnableConfig):
+    """
+    Answer from the context gathered so far, without further tool calls.
+    
+    Reached when the tool iterations or the time budget are used up.
+    """
+    with timed("node:finalize"):
+        prompt, updates = _finalize_prompt(state)
+        if _expired(config):
+            return {"messages": updates + [_fallback(state)]}
+        response = get_model(_route_key(state, config), "answer").invoke(prompt)
+        return {"messages": updates + [_final_answer(response, state["messages"])]}
+
+async def afinalize(state: AgentState, config: RunnableConfig):
+    """Async variant of `finalize`, cut off at the deadline."""
+    with timed("node:finalize"):
+        prompt, updates = _finalize_prompt(state)
+        if _expired(config):
+            return {"messages": updates + [_fallback(state)]}
+        response = await _ainvoke(get_model(_route_key(state, config), "answer"), prompt, config)
+        return {"messages": updates + [_final_answer(response, state["messages"])]}
+
+def _out_of_time(config: RunnableConfig) -> bool:
+    remaining = time_left(config)
+    return remaining is not None and remaining < settings.AGENT_ANSWER_RESERVE_SECONDS
+
+def should_continue(state: AgentState, config: RunnableConfig):
     """
     Decides whether the agent should stop (respond) or search more data (tool call).
+    
+    Tool calls are only run while the turn is within AGENT_MAX_TOOL_ITERATIONS
+    and the deadline leaves AGENT_ANSWER_RESERVE_SECONDS for the answer;
+    otherwise the agent answers with what it has ('finalize').
     """
     last_message = state["messages"][-1]
     
     # If the LLM requested a tool call, proceed to 'tools' node
-    if last_message.tool_calls:
+    if getattr(last_message, "tool_calls", None):
+        if _tool_iterations(state["messages"]) > settings.AGENT_MAX_TOOL_ITERATIONS:
+            logger.warning("Tool iteration limit reached", limit=settings.AGENT_MAX_TOOL_ITERATIONS)
+            return "finalize"
+        if _out_of_time(config):
+            logger.warning("Time budget exhausted, answering from gathered context")
+            return "finalize"
         logger.info("Model requested tool execution", tools=len(last_message.tool_calls))
         return "tools"
     
+    # The router dropped its draft: the answer tier replies
+    if not isinstance(last_message, AIMessage):
+        return "answer"
+    
     # Otherwise, end execution
     logger.info("Model finished generation")
     return "__end__"
+
+def after_tools(state: AgentState, config: RunnableConfig):
+    """Go back to the model, or straight to the final answer when time is short."""
+    if _out_of_time(config):
+        logger.warning("Time budget exhausted, answering from gathered context")
+        return "finalize"
+    return "agent"
@@ -0,0 +1,132 @@
+"""
+Speculative retrieval (opt-in, SPECULATIVE_RETRIEVAL).
+
+For most technical questions the model's first step is a `search_knowledge_base`
+call with a query close to the user's message. In speculative mode:
+1. The first model call of a turn also starts that search on the raw user
+   message, in a background thread
+2. When the model's search call arrives and its query overlaps the message
+   enough (SPECULATIVE_MIN_OVERLAP of its content words), the tools node
+   answers it from the prefetched result instead of searching again
+3. Otherwise the call runs normally; if the model answers without searching,
+   the prefetch is discarded
+
+`speculative_stats()` reports how many prefetches were used, so it is easy
+to see whether the extra searches pay off.
+"""
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Optional, Sequence
+import structlog
+from langchain_core.messages import BaseMessage, HumanMessage
+
+from app.agent.tools import search_knowledge_base
+from app.core.config import settings
+from app.rag.multi_query import keyword_variant
+
+logger = structlog.get_logger(__name__)
+
+# Tool whose calls can be served by a prefetch
+SPECULATIVE_TOOL = "search_knowledge_base"
+
+# Pending prefetches kept at once (oldest are dropped as unused)
+MAX_PENDING = 256
+
+_executor: Optional[ThreadPoolExecutor] = None
+# Id of the user message -> (message text, scope, future of the tool's (content, artifact))
+_pending: "OrderedDict[str, tuple]" = OrderedDict()
+_lock = threading.Lock()
+_stats = {"started": 0, "hits": 0, "misses": 0, "unused": 0}
+
+
+def _last_human(messages: Sequence[BaseMessage]) -> Optional[HumanMessage]:
+    return next((m for m in reversed(messages) if isinstance(m, HumanMessage)), None)
+
+
+def query_overlap(query: str, message: str) -> float:
+    """Share of the query's content words that also appear in the message."""
+    query_words = set(keyword_variant(query).split())
+    if not query_words:
+        return 0.0
+    return len(query_words & set(keyword_variant(message).split())) / len(query_words)
+
+
+def start_prefetch(state: Dict[str, Any]) -> None:
+    """
+    Start the search for the turn's user message (first model call of a turn).
+
+    Args:
+        state: Graph state; its last message is the user's
+    """
+    global _executor
+    message = state["messages"][-1]
+    if not isinstance(message, HumanMessage) or not isinstance(message.content, str) or message.id is None:
+        return
+
+    with _lock:
+        if message.id in _pending:
+            return
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.TOOL_CONCURRENCY, thread_name_prefix="speculative")
+        scope = (state.get("tenant_id"), tuple(sorted(state.get("sources") or [])))
+        future = _executor.submit(
+            search_knowledge_base.func,
+            query=message.content,
+            sources=state.get("sources"),
+            tenant_id=state.get("tenant_id"),
+        )
+        _pending[message.id] = (message.content, scope, future)
+        _stats["started"] += 1
+        while len(_pending) > MAX_PENDING:
+            _pending.popitem(last=False)
+            _stats["unused"] += 1
+    logger.debug("Speculative retrieval started", message_id=message.id)
+
+
+def discard_prefetch(messages: Sequence[BaseMessage]) -> None:
+    """Drop the turn's prefetch (the model answered without searching)."""
+    human = _last_human(messages)
+    with _lock:
+        if human is not None and _pending.pop(human.id, None) is not None:
+            _stats["unused"] += 1
+
+
+def match_prefetch(tool_call: Dict[str, Any], state: Dict[str, Any]) -> Optional[Future]:
+    """
+    Find a prefetched result that can answer a tool call.
+
+    The turn's prefetch is consumed by its first search call, whether it matches or not.
+
+    Returns:
+        Future of the tool's (content, artifact), or None
+    """
+    if tool_call["name"] != SPECULATIVE_TOOL:
+        return None
+    human = _last_human(state.get("messages") or [])
+    if human is None:
+        return None
+    with _lock:
+        entry = _pending.pop(human.id, None)
+        if entry is None:
+            return None
+        message, scope, future = entry
+        same_scope = scope == (state.get("tenant_id"), tuple(sorted(state.get("sources") or [])))
+        overlap = query_overlap(str(tool_call["args"].get("query", "")), message)
+        if same_scope and overlap >= settings.SPECULATIVE_MIN_OVERLAP:
+            _stats["hits"] += 1
+            return future
+        _stats["misses"] += 1
+    logger.info("Speculative retrieval missed", overlap=round(overlap, 2))
+    return None
+
+
+def speculative_stats() -> Dict[str, Any]:
+    """Prefetch counters: started, hits, misses (query differed), unused, hit_rate."""
+    return {
+        **_stats,
+        "enabled": settings.SPECULATIVE_RETRIEVAL,
+        "pending": len(_pending),
+        "hit_rate": round(_stats["hits"] / _stats["started"], 3) if _stats["started"] else None,
+    }
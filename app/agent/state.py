@@ -8,7 +8,12 @@ class AgentState(TypedDict):
     
     Attributes:
         messages: A list of messages (Human, AI, System) representing the conversation history.
-        intent: The classified intent of the user (e.g., 'consultation', 'log_analysis').
+        intent: The classified intent of the user ('consultation', 'log_analysis' or 'other'),
+            set by the router tier when ROUTER_MODEL and ANSWER_MODEL differ.
+        sources: Optional list of file names that retrieval is scoped to (empty = all files).
+        tenant_id: Tenant/namespace whose collection retrieval searches (None = default).
     """
     messages: Annotated[list[BaseMessage], add_messages]
     intent: str | None
+    sources: list[str] | None
+    tenant_id: str | None
@@ -0,0 +1,212 @@
+"""
+Tools stage of the agent graph.
+
+Wraps the prebuilt `ToolNode` so that:
+1. The tool calls of one model turn run concurrently, at most TOOL_CONCURRENCY
+   at a time per process (per event loop for async runs), protecting the
+   retrieval DB pool and Ollama
+2. Results of deterministic tools (`CACHEABLE_TOOLS`) are cached, keyed by
+   tool name, normalized arguments, retrieval scope (tenant, sources) and the
+   knowledge base version, so any ingestion change invalidates them:
+   - 'thread': reused within the same conversation (thread_id) only
+   - 'global': also shared by every conversation and API worker (shared cache tier)
+3. In speculative mode, a search matching the turn's prefetch is answered
+   from it (see `app.agent.speculative`)
+"""
+
+import asyncio
+import json
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Dict, Optional
+import structlog
+from langchain_core.messages import ToolMessage
+from langgraph.prebuilt import ToolNode
+
+from app.agent.speculative import match_prefetch
+from app.agent.tools import CACHEABLE_TOOLS
+from app.core.cache import get_cache
+from app.core.config import settings
+from app.core.latency import timed
+from app.rag.store import knowledge_base_version
+
+logger = structlog.get_logger(__name__)
+
+_sync_slots = threading.BoundedSemaphore(settings.TOOL_CONCURRENCY)
+# One semaphore per event loop: an asyncio.Semaphore is bound to the loop that
+# first waits on it (tests, `asyncio.run` in scripts and worker threads each run their own)
+_async_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+_async_slots_lock = threading.Lock()
+
+# Per-conversation results: (thread_id, key) -> {"content", "artifact"} (LRU, bounded)
+_thread_results: "OrderedDict[tuple, Any]" = OrderedDict()
+_thread_results_lock = threading.Lock()
+_stats = {"thread_hits": 0, "global_hits": 0, "misses": 0}
+
+
+def _normalize(value: Any) -> Any:
+    """Whitespace-insensitive strings; dict key order does not matter (sort_keys)."""
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    return value
+
+
+def cache_key(tool_name: str, args: Dict[str, Any], state: Dict[str, Any]) -> str:
+    """
+    Key of a tool call's result.
+
+    Injected state (tenant, sources) is not part of the model's arguments but
+    changes the result, so it is part of the key, as is the tenant's
+    knowledge base version.
+    """
+    tenant_id = state.get("tenant_id")
+    return json.dumps(
+        {
+            "tool": tool_name,
+            "args": _normalize(args),
+            "tenant_id": tenant_id,
+            "sources": sorted(state.get("sources") or []),
+            "kb_version": knowledge_base_version(tenant_id),
+        },
+        sort_keys=True,
+    )
+
+
+def _thread_id(request) -> Optional[str]:
+    return (request.runtime.config or {}).get("configurable", {}).get("thread_id")
+
+
+def _lookup(request) -> Optional[tuple]:
+    """
+    Find a cached result for a tool call.
+
+    Returns:
+        (key, entry): entry ({"content", "artifact"}) is None on a miss;
+        None for uncacheable calls
+    """
+    name = request.tool_call["name"]
+    if settings.TOOL_CACHE == "off" or name not in CACHEABLE_TOOLS:
+        return None
+    key = cache_key(name, request.tool_call["args"], request.state or {})
+    thread_id = _thread_id(request)
+
+    if thread_id is not None:
+        with _thread_results_lock:
+            entry = _thread_results.get((thread_id, key))
+            if entry is not None:
+                _thread_results.move_to_end((thread_id, key))
+                _stats["thread_hits"] += 1
+                return key, entry
+    if settings.TOOL_CACHE == "global":
+        entry = get_cache().get("tool_results", key)
+        if isinstance(entry, dict):  # Entries written before artifacts were plain strings
+            _stats["global_hits"] += 1
+            return key, entry
+    _stats["misses"] += 1
+    return key, None
+
+
+def _store(request, key: str, result) -> None:
+    """Cache a successful tool result in the configured tiers."""
+    if not isinstance(result, ToolMessage) or result.status == "error":
+        return
+    # Tools report handled failures as text rather than raising
+    if isinstance(result.content, str) and result.content.startswith("Error "):
+        return
+    entry = {"content": result.content, "artifact": result.artifact}
+    thread_id = _thread_id(request)
+    if thread_id is not None:
+        with _thread_results_lock:
+            _thread_results[(thread_id, key)] = entry
+            _thread_results.move_to_end((thread_id, key))
+            while len(_thread_results) > settings.TOOL_CACHE_THREAD_MAX_ENTRIES:
+                _thread_results.popitem(last=False)
+    if settings.TOOL_CACHE == "global":
+        get_cache().set("tool_results", key, entry, ttl=settings.TOOL_CACHE_TTL_SECONDS)
+
+
+def _cached_message(request, entry) -> ToolMessage:
+    call = request.tool_call
+    return ToolMessage(
+        content=entry["content"], artifact=entry["artifact"], name=call["name"], tool_call_id=call["id"]
+    )
+
+
+def _prefetched(request) -> Optional[Future]:
+    if not settings.SPECULATIVE_RETRIEVAL:
+        return None
+    return match_prefetch(request.tool_call, request.state or {})
+
+
+def _wrap_tool_call(request, execute):
+    prefetched = _prefetched(request)
+    if prefetched is not None:
+        content, artifact = prefetched.result()
+        return _cached_message(request, {"content": content, "artifact": artifact})
+    cached = _lookup(request)
+    if cached is not None and cached[1] is not None:
+        return _cached_message(request, cached[1])
+    with _sync_slots, timed(f"tool:{request.tool_call['name']}"):
+        result = execute(request)
+    if cached is not None:
+        _store(request, cached[0], result)
+    return result
+
+
+def _loop_slots() -> asyncio.Semaphore:
+    """The running event loop's TOOL_CONCURRENCY semaphore."""
+    loop = asyncio.get_running_loop()
+    with _async_slots_lock:
+        slots = _async_slots.get(loop)
+        if slots is None:
+            slots = _async_slots[loop] = asyncio.Semaphore(settings.TOOL_CONCURRENCY)
+    return slots
+
+
+async def _awrap_tool_call(request, execute):
+
+    prefetched = _prefetched(request)
+    if prefetched is not None:
+        content, artifact = await asyncio.wrap_future(prefetched)
+        return _cached_message(request, {"content": content, "artifact": artifact})
+    # The shared cache tier may do blocking I/O (SQLite, Postgres)
+    cached = await asyncio.to_thread(_lookup, request)
+    if cached is not None and cached[1] is not None:
+        return _cached_message(request, cached[1])
+    async with _loop_slots():
+        with timed(f"tool:{request.tool_call['name']}"):
+            result = await execute(request)
+    if cached is not None:
+        await asyncio.to_thread(_store, request, cached[0], result)
+    return result
+
+
+def create_tool_node(tools) -> ToolNode:
+    """
+    Build the graph's tools node.
+
+    Args:
+        tools: Tools the model can call
+
+    Returns:
+        ToolNode with concurrency limiting and result caching
+    """
+    return ToolNode(tools, wrap_tool_call=_wrap_tool_call, awrap_tool_call=_awrap_tool_call)
+
+
+def tool_cache_stats() -> Dict[str, Any]:
+    """Hit counters of the tool-result cache."""
+    total = sum(_stats.values())
+    hits = _stats["thread_hits"] + _stats["global_hits"]
+    return {
+        **_stats,
+        "mode": settings.TOOL_CACHE,
+        "thread_entries": len(_thread_results),
+        "hit_rate": round(hits / total, 3) if total else None,
+    }
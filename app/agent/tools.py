@@ -1,36 +1,103 @@
+from typing import Annotated, Any
 from langchain_core.tools import tool
-from app.rag.store import get_vector_store
+from langgraph.prebuilt import InjectedState
+from app.agent.context import build_artifact, render_references
+from app.rag.store import get_vector_store, search_documents
+from app.rag.dedup import dedupe_documents
+from app.rag.multi_query import multi_query_search
+from app.core.config import settings
+from app.core.singleflight import SingleFlight
 import structlog
 
 logger = structlog.get_logger(__name__)
 
-@tool
-def search_knowledge_base(query: str) -> str:
+# Identical concurrent searches (same tenant, query and scope) run once
+_search_flight = SingleFlight("search")
+
+# Tools whose result only depends on their arguments, the retrieval scope and
+# the knowledge base contents (results are cached by the tools node)
+CACHEABLE_TOOLS = frozenset({"search_knowledge_base", "search_knowledge_base_multi"})
+
+def _dedupe_scored(results, k: int):
+    """Query-time dedup of (Document, distance) pairs, keeping their scores."""
+    distances = {id(doc): distance for doc, distance in results}
+    return [(doc, distances[id(doc)]) for doc in dedupe_documents([doc for doc, _ in results], k=k)]
+
+def _tool_result(results, query: Any) -> tuple[str, dict]:
+    """
+    (content, artifact) of a search: the structured result is the artifact;
+    the content kept in the thread only references the chunks (see app/agent/context.py).
+    """
+    artifact = build_artifact(results, query)
+    return render_references(artifact), artifact
+
+@tool(response_format="content_and_artifact")
+def search_knowledge_base(
+    query: str,
+    sources: Annotated[list[str] | None, InjectedState("sources")] = None,
+    tenant_id: Annotated[str | None, InjectedState("tenant_id")] = None,
+) -> tuple[str, dict]:
     """
-    Use this tool to search for technical information, logs, or documentation 
+    Use this tool to search for technical information, logs, or documentation
     in the knowledge base (vector store).
     Useful when the question is about specific processes, errors, or manuals.
     """
     try:
-        logger.info("Searching knowledge base", query=query)
-        vector_store = get_vector_store()
-        
-        # Search for the 3 most relevant chunks
-        results = vector_store.similarity_search(query, k=3)
-        
+        logger.info("Searching knowledge base", query=query, sources=sources or "all", tenant=tenant_id)
+        vector_store = get_vector_store(tenant_id)
+
+        # The search is scoped to the sources selected in the request (if any).
+        # `sources` and `tenant_id` are injected from graph state and hidden from the LLM.
+        # Search for the 3 most relevant distinct chunks. Over-fetch so that
+        # near-duplicates (e.g. versioned copies) don't crowd out other results.
+        k = 3
+        fetch_k = k * settings.DEDUP_FETCH_FACTOR if settings.DEDUP_ENABLED else k
+        key = (tenant_id, query, tuple(sorted(sources or [])), fetch_k)
+        results = _search_flight.do(
+            key, lambda: search_documents(vector_store, query, k=fetch_k, sources=sources)
+        )
+        if settings.DEDUP_ENABLED:
+            results = _dedupe_scored(results, k=k)
+
         if not results:
             logger.info("No results found", query=query)
-            return "No relevant information found in the knowledge base."
-            
-        # Format the output for the Agent to read
-        context = "\n\n".join([
-            f"Source: {doc.metadata.get('source_file', 'unknown')}\nContent: {doc.page_content}" 
-            for doc in results
-        ])
-        
-        logger.info("Search successful", results=len(results))
-        return context
-        
+        else:
+            logger.info("Search successful", results=len(results))
+        return _tool_result(results, query)
+
+    except Exception as e:
+        logger.error("Search failed", error=str(e))
+        return f"Error searching knowledge base: {str(e)}", None
+
+@tool(response_format="content_and_artifact")
+def search_knowledge_base_multi(
+    queries: list[str],
+    sources: Annotated[list[str] | None, InjectedState("sources")] = None,
+    tenant_id: Annotated[str | None, InjectedState("tenant_id")] = None,
+) -> tuple[str, dict]:
+    """
+    Use this tool instead of search_knowledge_base when the question has several
+    parts (e.g. comparisons, or questions about multiple errors, systems or steps).
+    Pass one short search query per part; all of them are searched at once.
+    """
+    try:
+        logger.info("Searching knowledge base (multi-query)", queries=queries, sources=sources or "all", tenant=tenant_id)
+        vector_store = get_vector_store(tenant_id)
+
+        # Same over-fetch as the single-query tool, per sub-query; the fused
+        # list is capped at MULTI_QUERY_MAX_RESULTS
+        k = 3
+        fetch_k = k * settings.DEDUP_FETCH_FACTOR if settings.DEDUP_ENABLED else k
+        results = multi_query_search(vector_store, queries, k=fetch_k, sources=sources)
+        if settings.DEDUP_ENABLED:
+            results = _dedupe_scored(results, k=min(k * len(queries), settings.MULTI_QUERY_MAX_RESULTS))
+
+        if not results:
+            logger.info("No results found", queries=queries)
+        else:
+            logger.info("Search successful", results=len(results))
+        return _tool_result(results, queries)
+
     except Exception as e:
         logger.error("Search failed", error=str(e))
-        return f"Error searching knowledge base: {str(e)}"
+        return f"Error searching knowledge base: {str(e)}", None
@@ -1,22 +1,10 @@
-import os
-from langchain_ollama import ChatOllama
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
-
-def get_model():
+def get_model(tier: str = "answer"):
     """
-    Initializes and returns the ChatOllama model with the specified configuration.
-    
-    The model name is flexible and can be adjusted based on available local models.
-    Defaulting to 'llama3.1:8b' as a robust local option, or 'llama4.1:8b' if specified by user.
+    Returns the ChatOllama model of a tier, as configured in settings.
+
+    'router' (ROUTER_MODEL) decides on tool calls and classifies intent,
+    'answer' (ANSWER_MODEL) writes the replies; both default to LLM_MODEL.
+    See `app.agent.nodes.get_model`.
     """
-    # Using the model name specified by the user or a standard default
-    # Note: 'llama4.1:8b' was requested, ensuring we try to use it.
-    model_name = os.getenv("OLLAMA_MODEL", "llama4.1:8b") 
-    
-    return ChatOllama(
-        model=model_name,
-        temperature=0,  # Deterministic output
-    )
+    from app.agent.nodes import get_model as get_tier_model
+    return get_tier_model(tier=tier)
@@ -0,0 +1,265 @@
+"""
+Shared cache tier.
+
+Module-level caches are per process, so their hit rate drops as API
+workers are added. This tier is shared by all workers (CACHE_BACKEND):
+1. 'memory': per-process dict (single worker, tests)
+2. 'local': SQLite database on a tmpfs path (CACHE_PATH, /dev/shm by default),
+   shared by every worker process on the host
+3. 'postgres': UNLOGGED table in the application database, shared across hosts
+
+Values must be JSON-serializable. Entries expire after their TTL; keys are
+namespaced and hashed, so arbitrary strings (e.g. query texts) can be keys.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+import structlog
+
+from app.core.config import settings
+
+logger = structlog.get_logger(__name__)
+
+# Expired rows are purged every this many writes
+PURGE_EVERY = 500
+MEMORY_CACHE_MAX_ENTRIES = 10_000
+
+
+def _hash_key(key: str) -> str:
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+class _Cache:
+    """Hit/miss accounting and key hashing shared by the backends."""
+
+    backend = "base"
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """
+        Look up a value.
+
+        Returns:
+            The cached value, or None on a miss or when the entry expired
+        """
+        try:
+            value = self._get(namespace, _hash_key(key), time.time())
+        except Exception as e:
+            logger.warning("Cache read failed", backend=self.backend, error=str(e))
+            value = None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Store a value.
+
+        Args:
+            namespace: Logical cache (e.g. 'embed_query')
+            key: Entry key
+            value: JSON-serializable value
+            ttl: Seconds until expiry (defaults to CACHE_TTL_SECONDS)
+        """
+        expires_at = time.time() + (settings.CACHE_TTL_SECONDS if ttl is None else ttl)
+        try:
+            self._set(namespace, _hash_key(key), json.dumps(value), expires_at)
+            self._writes += 1
+            if self._writes % PURGE_EVERY == 0:
+                self._purge(time.time())
+        except Exception as e:
+            logger.warning("Cache write failed", backend=self.backend, error=str(e))
+
+    def clear(self, namespace: str) -> None:
+        """Drop every entry of a namespace (e.g. after the knowledge base changed)."""
+        try:
+            self._clear(namespace)
+        except Exception as e:
+            logger.warning("Cache clear failed", backend=self.backend, namespace=namespace, error=str(e))
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "backend": self.backend,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else None,
+        }
+
+
+class MemoryCache(_Cache):
+    """Per-process LRU cache."""
+
+    backend = "memory"
+
+    def __init__(self, max_entries: int = MEMORY_CACHE_MAX_ENTRIES):
+        super().__init__()
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, namespace, key, now):
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None or entry[1] < now:
+                return None
+            self._entries.move_to_end((namespace, key))
+            return json.loads(entry[0])
+
+    def _set(self, namespace, key, payload, expires_at):
+        with self._lock:
+            self._entries[(namespace, key)] = (payload, expires_at)
+            self._entries.move_to_end((namespace, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _clear(self, namespace):
+        with self._lock:
+            for k in [k for k in self._entries if k[0] == namespace]:
+                del self._entries[k]
+
+    def _purge(self, now):
+        with self._lock:
+            for k in [k for k, (_, expires_at) in self._entries.items() if expires_at < now]:
+                del self._entries[k]
+
+
+class LocalSharedCache(_Cache):
+    """SQLite on tmpfs, shared by the worker processes of one host."""
+
+    backend = "local"
+
+    def __init__(self, path: str = None):
+        super().__init__()
+        self.path = path or settings.CACHE_PATH or str(
+            Path("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()) / "agent_empty_cache.sqlite"
+        )
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, expires_at REAL NOT NULL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+        return conn
+
+    def _get(self, namespace, key, now):
+        row = self._connect().execute(
+            "SELECT value FROM cache WHERE namespace = ? AND key = ? AND expires_at >= ?",
+            (namespace, key, now),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _set(self, namespace, key, payload, expires_at):
+        self._connect().execute(
+            "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            (namespace, key, payload, expires_at),
+        )
+
+    def _clear(self, namespace):
+        self._connect().execute("DELETE FROM cache WHERE namespace = ?", (namespace,))
+
+    def _purge(self, now):
+        self._connect().execute("DELETE FROM cache WHERE expires_at < ?", (now,))
+
+
+class PostgresCache(_Cache):
+    """UNLOGGED Postgres table, shared by every worker and host."""
+
+    backend = "postgres"
+
+    def __init__(self):
+        super().__init__()
+        from sqlalchemy import text
+        from app.rag.store import get_engine
+
+        self._text = text
+        self.engine = get_engine()
+        with self.engine.begin() as conn:
+            conn.execute(text(
+                "CREATE UNLOGGED TABLE IF NOT EXISTS shared_cache ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value JSONB NOT NULL, "
+                "expires_at DOUBLE PRECISION NOT NULL, PRIMARY KEY (namespace, key))"
+            ))
+
+    def _get(self, namespace, key, now):
+        with self.engine.connect() as conn:
+            value = conn.execute(
+                self._text(
+                    "SELECT value FROM shared_cache "
+                    "WHERE namespace = :namespace AND key = :key AND expires_at >= :now"
+                ),
+                {"namespace": namespace, "key": key, "now": now},
+            ).scalar_one_or_none()
+        return value
+
+    def _set(self, namespace, key, payload, expires_at):
+        with self.engine.begin() as conn:
+            conn.execute(
+                self._text(
+                    "INSERT INTO shared_cache (namespace, key, value, expires_at) "
+                    "VALUES (:namespace, :key, CAST(:value AS JSONB), :expires_at) "
+                    "ON CONFLICT (namespace, key) DO UPDATE "
+                    "SET value = EXCLUDED.value, expires_at = EXCLUDED.expires_at"
+                ),
+                {"namespace": namespace, "key": key, "value": payload, "expires_at": expires_at},
+            )
+
+    def _clear(self, namespace):
+        with self.engine.begin() as conn:
+            conn.execute(self._text("DELETE FROM shared_cache WHERE namespace = :namespace"), {"namespace": namespace})
+
+    def _purge(self, now):
+        with self.engine.begin() as conn:
+            conn.execute(self._text("DELETE FROM shared_cache WHERE expires_at < :now"), {"now": now})
+
+
+_cache: Optional[_Cache] = None
+_cache_lock = threading.Lock()
+
+CACHE_BACKENDS = {
+    "memory": MemoryCache,
+    "local": LocalSharedCache,
+    "postgres": PostgresCache,
+}
+
+
+def get_cache() -> _Cache:
+    """
+    Get the cache for CACHE_BACKEND (created on first use).
+
+    Falls back to the per-process memory cache if the shared backend
+    cannot be initialized.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = CACHE_BACKENDS[settings.CACHE_BACKEND]()
+            except Exception as e:
+                logger.warning("Shared cache unavailable, using memory", backend=settings.CACHE_BACKEND, error=str(e))
+                _cache = MemoryCache()
+            logger.info("Cache initialized", backend=_cache.backend)
+    return _cache
@@ -1,21 +1,115 @@
 import json
 import logging
+import threading
+import time
 from contextlib import asynccontextmanager
+from typing import Dict, Optional
+from psycopg.rows import dict_row
 from psycopg_pool import AsyncConnectionPool
+from sqlalchemy.pool import QueuePool
 from app.core.config import settings
+from app.core.latency import LatencyStats, percentile
 
-# Global Connection Pool
+# Connection pools per purpose, so a burst of one kind of work can't starve the others:
+# - "checkpointer": LangGraph checkpoint reads/writes
+# - "logging": logs_analysis and ingestion job bookkeeping (also `pool`, below)
+# - "retrieval": SQLAlchemy engine of the vector store (see app/rag/store.py)
+pools: Dict[str, AsyncConnectionPool] = {}
+
+# Global Connection Pool (the "logging" pool)
 pool: AsyncConnectionPool = None
 
 logger = logging.getLogger("uvicorn.error")
 
+# Acquisition wait samples kept per pool for percentiles
+WAIT_SAMPLES = 2048
+
+
+class WaitStats(LatencyStats):
+    """Rolling window of connection acquisition wait times for one pool."""
+
+    def __init__(self):
+        super().__init__(max_samples=WAIT_SAMPLES)
+        self.timeouts = 0
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def summary(self) -> Dict[str, float]:
+        samples = self.sorted_ms()
+        return {
+            "acquisitions": self.count,
+            "timeouts": self.timeouts,
+            "wait_ms_p50": round(percentile(samples, 0.50), 2),
+            "wait_ms_p95": round(percentile(samples, 0.95), 2),
+            "wait_ms_p99": round(percentile(samples, 0.99), 2),
+            "wait_ms_max": round(percentile(samples, 1.0), 2),
+        }
+
+
+wait_stats: Dict[str, WaitStats] = {
+    "checkpointer": WaitStats(),
+    "logging": WaitStats(),
+    "retrieval": WaitStats(),
+}
+
+
+class TimedAsyncConnectionPool(AsyncConnectionPool):
+    """AsyncConnectionPool recording how long each `getconn` waited."""
+
+    def __init__(self, *args, purpose: str, **kwargs):
+        self.purpose = purpose
+        super().__init__(*args, **kwargs)
+
+    async def getconn(self, timeout: Optional[float] = None):
+        start = time.perf_counter()
+        try:
+            conn = await super().getconn(timeout)
+        except Exception:
+            wait_stats[self.purpose].record_timeout()
+            raise
+        wait_stats[self.purpose].record(time.perf_counter() - start)
+        return conn
+
+
+class TimedQueuePool(QueuePool):
+    """SQLAlchemy QueuePool recording checkout waits as the "retrieval" pool."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except Exception:
+            wait_stats["retrieval"].record_timeout()
+            raise
+        wait_stats["retrieval"].record(time.perf_counter() - start)
+        return conn
+
+
 async def init_db():
-    """Initializes the database connection pool and creates tables."""
+    """Initializes the per-purpose connection pools (warm minimum connections) and creates tables."""
     global pool
     try:
-        pool = AsyncConnectionPool(conninfo=settings.DATABASE_URL, min_size=0, max_size=10, kwargs={"autocommit": True})
-        await pool.open()
-        logger.info("Database connection pool established.")
+        # Sizes come from this worker's share of DB_CONNECTION_BUDGET
+        budget = settings.worker_connection_budget()
+        for purpose in ("checkpointer", "logging"):
+            max_size = budget[purpose]
+            pools[purpose] = TimedAsyncConnectionPool(
+                conninfo=settings.DATABASE_URL,
+                min_size=min(settings.DB_POOL_MIN_SIZE, max_size),
+                max_size=max_size,
+                timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+                max_idle=settings.DB_POOL_MAX_IDLE_SECONDS,
+                kwargs={"autocommit": True},
+                open=False,
+                purpose=purpose,
+                name=purpose,
+            )
+            # wait=True: the minimum connections are established before serving
+            await pools[purpose].open(wait=True)
+        pool = pools["logging"]
+        logger.info(f"Database connection pools established: {budget}")
         
         # Create structured logging table if not exists
         await create_tables()
@@ -25,11 +119,14 @@ async def init_db():
         raise e
 
 async def close_db():
-    """Closes the database connection pool."""
+    """Closes the database connection pools."""
     global pool
-    if pool:
-        await pool.close()
-        logger.info("Database connection pool closed.")
+    for p in pools.values():
+        await p.close()
+    if pools:
+        logger.info("Database connection pools closed.")
+    pools.clear()
+    pool = None
 
 async def create_tables():
     """Creates necessary tables for the application."""
@@ -45,6 +142,35 @@ async def create_tables():
                 );
             """)
             logger.info("Table 'logs_analysis' checked/created.")
+            
+            await cur.execute("""
+                CREATE TABLE IF NOT EXISTS ingestion_jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    directory TEXT,
+                    tenant_id TEXT,
+                    incremental BOOLEAN DEFAULT FALSE,
+                    stage TEXT,
+                    progress JSONB DEFAULT '{}'::jsonb,
+                    error TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    started_at TIMESTAMP,
+                    finished_at TIMESTAMP
+                );
+            """)
+            # Queue columns: the API worker running a job, its liveness, and cancellation
+            # requests (set by whichever worker served DELETE /ingest/{id})
+            await cur.execute("""
+                ALTER TABLE ingestion_jobs
+                    ADD COLUMN IF NOT EXISTS owner TEXT,
+                    ADD COLUMN IF NOT EXISTS heartbeat_at TIMESTAMP,
+                    ADD COLUMN IF NOT EXISTS cancel_requested BOOLEAN DEFAULT FALSE;
+            """)
+            await cur.execute(
+                "CREATE INDEX IF NOT EXISTS ix_ingestion_jobs_queued "
+                "ON ingestion_jobs (created_at) WHERE status = 'queued'"
+            )
+            logger.info("Table 'ingestion_jobs' checked/created.")
 
 async def log_analysis(thread_id: str, query: str, result: dict | str):
     """
@@ -71,6 +197,167 @@ async def log_analysis(thread_id: str, query: str, result: dict | str):
     except Exception as e:
         logger.error(f"Failed to log analysis: {e}")
 
-def get_pool():
-    """Returns the global connection pool."""
-    return pool
+INGESTION_JOB_COLUMNS = {"status", "stage", "progress", "error", "started_at", "finished_at"}
+
+async def create_ingestion_job(job_id: str, directory: str, tenant_id: str | None, incremental: bool):
+    """Inserts a new ingestion job in 'queued' state."""
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                "INSERT INTO ingestion_jobs (id, status, directory, tenant_id, incremental) "
+                "VALUES (%s, 'queued', %s, %s, %s)",
+                (job_id, directory, tenant_id, incremental)
+            )
+
+async def update_ingestion_job(job_id: str, **fields):
+    """
+    Updates columns of an ingestion job.
+    Only columns in INGESTION_JOB_COLUMNS may be set; `progress` is serialized to JSON.
+    """
+    unknown = set(fields) - INGESTION_JOB_COLUMNS
+    if unknown:
+        raise ValueError(f"Unknown ingestion job columns: {unknown}")
+    if "progress" in fields:
+        fields["progress"] = json.dumps(fields["progress"])
+
+    assignments = ", ".join(f"{column} = %s" for column in fields)
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                f"UPDATE ingestion_jobs SET {assignments} WHERE id = %s",
+                (*fields.values(), job_id)
+            )
+
+async def get_ingestion_job(job_id: str) -> dict | None:
+    """Returns an ingestion job as a dict, or None if it does not exist."""
+    async with pool.connection() as conn:
+        async with conn.cursor(row_factory=dict_row) as cur:
+            await cur.execute("SELECT * FROM ingestion_jobs WHERE id = %s", (job_id,))
+            return await cur.fetchone()
+
+async def list_ingestion_jobs(limit: int = 20) -> list[dict]:
+    """Returns the most recent ingestion jobs, newest first."""
+    async with pool.connection() as conn:
+        async with conn.cursor(row_factory=dict_row) as cur:
+            await cur.execute(
+                "SELECT * FROM ingestion_jobs ORDER BY created_at DESC LIMIT %s", (limit,)
+            )
+            return await cur.fetchall()
+
+async def claim_ingestion_job(owner: str, max_running: int, stale_seconds: float) -> dict | None:
+    """
+    Takes the oldest queued job for `owner`, unless `max_running` jobs already run.
+
+    Claims are serialized by a transaction-scoped advisory lock, so the limit holds
+    across all API workers; `FOR UPDATE SKIP LOCKED` keeps a job from being taken twice.
+    Jobs whose owner stopped heartbeating for `stale_seconds` do not count as running.
+    Returns the claimed job (now 'running'), or None.
+    """
+    async with pool.connection() as conn:
+        async with conn.transaction():
+            async with conn.cursor(row_factory=dict_row) as cur:
+                await cur.execute("SELECT pg_advisory_xact_lock(hashtext('ingestion_jobs_claim'))")
+                await cur.execute(
+                    "SELECT count(*) AS running FROM ingestion_jobs WHERE status = 'running' "
+                    "AND heartbeat_at > CURRENT_TIMESTAMP - make_interval(secs => %s)",
+                    (stale_seconds,)
+                )
+                if (await cur.fetchone())["running"] >= max_running:
+                    return None
+                await cur.execute(
+                    "UPDATE ingestion_jobs SET status = 'running', stage = 'starting', owner = %s, "
+                    "heartbeat_at = CURRENT_TIMESTAMP, started_at = CURRENT_TIMESTAMP "
+                    "WHERE id = (SELECT id FROM ingestion_jobs WHERE status = 'queued' "
+                    "ORDER BY created_at LIMIT 1 FOR UPDATE SKIP LOCKED) RETURNING *",
+                    (owner,)
+                )
+                return await cur.fetchone()
+
+async def heartbeat_ingestion_jobs(owner: str) -> list[str]:
+    """
+    Refreshes the heartbeat of the jobs `owner` is running.
+    Returns the ids of those jobs with a pending cancellation request.
+    """
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                "UPDATE ingestion_jobs SET heartbeat_at = CURRENT_TIMESTAMP "
+                "WHERE owner = %s AND status = 'running' RETURNING id, cancel_requested",
+                (owner,)
+            )
+            return [job_id for job_id, cancel_requested in await cur.fetchall() if cancel_requested]
+
+async def request_ingestion_job_cancel(job_id: str) -> bool:
+    """
+    Flags a queued or running job for cancellation; a queued job is cancelled at once.
+    The worker running the job sees the flag on its next heartbeat.
+    Returns False if the job is not queued or running.
+    """
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                "UPDATE ingestion_jobs SET cancel_requested = TRUE, "
+                "status = CASE WHEN status = 'queued' THEN 'cancelled' ELSE status END, "
+                "finished_at = CASE WHEN status = 'queued' THEN CURRENT_TIMESTAMP ELSE finished_at END "
+                "WHERE id = %s AND status IN ('queued', 'running') RETURNING id",
+                (job_id,)
+            )
+            return await cur.fetchone() is not None
+
+async def count_queued_ingestion_jobs() -> int:
+    """Returns the number of jobs waiting for a worker (all API workers)."""
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute("SELECT count(*) FROM ingestion_jobs WHERE status = 'queued'")
+            return (await cur.fetchone())[0]
+
+async def fail_interrupted_ingestion_jobs(stale_seconds: float):
+    """
+    Marks running jobs whose owner stopped heartbeating for `stale_seconds` as failed
+    (the API worker running them died). Queued jobs stay queued for any worker to take.
+    """
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                "UPDATE ingestion_jobs SET status = 'failed', error = 'Interrupted: worker stopped responding', "
+                "finished_at = CURRENT_TIMESTAMP WHERE status = 'running' "
+                "AND (heartbeat_at IS NULL OR heartbeat_at < CURRENT_TIMESTAMP - make_interval(secs => %s))",
+                (stale_seconds,)
+            )
+
+def get_pool(purpose: str = "logging"):
+    """Returns the connection pool for a purpose ("checkpointer" or "logging")."""
+    return pools.get(purpose)
+
+
+def pool_metrics() -> Dict[str, Dict[str, float]]:
+    """
+    Per-pool size, usage and acquisition wait percentiles of this worker.
+    
+    Returns:
+        {purpose: {size, max, in_use, waiting, acquisitions, timeouts, wait_ms_p50, ...}}
+    """
+    metrics = {}
+    for purpose, p in pools.items():
+        stats = p.get_stats()
+        metrics[purpose] = {
+            "size": stats.get("pool_size", 0),
+            "max": stats.get("pool_max", 0),
+            "in_use": stats.get("pool_size", 0) - stats.get("pool_available", 0),
+            "waiting": stats.get("requests_waiting", 0),
+        }
+    
+    from app.rag import store
+    engine = store._engine
+    if engine is not None and isinstance(engine.pool, QueuePool):
+        metrics["retrieval"] = {
+            "size": engine.pool.checkedin() + engine.pool.checkedout(),
+            "max": engine.pool.size() + max(engine.pool._max_overflow, 0),
+            "in_use": engine.pool.checkedout(),
+            "waiting": None,  # Not tracked by SQLAlchemy
+        }
+    
+    for purpose, values in metrics.items():
+        values["utilization"] = round(values["in_use"] / (values["max"] or 1), 2)
+        values.update(wait_stats[purpose].summary())
+    return metrics
@@ -0,0 +1,136 @@
+"""
+Liveness and readiness probes.
+
+`/health/live` only says the process and event loop respond. `/health/ready`
+checks the dependencies a request needs and whether this instance has
+headroom, so a load balancer can route around broken or saturated pods:
+1. Postgres (async pool), the vector store and Ollama are probed with a
+   short timeout (HEALTH_PROBE_TIMEOUT_SECONDS)
+2. Probe results are cached for HEALTH_CACHE_SECONDS, and concurrent checks
+   share one in-flight probe, so frequent polling adds no load
+3. Utilization of each DB pool and queue depths are read live on every
+   call; above HEALTH_MAX_POOL_UTILIZATION or HEALTH_MAX_POOL_WAITING the
+   instance reports itself as saturated (not ready)
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Tuple
+import structlog
+
+from app.core.config import settings
+from app.core.singleflight import AsyncSingleFlight
+
+logger = structlog.get_logger(__name__)
+
+_probe_flight = AsyncSingleFlight("health_probe")
+_probe_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+
+async def _check_db() -> None:
+    from app.core.database import get_pool
+    async with get_pool().connection() as conn:
+        await conn.execute("SELECT 1")
+
+
+def _check_vector_store() -> None:
+    from sqlalchemy import text
+    from app.rag.store import get_engine
+    if settings.VECTOR_BACKEND == "local":
+        return
+    with get_engine().connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+
+async def _check_ollama() -> None:
+    import httpx
+    from app.agent.nodes import tier_model
+    required = {settings.OLLAMA_BASE_URL: {settings.EMBEDDING_MODEL}}
+    for base_url in settings.chat_backends():
+        required.setdefault(base_url, set()).update({tier_model("router"), tier_model("answer")})
+    for base_url, models in required.items():
+        async with httpx.AsyncClient(base_url=base_url) as client:
+            response = await client.get("/api/tags")
+            response.raise_for_status()
+        available = {m["name"] for m in response.json().get("models", [])}
+        available |= {name.removesuffix(":latest") for name in available}
+        missing = sorted(models - available)
+        if missing:
+            raise RuntimeError(f"Models not pulled on {base_url}: {', '.join(missing)}")
+
+
+PROBES: Dict[str, Callable] = {
+    "database": _check_db,
+    "vector_store": _check_vector_store,
+    "ollama": _check_ollama,
+}
+
+
+async def _run_probe(name: str, check: Callable) -> Dict[str, Any]:
+    start = time.perf_counter()
+    call: Awaitable = check() if asyncio.iscoroutinefunction(check) else asyncio.to_thread(check)
+    try:
+        await asyncio.wait_for(call, timeout=settings.HEALTH_PROBE_TIMEOUT_SECONDS)
+        result = {"ok": True}
+    except asyncio.TimeoutError:
+        result = {"ok": False, "error": f"timed out after {settings.HEALTH_PROBE_TIMEOUT_SECONDS}s"}
+    except Exception as e:
+        result = {"ok": False, "error": str(e)}
+    result["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    if not result["ok"]:
+        logger.warning("Health probe failed", probe=name, error=result["error"])
+    _probe_cache[name] = (time.monotonic(), result)
+    return result
+
+
+async def probe(name: str) -> Dict[str, Any]:
+    """
+    Get a dependency's probe result, re-probing when the cached one is stale.
+
+    Returns:
+        Dict with `ok`, `latency_ms`, `age_s` (cache age) and `error` on failure
+    """
+    cached = _probe_cache.get(name)
+    if cached is None or time.monotonic() - cached[0] > settings.HEALTH_CACHE_SECONDS:
+        await _probe_flight.do(name, lambda: _run_probe(name, PROBES[name]))
+        cached = _probe_cache[name]
+    checked_at, result = cached
+    return {**result, "age_s": round(time.monotonic() - checked_at, 1)}
+
+
+def capacity() -> Dict[str, Any]:
+    """Live pool utilization, acquisition waits and queue depths of this instance."""
+    from app.core.database import pool_metrics
+    from app.rag.jobs import get_job_manager
+
+    return {
+        "db_pools": pool_metrics(),
+        "ingest_queue_depth": get_job_manager().queue_depth(),
+    }
+
+
+async def readiness() -> Tuple[bool, Dict[str, Any]]:
+    """
+    Evaluate readiness: all dependencies up and no DB pool saturated.
+
+    Returns:
+        (ready, report)
+    """
+    results = await asyncio.gather(*(probe(name) for name in PROBES))
+    checks = dict(zip(PROBES, results))
+    load = capacity()
+
+    reasons = [f"{name}: {r['error']}" for name, r in checks.items() if not r["ok"]]
+    for purpose, db_pool in load["db_pools"].items():
+        if db_pool["utilization"] >= settings.HEALTH_MAX_POOL_UTILIZATION:
+            reasons.append(f"{purpose} pool saturated ({db_pool['in_use']}/{db_pool['max']} in use)")
+        if (db_pool["waiting"] or 0) > settings.HEALTH_MAX_POOL_WAITING:
+            reasons.append(f"{purpose} pool queue too deep ({db_pool['waiting']} waiting)")
+
+    ready = not reasons
+    return ready, {
+        "status": "ready" if ready else "not_ready",
+        "reasons": reasons,
+        "checks": checks,
+        "capacity": load,
+    }
@@ -0,0 +1,82 @@
+"""
+Per-step latency tracking.
+
+Graph nodes (and other steps worth watching) report their durations here;
+`latency_stats()` gives, per step, the call count and rolling percentiles
+over the last LATENCY_SAMPLES calls (exposed by GET /metrics).
+
+`LatencyStats` is also the rolling-percentile window behind the DB pools'
+acquisition wait metrics (`app.core.database.WaitStats`).
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+
+# Samples kept per step for the percentiles
+LATENCY_SAMPLES = 1000
+
+
+def percentile(samples: List[float], p: float) -> float:
+    """Value at quantile `p` (0-1) of sorted samples; 0.0 when there are none."""
+    return samples[min(len(samples) - 1, int(len(samples) * p))] if samples else 0.0
+
+
+class LatencyStats:
+    """Rolling window of durations (kept in milliseconds)."""
+
+    def __init__(self, max_samples: int = LATENCY_SAMPLES):
+        self._samples: deque = deque(maxlen=max_samples)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds * 1000)
+            self.count += 1
+
+    def sorted_ms(self) -> List[float]:
+        """Snapshot of the window, ascending."""
+        with self._lock:
+            return sorted(self._samples)
+
+    def summary(self) -> Dict[str, float]:
+        samples = self.sorted_ms()
+        return {
+            "calls": self.count,
+            "ms_p50": round(percentile(samples, 0.50), 1),
+            "ms_p95": round(percentile(samples, 0.95), 1),
+            "ms_max": round(percentile(samples, 1.0), 1),
+        }
+
+
+_steps: Dict[str, LatencyStats] = {}
+_steps_lock = threading.Lock()
+
+
+def record_latency(step: str, seconds: float) -> None:
+    """Record one duration of a step (e.g. 'node:agent', 'tool:search_knowledge_base')."""
+    with _steps_lock:
+        stats = _steps.get(step)
+        if stats is None:
+            stats = _steps[step] = LatencyStats()
+    stats.record(seconds)
+
+
+@contextmanager
+def timed(step: str) -> Iterator[None]:
+    """Record the duration of the enclosed block (also when it raises)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_latency(step, time.perf_counter() - start)
+
+
+def latency_stats() -> Dict[str, Dict[str, float]]:
+    """Per step: calls and p50/p95/max milliseconds."""
+    with _steps_lock:
+        steps = dict(_steps)
+    return {step: stats.summary() for step, stats in sorted(steps.items())}
@@ -0,0 +1,134 @@
+"""
+Single-flight request coalescing.
+
+When many callers ask for the same work at the same time (e.g. dozens of
+users sending the same question after an incident), only the first call runs;
+the others wait for it and receive the same result (or exception):
+1. `SingleFlight` for blocking code (tools and embeddings run in worker threads)
+2. `AsyncSingleFlight` for coroutines (stateless /chat requests)
+3. Every group registers itself, so `singleflight_stats()` reports how much
+   work was coalesced per group
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+_groups: Dict[str, "_FlightGroup"] = {}
+
+
+class _FlightGroup:
+    """Bookkeeping shared by the sync and async variants."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.executions = 0
+        self._calls: Dict[Hashable, Any] = {}
+        _groups[name] = self
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.calls - self.executions,
+            "in_flight": len(self._calls),
+        }
+
+
+class SingleFlight(_FlightGroup):
+    """Thread-safe single-flight group for blocking calls."""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Run `fn` unless a call with the same key is in flight; then share its outcome.
+
+        Args:
+            key: Identifies identical work
+            fn: Work to run
+
+        Returns:
+            The result of `fn` (from this call or the in-flight one)
+        """
+        with self._lock:
+            self.calls += 1
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+                self.executions += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+
+class AsyncSingleFlight(_FlightGroup):
+    """Single-flight group for coroutines on one event loop."""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self._waiters: Dict[Hashable, int] = {}
+
+    def _forget(self, key: Hashable, task: asyncio.Future) -> None:
+        """Drop `key` unless it already maps to newer work."""
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await `fn()` unless a call with the same key is in flight; then share its outcome.
+
+        A waiter being cancelled (e.g. client disconnect) does not cancel the
+        shared work for the other waiters; once every waiter is gone, the
+        work itself is cancelled.
+
+        Args:
+            key: Identifies identical work
+            fn: Coroutine factory
+
+        Returns:
+            The result of `fn()` (from this call or the in-flight one)
+        """
+        self.calls += 1
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            self.executions += 1
+            task.add_done_callback(lambda done: self._forget(key, done))
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiters[key] == 1 and not task.done():
+                # New callers must start fresh work, not join the dying task
+                self._forget(key, task)
+                task.cancel()
+            raise
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+
+
+def singleflight_stats() -> Dict[str, Dict[str, int]]:
+    """Per-group call counts: calls, executions, coalesced, in_flight."""
+    return {name: group.stats() for name, group in _groups.items()}
@@ -0,0 +1,111 @@
+"""
+Startup warm-up.
+
+Moves first-request costs into the `lifespan` startup phase:
+1. Checks out a connection from the async Postgres pools (their minimum
+   connections are already opened by `init_db`)
+2. Builds the vector store handle (SQLAlchemy engine, PGVector tables and
+   indexes) and opens DB_POOL_MIN_SIZE retrieval connections
+3. Loads the embedding and chat models into Ollama with OLLAMA_KEEP_ALIVE,
+   so they stay resident between requests; the chat model (both tiers when
+   ROUTER_MODEL and ANSWER_MODEL differ) is primed with the system prompt on
+   every chat backend
+
+Steps 2 and 3 run concurrently. Each step is timed and independent: a
+failing step (e.g. Ollama still starting) is logged and does not block startup.
+"""
+
+import asyncio
+import time
+from typing import Callable, Dict
+import structlog
+
+from app.core.config import settings
+
+logger = structlog.get_logger(__name__)
+
+
+async def _warm_db_pool() -> None:
+    from app.core.database import get_pool
+    async with get_pool().connection() as conn:
+        await conn.execute("SELECT 1")
+
+
+def _warm_vector_store() -> None:
+    from sqlalchemy import text
+    from app.rag.store import get_vector_store, get_engine
+    get_vector_store()
+    if settings.VECTOR_BACKEND == "local":
+        return
+    # Hold the connections at once so the pool keeps that many open
+    engine = get_engine()
+    connections = [engine.connect() for _ in range(min(settings.DB_POOL_MIN_SIZE, engine.pool.size()))]
+    for conn in connections:
+        conn.execute(text("SELECT 1"))
+        conn.close()
+
+
+def _warm_embeddings() -> None:
+    from app.rag.store import get_embeddings
+    get_embeddings().embed_documents(["warm-up"])
+
+
+def _one_token(model):
+    """
+    Copy of a chat model (or of the ChatOllama behind a `bind_tools` binding)
+    limited to one generated token.
+
+    Passing `options={"num_predict": 1}` instead would replace all of
+    ChatOllama's options, so the warm-up would load the model with the default
+    num_ctx (reloaded on the first real request) and ignore its temperature.
+    """
+    from langchain_core.runnables import RunnableBinding
+    if isinstance(model, RunnableBinding):
+        return model.model_copy(update={"bound": _one_token(model.bound)})
+    return model.model_copy(update={"num_predict": 1})
+
+
+def _warm_chat_model() -> None:
+    from langchain_core.messages import HumanMessage, SystemMessage
+    from app.agent.nodes import SYSTEM_PROMPT, get_backend_model, tiered
+    # A one-token generation loads the model weights without a full answer.
+    # Sending the real system prompt (with the tools bound) also leaves the
+    # prefix shared by every conversation in each backend's prompt cache
+    prompt = [SystemMessage(content=SYSTEM_PROMPT), HumanMessage(content="ping")]
+    tiers = ("router", "answer") if tiered() else ("router",)
+    for base_url in settings.chat_backends():
+        for tier in tiers:
+            _one_token(get_backend_model(base_url, tier)).invoke(prompt)
+
+
+async def _timed(name: str, step: Callable, timings: Dict[str, float]) -> None:
+    start = time.perf_counter()
+    try:
+        if asyncio.iscoroutinefunction(step):
+            await step()
+        else:
+            await asyncio.to_thread(step)
+        timings[name] = round(time.perf_counter() - start, 3)
+    except Exception as e:
+        timings[name] = -1
+        logger.warning("Warm-up step failed", step=name, error=str(e))
+
+
+async def warm_up() -> Dict[str, float]:
+    """
+    Run all warm-up steps; the vector store and both models warm up concurrently.
+
+    Returns:
+        Seconds per step (steps that failed are reported as -1)
+    """
+    timings: Dict[str, float] = {}
+    start = time.perf_counter()
+    await _timed("db_pool", _warm_db_pool, timings)
+    await asyncio.gather(
+        _timed("vector_store", _warm_vector_store, timings),
+        _timed("embeddings", _warm_embeddings, timings),
+        _timed("chat_model", _warm_chat_model, timings),
+    )
+    timings["total"] = round(time.perf_counter() - start, 3)
+    logger.info("Warm-up complete", **timings)
+    return timings
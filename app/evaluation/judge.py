@@ -2,15 +2,40 @@ import json
 import pandas as pd
 import asyncio
 import os
+import time
 from langchain_ollama import ChatOllama
 from langchain_core.prompts import ChatPromptTemplate
 from app.agent.graph import create_graph # Importa o agente
-from langchain_core.messages import HumanMessage
+from app.agent.nodes import tier_model
+from langchain_core.messages import AIMessage, HumanMessage
 from app.core.config import settings
 
 # Configuração do Juiz
 JUDGE_MODEL = "deepseek-r1:8b" 
 
+# Nós do grafo cuja latência entra no relatório
+NODES = ("agent", "tools", "answer", "finalize")
+
+async def answer_with_timings(agent, question: str):
+    """
+    Executa o agente nó a nó (stream_mode="updates") medindo quanto tempo cada nó levou.
+    
+    Returns:
+        (resposta, {nó: segundos somados na pergunta})
+    """
+    timings = {node: 0.0 for node in NODES}
+    answer = ""
+    start = time.perf_counter()
+    async for chunk in agent.astream({"messages": [HumanMessage(content=question)]}, stream_mode="updates"):
+        now = time.perf_counter()
+        for node, update in chunk.items():
+            timings[node] = timings.get(node, 0.0) + (now - start)
+            for message in (update or {}).get("messages", []):
+                if isinstance(message, AIMessage) and not message.tool_calls:
+                    answer = message.content
+        start = now
+    return answer, timings
+
 async def run_evaluation():
     print(f"⚖️  Iniciando Sessão do LLM Judge ({JUDGE_MODEL})...")
     
@@ -24,8 +49,10 @@ async def run_evaluation():
         return
 
     # 2. Inicializar Agente e Juiz
-    # O agente usa o modelo definido em settings (ex: llama3.1:8b)
+    # O agente usa os modelos definidos em settings: ROUTER_MODEL decide as
+    # ferramentas, ANSWER_MODEL escreve a resposta (ambos = LLM_MODEL por padrão)
     # O juiz usa o modelo definido acima (deepseek-r1:8b)
+    print(f"🔹 Roteador: {tier_model('router')} | Resposta: {tier_model('answer')}")
     
     print("🔹 Inicializando Agente...")
     agent = create_graph()
@@ -68,12 +95,11 @@ async def run_evaluation():
         
         # A. Obter resposta do Agente
         try:
-            inputs = {"messages": [HumanMessage(content=record["question"])]}
-            response = await agent.ainvoke(inputs)
-            agent_answer = response["messages"][-1].content
+            agent_answer, timings = await answer_with_timings(agent, record["question"])
         except Exception as e:
             print(f"❌ Erro ao invocar agente: {e}")
             agent_answer = "ERRO: Falha ao gerar resposta."
+            timings = {}
         
         # B. Julgar
         eval_chain = eval_prompt | judge_llm
@@ -111,7 +137,9 @@ async def run_evaluation():
             "ground_truth": record["ground_truth"],
             "agent_answer": agent_answer,
             "score": eval_json.get("score", 0),
-            "reasoning": eval_json.get("reasoning", "N/A")
+            "reasoning": eval_json.get("reasoning", "N/A"),
+            "total_s": round(sum(timings.values()), 2),
+            **{f"{node}_s": round(timings.get(node, 0.0), 2) for node in NODES},
         })
 
     # 5. Gerar Relatório
@@ -122,7 +150,11 @@ async def run_evaluation():
     df = pd.DataFrame(results)
     
     print("\n📊 Relatório Final:")
-    print(df[["question", "score", "reasoning"]])
+    print(df[["question", "score", "total_s", "reasoning"]])
+    
+    # Latência média por nó (segundos por pergunta): com o custo de cada nó e a
+    # nota do juiz dá para comparar configurações de ROUTER_MODEL/ANSWER_MODEL
+    latency = df[["total_s"] + [f"{node}_s" for node in NODES]].mean().round(2)
     
     output_csv = "data/datasets/evaluation_report.csv"
     output_md = "data/datasets/evaluation_report.md"
@@ -134,13 +166,19 @@ async def run_evaluation():
         f.write("# Relatório de Avaliação do Agente\n\n")
         f.write(f"**Data:** {pd.Timestamp.now()}\n")
         f.write(f"**Modelo Juiz:** {JUDGE_MODEL}\n")
+        f.write(f"**Modelo Roteador:** {tier_model('router')}\n")
+        f.write(f"**Modelo de Resposta:** {tier_model('answer')}\n")
         f.write(f"**Média de Precisão:** {df['score'].mean():.2f} / 5.0\n\n")
+        f.write("## Latência Média por Nó (s)\n\n")
+        f.write(latency.to_frame("média").to_markdown())
+        f.write("\n\n")
         f.write("## Detalhes\n\n")
         f.write(df.to_markdown(index=False))
         
     print(f"\n✅ Relatório CSV salvo em: {output_csv}")
     print(f"✅ Relatório MD salvo em: {output_md}")
     print(f"⭐ Média de Precisão: {df['score'].mean():.2f} / 5.0")
+    print(f"⏱️  Latência média por pergunta: {latency['total_s']:.2f}s")
 
 if __name__ == "__main__":
     if os.name == 'nt':
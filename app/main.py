@@ -1,10 +1,10 @@
 import sys
 import asyncio
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from langchain_core.messages import HumanMessage
-from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+import json
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
 import os
 
 # Windows compatibility for psycopg
@@ -12,10 +12,32 @@ if sys.platform == 'win32':
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
 from app.agent.graph import create_graph
-from app.core.database import init_db, close_db, get_pool, log_analysis
+from app.agent.batch import answer_batch, build_inputs, extract_answer
+from app.agent.nodes import streams_reply
+from app.agent.speculative import speculative_stats
+from app.agent.tool_node import tool_cache_stats
+from app.core.latency import latency_stats
+from app.core.config import settings
+from app.core.singleflight import AsyncSingleFlight, singleflight_stats
+from app.core.cache import get_cache
+from app.core.database import (
+    init_db, close_db, get_pool, log_analysis, get_ingestion_job, list_ingestion_jobs, pool_metrics,
+)
+from app.rag.store import get_collection_name
+from app.rag import catalog
+from app.rag.jobs import get_job_manager
+from app.core.warmup import warm_up
+from app.core.health import readiness
 
-# Global graph instance (set on startup)
+# Global graph instances (set on startup)
 agent_runnable = None
+stateless_runnable = None  # No checkpointer: /chat without thread_id and /chat/batch
+
+# Coalesces identical in-flight stateless /chat requests
+_chat_flight = AsyncSingleFlight("chat")
+
+# How often a running /chat checks whether its client is still connected
+DISCONNECT_POLL_SECONDS = 0.5
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -23,22 +45,34 @@ async def lifespan(app: FastAPI):
     Manage application lifecycle.
     1. Initialize Database Pool
     2. Setup Checkpointer with the pool
-    3. Compile Graph with Checkpointer
+    3. Compile Graph with Checkpointer (and a stateless one without)
+    4. Start background ingestion workers
+    5. Warm up pools and models (WARMUP_ENABLED)
     """
+    from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+    
     # Startup
     await init_db()
-    pool = get_pool()
+    pool = get_pool("checkpointer")
     
-    # Initialize Checkpointer with the shared pool
+    # Initialize Checkpointer with its own pool (checkpoint traffic can't starve logging/retrieval)
     checkpointer = AsyncPostgresSaver(pool)
     await checkpointer.setup() # Ensure tables exist
     
-    global agent_runnable
+    global agent_runnable, stateless_runnable
     agent_runnable = create_graph(checkpointer=checkpointer)
+    stateless_runnable = create_graph()
+    
+    job_manager = get_job_manager()
+    await job_manager.start()
+    
+    if settings.WARMUP_ENABLED:
+        await warm_up()
     
     yield
     
     # Shutdown
+    await job_manager.stop()
     await close_db()
 
 app = FastAPI(
@@ -51,67 +85,189 @@ app = FastAPI(
 class ChatRequest(BaseModel):
     message: str
     thread_id: str | None = None
-    sources: list[str] = []  # New field for fonts
+    sources: list[str] = []  # Restrict retrieval to these files (see /files); empty = all
+    tenant_id: str | None = None  # Searches only this tenant's collection; None = default
+    # Answer deadline; None = CHAT_DEADLINE_SECONDS, which is also the maximum
+    timeout_seconds: float | None = Field(None, gt=0, le=settings.CHAT_DEADLINE_SECONDS)
 
 import time
-from pathlib import Path
 from typing import List, Optional
 
 class ChatResponse(BaseModel):
     response: str
     thread_id: str | None = None
-    context: List[str] = [] # Retrieved documents content
+    context: List[str] = [] # Retrieved chunks ("source: snippet")
+    references: List[dict] = [] # Retrieved chunks: id, source, score, snippet
     latency: float = 0.0     # Response time in seconds
 
 @app.get("/")
 async def root():
     return {"status": "ok", "message": "Agent API is running with Lifecycle Management"}
 
+@app.get("/health/live")
+async def health_live():
+    """Liveness: the process and its event loop respond. No dependency checks."""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def health_ready():
+    """
+    Readiness: Postgres, the vector store and Ollama respond (cached probes)
+    and the DB pool has headroom. Returns 503 with the reasons otherwise.
+    """
+    ready, report = await readiness()
+    return JSONResponse(report, status_code=200 if ready else 503)
+
+@app.get("/metrics")
+async def metrics():
+    """Runtime counters of this worker: DB pool usage and acquisition waits, coalesced work, cache hits (shared tier and tool results), per-node latency."""
+    return {
+        "worker_pid": os.getpid(),
+        "db_pools": pool_metrics(),
+        "coalescing": singleflight_stats(),
+        "cache": get_cache().stats(),
+        "tool_cache": tool_cache_stats(),
+        "speculative_retrieval": speculative_stats(),
+        "latency": latency_stats(),
+    }
+
 @app.get("/files")
-async def list_files():
-    """List all available files in the raw data directory."""
+async def list_files(
+    tenant_id: str | None = None,
+    offset: int = 0,
+    limit: int = 100,
+    q: str | None = None,
+    file_type: str | None = None,
+    status: str | None = None,
+    sort: str = "name",
+    order: str = "asc",
+):
+    """
+    List ingested files (paginated), from the cached ingestion manifest.
+
+    Filters: `q` (name substring), `file_type` (extension), `status` ('ingested'
+    or 'empty'). `sort` is name, size, chunks or ingested_at; `order` asc or desc.
+    Each file has name (usable in /chat `sources`), file_type, size, chunks,
+    ingested_at and status; `total` counts the matches.
+    """
     try:
-        raw_path = Path("data/raw")
-        if not raw_path.exists():
-            return {"files": []}
-        files = [f.name for f in raw_path.iterdir() if f.is_file()]
-        return {"files": files}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        return await asyncio.to_thread(
+            catalog.list_files,
+            tenant_id=tenant_id,
+            offset=offset,
+            limit=limit,
+            query=q,
+            file_type=file_type,
+            status=status,
+            sort=sort,
+            descending=order == "desc",
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+class IngestRequest(BaseModel):
+    directory: str | None = None  # Subdirectory of data/raw; None = everything
+    tenant_id: str | None = None
+    incremental: bool = True  # Skip files unchanged since their last ingestion
+
+@app.post("/ingest", status_code=202)
+async def start_ingestion(request: IngestRequest):
+    """
+    Queue a background ingestion job. Returns immediately with the job id;
+    poll GET /ingest/{job_id} for stage, progress and throughput.
+    """
+    try:
+        get_collection_name(request.tenant_id)
+        job_id = await get_job_manager().submit(
+            directory=request.directory,
+            tenant_id=request.tenant_id,
+            incremental=request.incremental,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"job_id": job_id, "status": "queued"}
+
+@app.get("/ingest")
+async def list_ingestion(limit: int = 20):
+    """List recent ingestion jobs, newest first."""
+    jobs = await list_ingestion_jobs(limit=min(limit, 100))
+    return {"jobs": jobs, "queue_depth": get_job_manager().queue_depth()}
+
+@app.get("/ingest/{job_id}")
+async def get_ingestion(job_id: str):
+    """Get the status, stage and progress of an ingestion job."""
+    job = await get_ingestion_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.delete("/ingest/{job_id}")
+async def cancel_ingestion(job_id: str):
+    """Cancel a queued or running ingestion job."""
+    if not await get_job_manager().cancel(job_id):
+        raise HTTPException(status_code=409, detail="Job is not queued or running")
+    return {"job_id": job_id, "status": "cancelling"}
+
+async def _cancel_on_disconnect(http_request: Request, work):
+    """
+    Await `work` (a coroutine), cancelling it if the client disconnects first,
+    so no backend capacity goes into an answer nobody will read.
+    """
+    task = asyncio.ensure_future(work)
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+        if done:
+            return task.result()
+        if await http_request.is_disconnected():
+            task.cancel()
+            raise HTTPException(status_code=499, detail="Client disconnected")
 
 @app.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, http_request: Request):
     """
     Process a chat message through the LangGraph agent.
+
+    The run has a deadline (`timeout_seconds`, at most CHAT_DEADLINE_SECONDS):
+    when it nears, the agent answers from the context gathered so far. The run
+    is cancelled if the client disconnects.
     """
     if not agent_runnable:
         raise HTTPException(status_code=503, detail="Agent not initialized")
 
+    try:
+        get_collection_name(request.tenant_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     try:
         start_time = time.perf_counter()
+        budget = request.timeout_seconds or settings.CHAT_DEADLINE_SECONDS
+        deadline = time.monotonic() + budget
         
         # Prepare input for the graph
-        inputs = {"messages": [HumanMessage(content=request.message)]}
-        
-        # Configuration for thread-based persistence
-        config = {"configurable": {"thread_id": request.thread_id}} if request.thread_id else {}
+        # `sources` is always set so a previous turn's scope never leaks into this one
+        inputs = build_inputs(request.message, request.sources, request.tenant_id)
         
-        # Invoke the graph (async)
-        result = await agent_runnable.ainvoke(inputs, config=config)
+        if request.thread_id:
+            # Configuration for thread-based persistence
+            config = {"configurable": {"thread_id": request.thread_id, "deadline": deadline}}
+            result = await _cancel_on_disconnect(http_request, agent_runnable.ainvoke(inputs, config=config))
+        else:
+            # Stateless: identical concurrent questions are answered by one graph run
+            # (cancelled only once every client waiting for it has disconnected).
+            # Only requests with the same budget share a run, so no client gets an
+            # answer cut short by another client's shorter deadline
+            key = (request.message, tuple(sorted(request.sources)), request.tenant_id, budget)
+            config = {"configurable": {"deadline": deadline}}
+            result = await _cancel_on_disconnect(
+                http_request, _chat_flight.do(key, lambda: stateless_runnable.ainvoke(inputs, config=config))
+            )
         
         end_time = time.perf_counter()
         latency = round(end_time - start_time, 2)
         
-        # Extract the last message content (Agent response)
-        last_message = result["messages"][-1]
-        response_content = last_message.content
-        
-        # Extract context from ToolMessages
-        context = []
-        for msg in result["messages"]:
-            if msg.type == "tool":
-                # This message contains the output from the tool (RAG search results)
-                context.append(str(msg.content))
+        # Extract the agent response and the context from ToolMessages (RAG search results)
+        response_content, context, references = extract_answer(result)
         
         # STRUCTURED LOGGING (Side Effect)
         if request.thread_id:
@@ -130,13 +286,127 @@ async def chat(request: ChatRequest):
             response=response_content,
             thread_id=request.thread_id,
             context=context,
+            references=references,
             latency=latency
         )
             
+    except HTTPException:
+        raise
     except Exception as e:
         # Log the error potentially too
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Like /chat, streaming NDJSON so clients can render the answer as it is written:
+    `{"type": "token", "content"}` lines, then one `{"type": "done", ...}` line with
+    the /chat response fields (or `{"type": "error", "detail"}`).
+
+    Tokens are only those of the reply; the final `response` is authoritative.
+    A client disconnect cancels the run.
+    """
+    if not agent_runnable:
+        raise HTTPException(status_code=503, detail="Agent not initialized")
+    try:
+        get_collection_name(request.tenant_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    start_time = time.perf_counter()
+    budget = request.timeout_seconds or settings.CHAT_DEADLINE_SECONDS
+    configurable = {"deadline": time.monotonic() + budget}
+    runnable = stateless_runnable
+    if request.thread_id:
+        configurable["thread_id"] = request.thread_id
+        runnable = agent_runnable
+    inputs = build_inputs(request.message, request.sources, request.tenant_id)
+
+    async def lines():
+        result = None
+        try:
+            async for mode, chunk in runnable.astream(
+                inputs, config={"configurable": configurable}, stream_mode=["messages", "values"]
+            ):
+                if mode == "values":
+                    result = chunk
+                    continue
+                message, metadata = chunk
+                if message.content and streams_reply(metadata.get("langgraph_node", "")):
+                    yield json.dumps({"type": "token", "content": message.content}) + "\n"
+
+            response_content, context, references = extract_answer(result)
+            latency = round(time.perf_counter() - start_time, 2)
+            if request.thread_id:
+                await log_analysis(
+                    thread_id=request.thread_id,
+                    query=request.message,
+                    result={"response": response_content, "latency": latency, "context_length": len(context)},
+                )
+            done = ChatResponse(
+                response=response_content,
+                thread_id=request.thread_id,
+                context=context,
+                references=references,
+                latency=latency,
+            )
+            yield json.dumps({"type": "done", **done.model_dump()}) + "\n"
+        except Exception as e:
+            yield json.dumps({"type": "error", "detail": str(e)}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+class BatchQuestion(BaseModel):
+    message: str
+    id: str | None = None  # Echoed back so callers can match answers
+    sources: list[str] | None = None  # Defaults to the batch's sources
+    tenant_id: str | None = None  # Defaults to the batch's tenant
+
+class ChatBatchRequest(BaseModel):
+    questions: List[BatchQuestion]
+    sources: list[str] = []
+    tenant_id: str | None = None
+    concurrency: int | None = Field(None, gt=0)  # Capped at CHAT_BATCH_CONCURRENCY
+
+@app.post("/chat/batch")
+async def chat_batch(request: ChatBatchRequest):
+    """
+    Answer many independent questions (no thread persistence).
+
+    Streams NDJSON: one line per question as it completes
+    (`index`, `id`, `response`, `context`, `references`, `elapsed`, `error`).
+    """
+    if not stateless_runnable:
+        raise HTTPException(status_code=503, detail="Agent not initialized")
+    if len(request.questions) > settings.CHAT_BATCH_MAX_QUESTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.CHAT_BATCH_MAX_QUESTIONS} questions per batch",
+        )
+
+    questions = [
+        {
+            "id": q.id,
+            "message": q.message,
+            "sources": request.sources if q.sources is None else q.sources,
+            "tenant_id": q.tenant_id or request.tenant_id,
+        }
+        for q in request.questions
+    ]
+    try:
+        for q in questions:
+            get_collection_name(q["tenant_id"])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    concurrency = min(request.concurrency or settings.CHAT_BATCH_CONCURRENCY, settings.CHAT_BATCH_CONCURRENCY)
+
+    async def lines():
+        async for item in answer_batch(stateless_runnable, questions, concurrency=concurrency):
+            yield json.dumps(item) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,151 @@
+"""
+RAG File Catalog Module
+
+Serves the list of ingested files (GET /files) without scanning the raw data
+directory:
+1. Entries come from the collection's ingestion manifest: source name, size,
+   chunk count, ingestion timestamp and status
+2. Each collection's catalog is kept in memory, together with its orderings
+3. It is rebuilt when the manifest changes: ingestion in this process drops it
+   right away (`invalidate_catalog`), and a changed manifest file (watch mode
+   or ingestion in another process) is detected with a single `stat` per listing
+"""
+
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import structlog
+
+from app.rag.manifest import IngestionManifest
+from app.rag.store import get_collection_name
+
+logger = structlog.get_logger(__name__)
+
+# Largest page a listing returns
+MAX_PAGE_SIZE = 1000
+
+SORT_FIELDS = ("name", "size", "chunks", "ingested_at")
+
+
+class FileCatalog:
+    """In-memory snapshot of one collection's manifest."""
+
+    def __init__(self, manifest_path: Path):
+        self.manifest_path = manifest_path
+        self.signature = self._signature(manifest_path)
+        self.files = self._build(manifest_path)
+        self._orders: Dict[str, List[Dict[str, Any]]] = {"name": self.files}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _signature(manifest_path: Path) -> Optional[tuple]:
+        """Identity of the manifest file (it is replaced atomically on every write)."""
+        try:
+            stat = manifest_path.stat()
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    @staticmethod
+    def _build(manifest_path: Path) -> List[Dict[str, Any]]:
+        files = [
+            {
+                "name": entry["source_file"],
+                "file_type": os.path.splitext(entry["source_file"])[1].lstrip(".").lower(),
+                "size": entry["size"],
+                "chunks": entry["chunks"],
+                "ingested_at": entry["ingested_at"],
+                # Files that yielded no chunks (empty, or all near-duplicates) are not searchable
+                "status": "ingested" if entry["chunks"] else "empty",
+            }
+            for entry in IngestionManifest(manifest_path).entries().values()
+        ]
+        files.sort(key=lambda f: f["name"])
+        logger.debug("File catalog built", manifest=str(manifest_path), files=len(files))
+        return files
+
+    def is_current(self) -> bool:
+        return self._signature(self.manifest_path) == self.signature
+
+    def ordered(self, sort: str) -> List[Dict[str, Any]]:
+        """Entries in ascending `sort` order (computed once per snapshot)."""
+        with self._lock:
+            if sort not in self._orders:
+                self._orders[sort] = sorted(self.files, key=lambda f: (f[sort], f["name"]))
+            return self._orders[sort]
+
+
+_catalogs: Dict[str, FileCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def _get_catalog(collection_name: str) -> FileCatalog:
+    with _catalogs_lock:
+        catalog = _catalogs.get(collection_name)
+    if catalog is None or not catalog.is_current():
+        catalog = FileCatalog(IngestionManifest.for_collection(collection_name).path)
+        with _catalogs_lock:
+            _catalogs[collection_name] = catalog
+    return catalog
+
+
+def invalidate_catalog(tenant_id: Optional[str] = None) -> None:
+    """Drop a tenant's cached catalog (called by ingestion after the manifest changes)."""
+    with _catalogs_lock:
+        _catalogs.pop(get_collection_name(tenant_id), None)
+
+
+def list_files(
+    tenant_id: Optional[str] = None,
+    offset: int = 0,
+    limit: int = 100,
+    query: Optional[str] = None,
+    file_type: Optional[str] = None,
+    status: Optional[str] = None,
+    sort: str = "name",
+    descending: bool = False,
+) -> Dict[str, Any]:
+    """
+    List a tenant's ingested files, one page at a time.
+
+    Args:
+        tenant_id: Tenant/namespace (None = default collection)
+        offset: Entries to skip
+        limit: Page size (at most MAX_PAGE_SIZE)
+        query: Case-insensitive substring of the file name
+        file_type: File extension, without the dot (e.g. 'pdf')
+        status: 'ingested' or 'empty' (no chunks)
+        sort: One of SORT_FIELDS
+        descending: Reverse the order
+
+    Returns:
+        {"total", "offset", "limit", "files"}; `total` counts the matches
+        and each file has name, file_type, size, chunks, ingested_at and status
+
+    Raises:
+        ValueError: If the tenant id or sort field is invalid
+    """
+    if sort not in SORT_FIELDS:
+        raise ValueError(f"Invalid sort field: {sort!r}. Use one of {', '.join(SORT_FIELDS)}.")
+    files = _get_catalog(get_collection_name(tenant_id)).ordered(sort)
+    if descending:
+        files = files[::-1]
+
+    if query:
+        needle = query.lower()
+        files = [f for f in files if needle in f["name"].lower()]
+    if file_type:
+        wanted = file_type.lstrip(".").lower()
+        files = [f for f in files if f["file_type"] == wanted]
+    if status:
+        files = [f for f in files if f["status"] == status]
+
+    offset = max(offset, 0)
+    limit = min(max(limit, 0), MAX_PAGE_SIZE)
+    return {
+        "total": len(files),
+        "offset": offset,
+        "limit": limit,
+        "files": files[offset:offset + limit],
+    }
@@ -0,0 +1,189 @@
+"""
+RAG Chunking Module
+
+Token-aware, boundary-respecting chunker for the ingestion pipeline:
+1. Splits each document into sections (Markdown headings / form feeds) and
+   sentences with one compiled regex pass per document
+2. Counts tokens for all sentences in one batched call to a compiled (Rust)
+   HuggingFace tokenizer matching the embedding model
+3. Packs whole sentences into chunks of at most CHUNK_TOKENS tokens using
+   cumulative token sums (numpy searchsorted) instead of per-sentence loops
+4. Overlaps chunks by whole trailing sentences (CHUNK_OVERLAP_TOKENS), so no
+   partial sentence is duplicated, and drops chunks made only of overlap
+"""
+
+import re
+from typing import Iterable, List, Tuple
+import numpy as np
+import structlog
+from langchain_core.documents import Document
+
+from app.core.config import settings
+
+logger = structlog.get_logger(__name__)
+
+# Section boundaries: Markdown headings and page/form-feed breaks
+SECTION_PATTERN = re.compile(r"(?m)^(?=#{1,6}\s)|\f")
+
+# Sentences: run to terminal punctuation followed by whitespace, a blank line
+# (paragraph break) or the end of the section; single newlines are wrapped text
+SENTENCE_PATTERN = re.compile(r"\S.*?(?:[.!?](?=\s)|(?=\n\s*\n)|\Z)", re.DOTALL)
+
+
+class TokenAwareChunker:
+    """Splits documents into sentence-aligned chunks measured in model tokens."""
+
+    def __init__(self, chunk_tokens: int = None, overlap_tokens: int = None, tokenizer_name: str = None):
+        """
+        Initialize the chunker.
+
+        Args:
+            chunk_tokens: Max tokens per chunk (defaults to CHUNK_TOKENS)
+            overlap_tokens: Max tokens carried over between chunks (defaults to CHUNK_OVERLAP_TOKENS)
+            tokenizer_name: HuggingFace tokenizer id (defaults to CHUNK_TOKENIZER)
+        """
+        from tokenizers import Tokenizer
+
+        self.chunk_tokens = chunk_tokens or settings.CHUNK_TOKENS
+        self.overlap_tokens = settings.CHUNK_OVERLAP_TOKENS if overlap_tokens is None else overlap_tokens
+        if self.overlap_tokens >= self.chunk_tokens:
+            raise ValueError("overlap_tokens must be smaller than chunk_tokens")
+
+        self.tokenizer = Tokenizer.from_pretrained(tokenizer_name or settings.CHUNK_TOKENIZER)
+        self.tokenizer.no_truncation()
+        self.tokenizer.no_padding()
+
+    def _sentences(self, text: str) -> List[str]:
+        """Split text into sections, then sentences; sections start with a '' marker."""
+        sentences: List[str] = []
+        for section in SECTION_PATTERN.split(text):
+            if not section.strip():
+                continue
+            sentences.append("")  # Section boundary marker
+            for match in SENTENCE_PATTERN.finditer(section):
+                sentences.append(" ".join(match.group().split()))
+        return sentences
+
+    def _split_oversized(self, sentence: str) -> List[Tuple[str, int]]:
+        """Split a sentence longer than the chunk budget on token offsets; returns (piece, tokens)."""
+        offsets = self.tokenizer.encode(sentence, add_special_tokens=False).offsets
+        pieces = []
+        for start in range(0, len(offsets), self.chunk_tokens):
+            window = offsets[start:start + self.chunk_tokens]
+            pieces.append((sentence[window[0][0]:window[-1][1]], len(window)))
+        return pieces
+
+    def _pack(self, sentences: List[str], counts: np.ndarray) -> List[Tuple[int, int]]:
+        """
+        Greedily pack sentences [start, end) into chunks within the token budget.
+
+        `cumsum[i]` is the token total of sentences[:i], so the furthest end for
+        a chunk starting at `start` is one searchsorted lookup, and the overlap
+        start for the next chunk is another.
+        """
+        cumsum = np.concatenate(([0], np.cumsum(counts)))
+        spans = []
+        start, n = 0, len(sentences)
+        while start < n:
+            end = int(np.searchsorted(cumsum, cumsum[start] + self.chunk_tokens, side="right")) - 1
+            end = max(end, start + 1)
+            spans.append((start, end))
+            if end >= n:
+                break
+            # Carry whole trailing sentences, but always make progress
+            overlap_start = int(np.searchsorted(cumsum, cumsum[end] - self.overlap_tokens, side="left"))
+            start = min(max(overlap_start, start + 1), end)
+        return spans
+
+    def split_text(self, text: str) -> List[str]:
+        """
+        Split a text into chunks.
+
+        Args:
+            text: Text to split
+
+        Returns:
+            List of chunk strings
+        """
+        units = self._sentences(text)
+
+        # One batched tokenizer call for all sentences of the document
+        encodings = self.tokenizer.encode_batch([u for u in units if u], add_special_tokens=False)
+        counts_iter = iter(len(e.ids) for e in encodings)
+
+        chunks: List[str] = []
+        section: List[str] = []
+        section_counts: List[int] = []
+
+        def flush():
+            if not section:
+                return
+            counts = np.asarray(section_counts, dtype=np.int64)
+            for start, end in self._pack(section, counts):
+                chunks.append(" ".join(section[start:end]))
+            section.clear()
+            section_counts.clear()
+
+        for unit in units:
+            if unit == "":
+                flush()
+                continue
+            count = next(counts_iter)
+            if count > self.chunk_tokens:
+                for piece, piece_count in self._split_oversized(unit):
+                    section.append(piece)
+                    section_counts.append(piece_count)
+            else:
+                section.append(unit)
+                section_counts.append(count)
+        flush()
+
+        return self._dedupe(chunks)
+
+    @staticmethod
+    def _dedupe(chunks: List[str]) -> List[str]:
+        """Drop empty chunks and chunks fully contained in the previous chunk (pure overlap)."""
+        result: List[str] = []
+        for chunk in chunks:
+            if not chunk.strip():
+                continue
+            if result and chunk in result[-1]:
+                continue
+            result.append(chunk)
+        return result
+
+    def split_documents(self, documents: Iterable[Document]) -> List[Document]:
+        """
+        Split documents into chunk documents, copying metadata.
+
+        Args:
+            documents: Documents to split
+
+        Returns:
+            List of chunked documents
+        """
+        chunks = []
+        for document in documents:
+            for text in self.split_text(document.page_content):
+                chunks.append(Document(page_content=text, metadata=dict(document.metadata)))
+        return chunks
+
+
+def get_text_splitter():
+    """
+    Build the text splitter selected by the CHUNKER setting.
+
+    Returns:
+        TokenAwareChunker for 'token', otherwise the character-based
+        RecursiveCharacterTextSplitter (CHUNK_SIZE / CHUNK_OVERLAP)
+    """
+    if settings.CHUNKER == "token":
+        return TokenAwareChunker()
+
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    return RecursiveCharacterTextSplitter(
+        chunk_size=settings.CHUNK_SIZE,
+        chunk_overlap=settings.CHUNK_OVERLAP,
+        length_function=len,
+        separators=["\n\n", "\n", " ", ""],
+    )
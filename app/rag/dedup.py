@@ -0,0 +1,306 @@
+"""
+RAG Near-Duplicate Detection Module
+
+Filters near-identical chunks (versioned manuals, repeated log headers) so
+they are neither embedded nor stored twice, and removes near-duplicates from
+search results:
+1. Each chunk gets a 64-bit SimHash over word 3-shingles (numpy bit voting)
+2. Signatures persist in Postgres (`chunk_signatures`), split into four
+   16-bit bands; two chunks within Hamming distance 3 always share a band,
+   so candidates are found with indexed band lookups (LSH)
+3. Skipped chunks are recorded against their canonical file and chunk, so
+   deleting or changing that file can trigger re-ingestion of the files that
+   relied on it, and the canonical chunk lists the skipping file in its
+   `sources` metadata (so searches scoped to that file still find the content)
+4. Re-ingesting a file adds the new version's signatures before deleting the
+   previous version's rows (`row_ids`), like its chunks
+"""
+
+import re
+import uuid
+from hashlib import blake2b
+from typing import Iterable, List, Optional, Tuple
+import numpy as np
+import structlog
+from langchain_core.documents import Document
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.rag.store import get_engine
+
+logger = structlog.get_logger(__name__)
+
+TOKEN_PATTERN = re.compile(r"\w+")
+SHINGLE_SIZE = 3
+BANDS = 4
+BAND_BITS = 64 // BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+
+SIGNATURES_TABLE_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS chunk_signatures (
+        id BIGSERIAL PRIMARY KEY,
+        collection TEXT NOT NULL,
+        file_path TEXT NOT NULL,
+        simhash BIGINT NOT NULL,
+        band0 INTEGER NOT NULL,
+        band1 INTEGER NOT NULL,
+        band2 INTEGER NOT NULL,
+        band3 INTEGER NOT NULL,
+        canonical_file TEXT,
+        chunk_id TEXT
+    )
+    """,
+    # Stored chunk id, or the canonical chunk's id for a skipped duplicate
+    "ALTER TABLE chunk_signatures ADD COLUMN IF NOT EXISTS chunk_id TEXT",
+    *[
+        f"CREATE INDEX IF NOT EXISTS ix_chunk_signatures_band{i} ON chunk_signatures (collection, band{i})"
+        for i in range(BANDS)
+    ],
+    "CREATE INDEX IF NOT EXISTS ix_chunk_signatures_file ON chunk_signatures (collection, file_path)",
+    "CREATE INDEX IF NOT EXISTS ix_chunk_signatures_canonical ON chunk_signatures (collection, canonical_file)",
+]
+
+
+def simhash(content: str) -> int:
+    """
+    Compute the 64-bit SimHash of a text.
+
+    Args:
+        content: Text to fingerprint
+
+    Returns:
+        Unsigned 64-bit signature
+    """
+    tokens = TOKEN_PATTERN.findall(content.lower())
+    if len(tokens) < SHINGLE_SIZE:
+        shingles = [" ".join(tokens)]
+    else:
+        shingles = [" ".join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)]
+
+    hashes = np.fromiter(
+        (int.from_bytes(blake2b(s.encode("utf-8"), digest_size=8).digest(), "little") for s in shingles),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+    # One row of 64 bits per shingle; a signature bit is set if most shingles set it
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    majority = bits.sum(axis=0) * 2 > len(shingles)
+    return int(np.packbits(majority, bitorder="little").view("<u8")[0])
+
+
+def hamming(a: int, b: int) -> int:
+    """Number of differing bits between two signatures."""
+    return (a ^ b).bit_count()
+
+
+def _bands(signature: int) -> List[int]:
+    return [(signature >> (BAND_BITS * i)) & BAND_MASK for i in range(BANDS)]
+
+
+def _to_signed(signature: int) -> int:
+    """Postgres BIGINT is signed; store the same 64 bits."""
+    return signature - (1 << 64) if signature >= (1 << 63) else signature
+
+
+def _to_unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+def dedupe_documents(documents: Iterable[Document], k: int = None) -> List[Document]:
+    """
+    Drop near-duplicate documents from a ranked result list, keeping the best-ranked copy.
+
+    Uses the `simhash` metadata written at ingestion when present.
+
+    Args:
+        documents: Documents in rank order
+        k: Stop once this many distinct documents were kept (None = keep all)
+
+    Returns:
+        Distinct documents in rank order
+    """
+    kept: List[Document] = []
+    signatures: List[int] = []
+    for doc in documents:
+        stored = doc.metadata.get("simhash")
+        signature = int(stored, 16) if stored else simhash(doc.page_content)
+        if any(hamming(signature, s) <= settings.DEDUP_MAX_HAMMING for s in signatures):
+            continue
+        kept.append(doc)
+        signatures.append(signature)
+        if k is not None and len(kept) >= k:
+            break
+    return kept
+
+
+class SignatureIndex:
+    """Persistent SimHash index of the chunks stored in one collection."""
+
+    _table_ready = False
+
+    def __init__(self, collection: str):
+        self.collection = collection
+        self.engine = get_engine()
+        self._ensure_table()
+
+    def _ensure_table(self) -> None:
+        if SignatureIndex._table_ready:
+            return
+        with self.engine.begin() as conn:
+            for statement in SIGNATURES_TABLE_SQL:
+                conn.execute(text(statement))
+        SignatureIndex._table_ready = True
+
+    def _candidates(
+        self, signatures: List[int], exclude_rows: Optional[List[int]] = None
+    ) -> List[Tuple[int, str, str]]:
+        """
+        Fetch stored (signature, file_path, chunk_id) triples sharing at least one band with any input.
+
+        Rows written before chunk ids were recorded are ignored: a duplicate of
+        them could not be attributed to its canonical chunk.
+        """
+        bands = [sorted({_bands(s)[i] for s in signatures}) for i in range(BANDS)]
+        clauses = " OR ".join(f"band{i} = ANY(:b{i})" for i in range(BANDS))
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                text(
+                    "SELECT simhash, file_path, chunk_id FROM chunk_signatures "
+                    "WHERE collection = :collection AND canonical_file IS NULL AND chunk_id IS NOT NULL "
+                    f"AND ({clauses}) "
+                    "AND id <> ALL(:exclude_rows)"
+                ),
+                {
+                    "collection": self.collection,
+                    "exclude_rows": list(exclude_rows or []),
+                    **{f"b{i}": bands[i] for i in range(BANDS)},
+                },
+            ).all()
+        return [(_to_unsigned(row[0]), row[1], row[2]) for row in rows]
+
+    def filter_batch(
+        self, chunks: List[Document], exclude_rows: Optional[List[int]] = None
+    ) -> Tuple[List[Document], List[Tuple[int, str, str]]]:
+        """
+        Split a batch into new chunks and near-duplicates of stored (or earlier) chunks.
+
+        Kept chunks get a `simhash` metadata entry (hex), used for query-time dedup,
+        and an id (if they had none) to store them under.
+
+        Args:
+            chunks: Chunks with `file_path` metadata
+            exclude_rows: Signature rows to ignore (the previous version of a
+                file being re-ingested, which is about to be replaced; see `row_ids`)
+
+        Returns:
+            (kept chunks, [(signature, canonical file_path, canonical chunk id)]
+            for skipped chunks)
+        """
+        if not chunks:
+            return [], []
+
+        signatures = [simhash(c.page_content) for c in chunks]
+        known = self._candidates(signatures, exclude_rows)
+        max_distance = settings.DEDUP_MAX_HAMMING
+
+        kept: List[Document] = []
+        skipped: List[Tuple[int, str, str]] = []
+        for chunk, signature in zip(chunks, signatures):
+            match = next(
+                ((path, chunk_id) for s, path, chunk_id in known if hamming(signature, s) <= max_distance), None
+            )
+            if match is not None:
+                skipped.append((signature, *match))
+                continue
+            chunk.id = chunk.id or str(uuid.uuid4())
+            chunk.metadata["simhash"] = format(signature, "016x")
+            kept.append(chunk)
+            known.append((signature, chunk.metadata["file_path"], chunk.id))
+        return kept, skipped
+
+    def add(self, file_path: str, chunks: List[Document], skipped: List[Tuple[int, str, str]]) -> None:
+        """
+        Persist signatures of stored chunks and of skipped duplicates.
+
+        Args:
+            file_path: File the batch came from
+            chunks: Chunks that were stored (with `simhash` metadata and ids)
+            skipped: (signature, canonical file, canonical chunk id) from `filter_batch`
+        """
+        rows = [(int(c.metadata["simhash"], 16), None, c.id) for c in chunks] + list(skipped)
+        if not rows:
+            return
+        params = []
+        for signature, canonical, chunk_id in rows:
+            bands = _bands(signature)
+            params.append({
+                "collection": self.collection,
+                "file_path": file_path,
+                "simhash": _to_signed(signature),
+                **{f"band{i}": bands[i] for i in range(BANDS)},
+                "canonical_file": canonical,
+                "chunk_id": chunk_id,
+            })
+        with self.engine.begin() as conn:
+            conn.execute(
+                text(
+                    "INSERT INTO chunk_signatures "
+                    "(collection, file_path, simhash, band0, band1, band2, band3, canonical_file, chunk_id) "
+                    "VALUES (:collection, :file_path, :simhash, :band0, :band1, :band2, :band3, "
+                    ":canonical_file, :chunk_id)"
+                ),
+                params,
+            )
+
+    def row_ids(self, file_path: str) -> List[int]:
+        """Ids of a file's signature rows (to replace exactly these after a re-ingestion)."""
+        with self.engine.connect() as conn:
+            return list(conn.execute(
+                text("SELECT id FROM chunk_signatures WHERE collection = :collection AND file_path = :file_path"),
+                {"collection": self.collection, "file_path": file_path},
+            ).scalars().all())
+
+    def remove_file(self, file_path: str, row_ids: Optional[List[int]] = None) -> List[str]:
+        """
+        Delete a file's signatures.
+
+        Args:
+            file_path: File whose chunks were removed or are being replaced
+            row_ids: Only delete these rows (e.g. the previous version's, see
+                `row_ids`); None deletes all of the file's rows
+
+        Returns:
+            Other files that skipped chunks as duplicates of this file; they
+            should be re-ingested so that content is not lost
+        """
+        only_rows = "" if row_ids is None else "AND id = ANY(:row_ids)"
+        params = {"collection": self.collection, "file_path": file_path, "row_ids": list(row_ids or [])}
+        with self.engine.begin() as conn:
+            dependents = conn.execute(
+                text(
+                    "SELECT DISTINCT file_path FROM chunk_signatures "
+                    "WHERE collection = :collection AND canonical_file = :file_path AND file_path <> :file_path"
+                ),
+                params,
+            ).scalars().all()
+            conn.execute(
+                text(
+                    "DELETE FROM chunk_signatures "
+                    f"WHERE collection = :collection AND file_path = :file_path {only_rows}"
+                ),
+                params,
+            )
+        return list(dependents)
+
+
+def get_signature_index(collection: str) -> Optional[SignatureIndex]:
+    """
+    Get a signature index for a collection.
+
+    Returns None when DEDUP_ENABLED is off, or with VECTOR_BACKEND=local: the
+    index lives in Postgres, so only query-time dedup applies there.
+    """
+    if not settings.DEDUP_ENABLED or settings.VECTOR_BACKEND == "local":
+        return None
+    return SignatureIndex(collection)
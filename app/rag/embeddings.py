@@ -0,0 +1,116 @@
+"""
+RAG Embedding Coalescing Module
+
+Concurrent graph runs (e.g. /chat/batch) each embed one query per search.
+`CoalescingEmbeddings` merges those single-query calls into shared batches:
+1. The first caller of a round becomes the leader and waits up to
+   EMBED_BATCH_WINDOW_MS (or until EMBED_BATCH_MAX queries are queued)
+2. The leader sends all queued queries in one `embed_documents` request
+3. Every caller gets its own vector (or the request's exception) back
+4. Identical queries in flight at the same time are embedded once (single-flight)
+5. Query vectors are kept in the shared cache tier (`app.core.cache`), so a
+   repeated question skips Ollama on every API worker
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import List, Tuple
+import structlog
+from langchain_core.embeddings import Embeddings
+
+from app.core.cache import get_cache
+from app.core.config import settings
+from app.core.singleflight import SingleFlight
+
+logger = structlog.get_logger(__name__)
+
+
+class CoalescingEmbeddings(Embeddings):
+    """Wraps an embedding model, batching concurrent `embed_query` calls."""
+
+    def __init__(self, inner: Embeddings, window_ms: int = None, max_batch: int = None):
+        """
+        Args:
+            inner: Embedding model doing the actual requests
+            window_ms: How long a batch waits for more queries (defaults to EMBED_BATCH_WINDOW_MS)
+            max_batch: Queries per request (defaults to EMBED_BATCH_MAX)
+        """
+        self.inner = inner
+        self.window = (settings.EMBED_BATCH_WINDOW_MS if window_ms is None else window_ms) / 1000
+        self.max_batch = max_batch or settings.EMBED_BATCH_MAX
+        self._lock = threading.Lock()
+        self._pending: List[Tuple[str, Future]] = []
+        self._full = threading.Event()
+        self._flight = SingleFlight("embed_query")
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.inner.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.inner.aembed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        cache_key = f"{settings.EMBEDDING_MODEL}:{text}"
+        vector = get_cache().get("embed_query", cache_key)
+        if vector is None:
+            vector = self._flight.do(text, lambda: self._embed_batched(text))
+            get_cache().set("embed_query", cache_key, vector)
+        return vector
+
+    def _embed_batched(self, text: str) -> List[float]:
+        future: Future = Future()
+        with self._lock:
+            self._pending.append((text, future))
+            leader = len(self._pending) == 1
+            if len(self._pending) >= self.max_batch:
+                self._full.set()
+
+        if leader:
+            self._full.wait(self.window)
+            with self._lock:
+                batch, self._pending = self._pending, []
+                self._full.clear()
+            self._flush(batch)
+
+        return future.result()
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await asyncio.get_running_loop().run_in_executor(None, self.embed_query, text)
+
+    def _flush(self, batch: List[Tuple[str, Future]]) -> None:
+        for start in range(0, len(batch), self.max_batch):
+            part = batch[start:start + self.max_batch]
+            try:
+                vectors = self.inner.embed_documents([text for text, _ in part])
+            except Exception as e:
+                for _, future in part:
+                    future.set_exception(e)
+                continue
+            for (_, future), vector in zip(part, vectors):
+                future.set_result(vector)
+        if len(batch) > 1:
+            logger.debug("Coalesced embedding requests", queries=len(batch))
+
+
+def embed_queries(embeddings: Embeddings, texts: List[str]) -> List[List[float]]:
+    """
+    Embed several queries with one request, reusing cached query vectors.
+
+    Args:
+        embeddings: Embedding model (e.g. `get_embeddings()`)
+        texts: Query texts
+
+    Returns:
+        One vector per text
+    """
+    cache = get_cache()
+    keys = [f"{settings.EMBEDDING_MODEL}:{text}" for text in texts]
+    vectors = [cache.get("embed_query", key) for key in keys]
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+    if missing:
+        inner = embeddings.inner if isinstance(embeddings, CoalescingEmbeddings) else embeddings
+        for i, vector in zip(missing, inner.embed_documents([texts[i] for i in missing])):
+            vectors[i] = vector
+            cache.set("embed_query", keys[i], vector)
+    return vectors
@@ -3,60 +3,92 @@ RAG Ingestion Pipeline Module
 
 This module handles the complete document ingestion process:
 1. Discovers files in the raw data directory
-2. Detects file types (PDF, TXT, images)
-3. Loads and processes documents
+2. Detects file types via the loader registry (see `app.rag.loaders`)
+3. Loads and processes documents (OCR runs in a background process pool)
 4. Chunks text into manageable pieces
 5. Generates embeddings and stores in vector database
 """
 
 import os
+import uuid
 from pathlib import Path
-from typing import List, Dict, Any
+import threading
+from typing import List, Dict, Any, Iterator, Callable
 import structlog
-from langchain_community.document_loaders import (
-    PyPDFLoader,
-    TextLoader,
-    UnstructuredImageLoader,
-)
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from langchain_core.document_loaders import BaseLoader
 from langchain_core.documents import Document
 
 from app.core.config import settings
-from app.rag.store import get_vector_store
+from app.rag.store import (
+    get_vector_store,
+    get_collection_name,
+    delete_file_chunks,
+    delete_chunks,
+    file_chunk_ids,
+    mark_knowledge_base_changed,
+    set_chunk_sources,
+)
+from app.rag.local_store import LocalVectorStore
+from app.rag.manifest import IngestionManifest
+from app.rag.catalog import invalidate_catalog
+from app.rag.chunking import get_text_splitter
+from app.rag.dedup import get_signature_index
+from app.rag.loaders import get_loader_spec, supported_extensions, get_ocr_pool, OCRLoader
 
 logger = structlog.get_logger(__name__)
 
 
+class IngestionCancelled(Exception):
+    """Raised inside the pipeline when a cancellation was requested."""
+
+
 class DocumentProcessor:
     """Handles document processing and ingestion into the vector store."""
     
-    # Supported file extensions
-    SUPPORTED_EXTENSIONS = {
-        '.pdf': 'pdf',
-        '.txt': 'text',
-        '.png': 'image',
-        '.jpg': 'image',
-        '.jpeg': 'image',
-        '.gif': 'image',
-        '.bmp': 'image',
-    }
-    
-    def __init__(self):
-        """Initialize the document processor."""
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=settings.CHUNK_SIZE,
-            chunk_overlap=settings.CHUNK_OVERLAP,
-            length_function=len,
-            separators=["\n\n", "\n", " ", ""],
-        )
+    def __init__(
+        self,
+        tenant_id: str = None,
+        progress_callback: Callable[[str, Dict[str, Any]], None] = None,
+        cancel_event: threading.Event = None,
+    ):
+        """
+        Initialize the document processor.
+        
+        Args:
+            tenant_id: Tenant/namespace whose collection receives the chunks
+                (None = default collection)
+            progress_callback: Called as `callback(stage, stats)` when the stage
+                changes and after each file/batch (used by ingestion jobs)
+            cancel_event: When set, ingestion stops at the next batch boundary
+        """
+        self.tenant_id = tenant_id
+        self.progress_callback = progress_callback
+        self.cancel_event = cancel_event
+        self.root = settings.get_raw_data_dir()
+        self.manifest = IngestionManifest.for_collection(get_collection_name(tenant_id))
+        self.text_splitter = get_text_splitter()
         self.vector_store = None
+        self.signature_index = None  # Opened with the vector store (needs the database)
         self.stats = {
             'total_files': 0,
             'processed_files': 0,
             'failed_files': 0,
+            'skipped_files': 0,
+            'removed_files': 0,
             'total_chunks': 0,
+            'duplicate_chunks': 0,
         }
     
+    def _report(self, stage: str) -> None:
+        """Forward progress to the callback, if any."""
+        if self.progress_callback is not None:
+            self.progress_callback(stage, dict(self.stats))
+    
+    def _check_cancelled(self) -> None:
+        """Raise IngestionCancelled if cancellation was requested."""
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise IngestionCancelled()
+    
     def _get_file_type(self, file_path: Path) -> str:
         """
         Determine the file type based on extension.
@@ -65,49 +97,50 @@ class DocumentProcessor:
             file_path: Path to the file
             
         Returns:
-            File type string ('pdf', 'text', 'image', or 'unknown')
+            File type string from the loader registry ('pdf', 'text', 'image', ...) or 'unknown'
         """
-        extension = file_path.suffix.lower()
-        return self.SUPPORTED_EXTENSIONS.get(extension, 'unknown')
+        spec = get_loader_spec(file_path)
+        return spec.file_type if spec else 'unknown'
     
-    def _load_document(self, file_path: Path) -> List[Document]:
+    def _get_loader(self, file_path: Path) -> BaseLoader:
         """
-        Load a document based on its file type.
+        Create the document loader for a file from the loader registry.
         
         Args:
             file_path: Path to the document
             
         Returns:
-            List of loaded documents
+            Document loader instance
             
         Raises:
             ValueError: If file type is not supported
         """
-        file_type = self._get_file_type(file_path)
-        file_path_str = str(file_path)
+        spec = get_loader_spec(file_path)
+        if spec is None:
+            raise ValueError(f"Unsupported file type: {file_path.suffix}")
+        return spec.factory(str(file_path))
+    
+    def _lazy_load_document(self, file_path: Path) -> Iterator[Document]:
+        """
+        Stream a document one unit (e.g. PDF page) at a time.
         
+        Args:
+            file_path: Path to the document
+            
+        Yields:
+            Loaded documents, one per page/unit
+            
+        Raises:
+            ValueError: If file type is not supported
+        """
         logger.info(
             "Loading document",
             file=file_path.name,
-            type=file_type,
+            type=self._get_file_type(file_path),
         )
         
         try:
-            if file_type == 'pdf':
-                loader = PyPDFLoader(file_path_str)
-                return loader.load()
-            
-            elif file_type == 'text':
-                loader = TextLoader(file_path_str, encoding='utf-8')
-                return loader.load()
-            
-            elif file_type == 'image':
-                loader = UnstructuredImageLoader(file_path_str)
-                return loader.load()
-            
-            else:
-                raise ValueError(f"Unsupported file type: {file_type}")
-                
+            yield from self._get_loader(file_path).lazy_load()
         except Exception as e:
             logger.error(
                 "Failed to load document",
@@ -116,6 +149,23 @@ class DocumentProcessor:
             )
             raise
     
+    def _load_document(self, file_path: Path) -> List[Document]:
+        """
+        Load a document based on its file type.
+        
+        Materializes every page; prefer `_iter_chunk_batches` for large files.
+        
+        Args:
+            file_path: Path to the document
+            
+        Returns:
+            List of loaded documents
+            
+        Raises:
+            ValueError: If file type is not supported
+        """
+        return list(self._lazy_load_document(file_path))
+    
     def _chunk_documents(self, documents: List[Document]) -> List[Document]:
         """
         Split documents into chunks.
@@ -141,56 +191,205 @@ class DocumentProcessor:
         Returns:
             Chunks with enhanced metadata
         """
+        source_file = self._source_name(file_path)
         for chunk in chunks:
             chunk.metadata.update({
-                'source_file': file_path.name,
+                'source_file': source_file,
                 'file_type': self._get_file_type(file_path),
-                'file_path': str(file_path),
+                'file_path': str(file_path.resolve()),
             })
         return chunks
     
-    def process_file(self, file_path: Path) -> bool:
+    def _source_name(self, file_path: Path) -> str:
+        """
+        Name used as `source_file` metadata: the path relative to the ingestion
+        root (just the file name for top-level files), or the bare name for
+        files outside the root.
+        """
+        try:
+            return file_path.resolve().relative_to(self.root.resolve()).as_posix()
+        except ValueError:
+            return file_path.name
+    
+    def _iter_chunk_batches(self, file_path: Path, batch_size: int = None) -> Iterator[List[Document]]:
+        """
+        Stream a file as bounded batches of chunks with metadata attached.
+        
+        Pages are split as they are loaded, so at most one page plus one batch
+        of chunks is held in memory regardless of document size. Chunks never
+        span pages, which matches `split_documents` on the fully loaded file.
+        
+        Args:
+            file_path: Path to the file
+            batch_size: Max chunks per batch (defaults to INGEST_BATCH_SIZE)
+            
+        Yields:
+            Lists of at most `batch_size` chunks
+        """
+        batch_size = batch_size or settings.INGEST_BATCH_SIZE
+        batch: List[Document] = []
+        
+        for page in self._lazy_load_document(file_path):
+            for chunk in self.text_splitter.split_documents([page]):
+                batch.append(chunk)
+                if len(batch) >= batch_size:
+                    yield self._add_metadata(batch, file_path)
+                    batch = []
+        
+        if batch:
+            yield self._add_metadata(batch, file_path)
+    
+    def _connect(self) -> None:
+        """Open the vector store (and signature index) on first use."""
+        if self.vector_store is None:
+            self.vector_store = get_vector_store(self.tenant_id)
+            self.signature_index = get_signature_index(get_collection_name(self.tenant_id))
+    
+    def _drop_file(self, file_path: Path) -> List[str]:
+        """
+        Delete a file's chunks and signatures.
+        
+        Returns:
+            Files whose chunks were skipped as duplicates of this file
+        """
+        resolved = str(file_path.resolve())
+        removed = delete_file_chunks(self.vector_store, resolved)
+        if removed:
+            logger.info("Removed previous chunks", file=file_path.name, chunks=removed)
+            mark_knowledge_base_changed(self.tenant_id)
+        if self.signature_index is None:
+            return []
+        return self.signature_index.remove_file(resolved)
+    
+    def _drop_version(self, file_path: Path, chunk_ids: List[str], signature_rows: List[int]) -> List[str]:
+        """
+        Delete one version of a file: exactly the given chunks and signature rows.
+        
+        Returns:
+            Files whose chunks were skipped as duplicates of this file
+        """
+        removed = delete_chunks(self.vector_store, chunk_ids)
+        if removed:
+            logger.info("Removed previous chunks", file=file_path.name, chunks=removed)
+        if self.signature_index is None:
+            return []
+        return self.signature_index.remove_file(str(file_path.resolve()), row_ids=signature_rows)
+    
+    def _rollback_version(self, file_path: Path, new_ids: List[str], old_signatures: List[int]) -> None:
+        """Delete a partially stored new version of a file, keeping the previous one."""
+        try:
+            delete_chunks(self.vector_store, new_ids)
+            if self.signature_index is not None:
+                resolved = str(file_path.resolve())
+                kept = set(old_signatures)
+                partial = [row for row in self.signature_index.row_ids(resolved) if row not in kept]
+                self.signature_index.remove_file(resolved, row_ids=partial)
+        except Exception as e:
+            logger.error("Failed to roll back partial file", file=file_path.name, error=str(e))
+    
+    def flush_manifest(self) -> None:
+        """Write buffered manifest changes and refresh the file catalog."""
+        if self.manifest.flush():
+            invalidate_catalog(self.tenant_id)
+    
+    def _reingest_dependents(self, dependents: List[str]) -> None:
+        """
+        Re-ingest files that skipped chunks as duplicates of a changed/removed
+        file, so that content is stored again (or deduplicated against the new
+        version). Only one level deep, to avoid cycles between files.
+        """
+        for dependent in dependents:
+            path = Path(dependent)
+            logger.info("Re-ingesting file that relied on removed duplicates", file=path.name)
+            if path.is_file():
+                self.process_file(path, cascade=False)
+            else:
+                set_chunk_sources(self.vector_store, self._source_name(path), [])
+                self.manifest.remove(path)
+    
+    def process_file(self, file_path: Path, cascade: bool = True) -> bool:
         """
         Process a single file: load, chunk, and store.
         
+        Near-duplicates of already stored chunks are skipped before embedding
+        (when DEDUP_ENABLED); the chunks they duplicate list this file in their
+        `sources` metadata instead.
+        
+        A previous version of the file stays searchable until the new one is
+        fully stored: its chunks and signatures are deleted by id afterwards.
+        If the new version fails or is cancelled, its partial chunks are
+        deleted instead and the previous version is kept.
+        
         Args:
             file_path: Path to the file to process
+            cascade: Re-ingest files that depended on this file's previous chunks
             
         Returns:
             True if successful, False otherwise
         """
+        new_ids: List[str] = []
+        old_signatures: List[int] = []
         try:
             logger.info("Processing file", file=file_path.name)
             
-            # Load the document
-            documents = self._load_document(file_path)
-            
-            # Chunk the documents
-            chunks = self._chunk_documents(documents)
-            
-            # Add metadata
-            chunks = self._add_metadata(chunks, file_path)
-            
             # Store in vector database
-            if self.vector_store is None:
-                self.vector_store = get_vector_store()
+            self._connect()
+            resolved = str(file_path.resolve())
             
-            # Extract texts and metadatas for batch insertion
-            texts = [chunk.page_content for chunk in chunks]
-            metadatas = [chunk.metadata for chunk in chunks]
+            # The previous version of this file, replaced once the new one is stored
+            old_ids = file_chunk_ids(self.vector_store, resolved)
+            if self.signature_index is not None:
+                old_signatures = self.signature_index.row_ids(resolved)
             
-            self.vector_store.add_texts(texts=texts, metadatas=metadatas)
+            # Load, chunk and embed in bounded batches so peak memory tracks
+            # INGEST_BATCH_SIZE rather than document size
+            chunk_count = 0
+            duplicate_count = 0
+            canonical_ids: List[str] = []
+            try:
+                for batch in self._iter_chunk_batches(file_path):
+                    self._check_cancelled()
+                    skipped = []
+                    if self.signature_index is not None:
+                        batch, skipped = self.signature_index.filter_batch(batch, exclude_rows=old_signatures)
+                        duplicate_count += len(skipped)
+                        canonical_ids.extend(chunk_id for _, path, chunk_id in skipped if path != resolved)
+                    if batch:
+                        ids = [chunk.id or str(uuid.uuid4()) for chunk in batch]
+                        texts = [chunk.page_content for chunk in batch]
+                        metadatas = [chunk.metadata for chunk in batch]
+                        new_ids.extend(ids)
+                        self.vector_store.add_texts(texts=texts, metadatas=metadatas, ids=ids)
+                    if self.signature_index is not None:
+                        self.signature_index.add(resolved, batch, skipped)
+                    chunk_count += len(batch)
+                    self._report('processing')
+            except BaseException:
+                self._rollback_version(file_path, new_ids, old_signatures)
+                raise
             
+            dependents = self._drop_version(file_path, old_ids, old_signatures)
+            if self.signature_index is not None:
+                set_chunk_sources(self.vector_store, self._source_name(file_path), canonical_ids)
+            self.manifest.record(file_path, self._source_name(file_path), chunk_count)
+            if chunk_count or old_ids or canonical_ids:
+                mark_knowledge_base_changed(self.tenant_id)
+            self.stats['duplicate_chunks'] += duplicate_count
             self.stats['processed_files'] += 1
-            self.stats['total_chunks'] += len(chunks)
+            self.stats['total_chunks'] += chunk_count
             
             logger.info(
                 "File processed successfully",
                 file=file_path.name,
-                chunks=len(chunks),
+                chunks=chunk_count,
+                duplicates=duplicate_count,
             )
+            if cascade:
+                self._reingest_dependents(dependents)
             return True
             
+        except IngestionCancelled:
+            raise
         except Exception as e:
             self.stats['failed_files'] += 1
             logger.error(
@@ -200,91 +399,184 @@ class DocumentProcessor:
             )
             return False
     
-    def discover_files(self, directory: Path) -> List[Path]:
+    def remove_file(self, file_path: Path) -> bool:
+        """
+        Remove a (deleted) file's chunks from the vector store and manifest.
+        
+        Args:
+            file_path: Path the file was ingested from
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            self._connect()
+            dependents = self._drop_file(file_path)
+            if self.signature_index is not None:
+                set_chunk_sources(self.vector_store, self._source_name(file_path), [])
+            self.manifest.remove(file_path)
+            self.stats['removed_files'] += 1
+            logger.info("File removed from knowledge base", file=file_path.name)
+            self._reingest_dependents(dependents)
+            return True
+        except Exception as e:
+            logger.error("Failed to remove file", file=file_path.name, error=str(e))
+            return False
+    
+    def _prefetch_ocr(self, files: List[Path]) -> None:
+        """
+        Submit OCR jobs (images, scanned PDFs) to the OCR process pool.
+        
+        Args:
+            files: Files about to be processed
+        """
+        for file_path in files:
+            try:
+                loader = self._get_loader(file_path)
+            except Exception:
+                continue  # Reported when the file is processed
+            if isinstance(loader, OCRLoader):
+                loader.prefetch()
+    
+    def is_supported(self, file_path: Path) -> bool:
+        """Check whether a file has a registered loader."""
+        return file_path.suffix.lower() in supported_extensions()
+    
+    def discover_files(self, directory: Path, recursive: bool = True) -> List[Path]:
         """
         Discover all supported files in a directory.
         
+        Uses a single directory walk (not one glob per extension). Hidden
+        files and directories are skipped.
+        
         Args:
             directory: Directory to search
+            recursive: Also search subdirectories
             
         Returns:
-            List of file paths
+            List of file paths, sorted for a stable processing order
         """
         if not directory.exists():
             logger.warning(f"Directory does not exist: {directory}")
             return []
         
+        extensions = supported_extensions()
         files = []
-        for ext in self.SUPPORTED_EXTENSIONS.keys():
-            files.extend(directory.glob(f"*{ext}"))
+        for dirpath, dirnames, filenames in os.walk(directory):
+            # Prune in place so os.walk does not descend into hidden dirs
+            dirnames[:] = [d for d in dirnames if not d.startswith('.')] if recursive else []
+            for name in filenames:
+                if not name.startswith('.') and os.path.splitext(name)[1].lower() in extensions:
+                    files.append(Path(dirpath) / name)
+        files.sort()
         
         logger.info(f"Discovered {len(files)} files in {directory}")
         return files
     
-    def ingest_directory(self, directory: Path = None) -> Dict[str, Any]:
+    def ingest_directory(self, directory: Path = None, incremental: bool = False) -> Dict[str, Any]:
         """
-        Ingest all documents from a directory.
+        Ingest all documents from a directory (recursively).
         
         Args:
             directory: Directory to ingest from (defaults to RAW_DATA_PATH)
+            incremental: Skip files unchanged since their last ingestion
+                (per the ingestion manifest)
             
         Returns:
             Dictionary with ingestion statistics
         """
         if directory is None:
             directory = settings.get_raw_data_dir()
+        # Subdirectories of RAW_DATA_PATH keep source names relative to it
+        raw_dir = settings.get_raw_data_dir().resolve()
+        self.root = raw_dir if directory.resolve().is_relative_to(raw_dir) else directory
         
-        logger.info("Starting ingestion", directory=str(directory))
+        logger.info("Starting ingestion", directory=str(directory), incremental=incremental)
+        self._report('discovering')
         
         # Discover files
         files = self.discover_files(directory)
         self.stats['total_files'] = len(files)
         
+        if incremental:
+            pending = [f for f in files if not self.manifest.is_current(f)]
+            self.stats['skipped_files'] = len(files) - len(pending)
+            files = pending
+        
         if not files:
             logger.warning("No files found to process")
             return self.stats
         
+        # Start OCR jobs up front so they run in parallel with text-based files
+        self._prefetch_ocr(files)
+        
         # Process each file
-        for file_path in files:
-            self.process_file(file_path)
+        try:
+            for file_path in files:
+                self._check_cancelled()
+                self.process_file(file_path)
+                self._report('processing')
+        finally:
+            # Drop OCR jobs this run never collected (failed/cancelled files);
+            # the pool itself stays up for concurrent runs
+            get_ocr_pool().discard([str(f) for f in files])
+            self.flush_manifest()
+        
+        # The embedded store's IVF lists are trained on the whole collection
+        if isinstance(self.vector_store, LocalVectorStore) and settings.LOCAL_INDEX_IVF_LISTS > 0:
+            self.vector_store.build_ivf()
         
         logger.info(
             "Ingestion complete",
             total_files=self.stats['total_files'],
             processed=self.stats['processed_files'],
             failed=self.stats['failed_files'],
+            skipped=self.stats['skipped_files'],
             total_chunks=self.stats['total_chunks'],
+            duplicate_chunks=self.stats['duplicate_chunks'],
         )
         
         return self.stats
 
 
-def ingest_documents(directory: Path = None) -> Dict[str, Any]:
+def ingest_documents(directory: Path = None, tenant_id: str = None, incremental: bool = False) -> Dict[str, Any]:
     """
     Main entry point for document ingestion.
     
     Args:
         directory: Directory to ingest from (defaults to RAW_DATA_PATH)
+        tenant_id: Tenant/namespace to ingest into (None = default collection)
+        incremental: Skip files unchanged since their last ingestion
         
     Returns:
         Dictionary with ingestion statistics
     """
-    processor = DocumentProcessor()
-    return processor.ingest_directory(directory)
+    processor = DocumentProcessor(tenant_id=tenant_id)
+    return processor.ingest_directory(directory, incremental=incremental)
 
 
 if __name__ == "__main__":
     # Allow running this module directly for testing
-    import sys
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Ingest documents into the vector store.")
+    parser.add_argument("directory", nargs="?", type=Path, help="Directory to ingest (default: RAW_DATA_PATH)")
+    parser.add_argument("--tenant", help="Tenant/namespace collection to ingest into")
+    parser.add_argument("--incremental", action="store_true", help="Skip files unchanged since the last run")
+    parser.add_argument("--watch", action="store_true", help="Keep running and ingest file changes as they happen")
+    args = parser.parse_args()
+    
+    if args.watch:
+        from app.rag.watcher import watch_directory
+        watch_directory(args.directory, tenant_id=args.tenant)
+        raise SystemExit(0)
     
-    if len(sys.argv) > 1:
-        custom_dir = Path(sys.argv[1])
-        stats = ingest_documents(custom_dir)
-    else:
-        stats = ingest_documents()
+    stats = ingest_documents(args.directory, tenant_id=args.tenant, incremental=args.incremental)
     
     print("\n=== Ingestion Statistics ===")
     print(f"Total files: {stats['total_files']}")
     print(f"Processed: {stats['processed_files']}")
+    print(f"Skipped (unchanged): {stats['skipped_files']}")
     print(f"Failed: {stats['failed_files']}")
     print(f"Total chunks: {stats['total_chunks']}")
+    print(f"Skipped near-duplicate chunks: {stats['duplicate_chunks']}")
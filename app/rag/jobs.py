@@ -0,0 +1,258 @@
+"""
+RAG Ingestion Jobs Module
+
+Runs ingestion as background jobs for the API:
+1. `submit()` persists a 'queued' job and returns immediately
+2. The `ingestion_jobs` table is the queue: every API worker polls it and claims
+   jobs in order (`FOR UPDATE SKIP LOCKED`), with at most INGEST_JOB_WORKERS
+   running across all API workers, so jobs queue up instead of competing for Ollama
+3. Each job runs `DocumentProcessor` in a worker thread, outside the event loop
+4. Stage, per-file progress and throughput are persisted to `ingestion_jobs`
+5. Jobs can be cancelled while queued or running, through any API worker: the
+   request is a flag in the table, seen by the running worker on its heartbeat
+6. Running jobs whose worker stops heartbeating are failed by the other workers
+"""
+
+import asyncio
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional
+import structlog
+
+from app.core.config import settings
+from app.core.database import (
+    create_ingestion_job,
+    update_ingestion_job,
+    claim_ingestion_job,
+    heartbeat_ingestion_jobs,
+    request_ingestion_job_cancel,
+    count_queued_ingestion_jobs,
+    fail_interrupted_ingestion_jobs,
+)
+
+logger = structlog.get_logger(__name__)
+
+# Minimum seconds between progress writes to Postgres for a running job
+PROGRESS_INTERVAL = 1.0
+
+
+def resolve_ingest_directory(directory: Optional[str]) -> Path:
+    """
+    Resolve a job directory, which must stay inside RAW_DATA_PATH.
+
+    Args:
+        directory: Subdirectory relative to RAW_DATA_PATH (None = the whole directory)
+
+    Returns:
+        Resolved directory path
+
+    Raises:
+        ValueError: If the directory escapes RAW_DATA_PATH or does not exist
+    """
+    raw_dir = settings.get_raw_data_dir().resolve()
+    target = (raw_dir / directory).resolve() if directory else raw_dir
+    if not target.is_relative_to(raw_dir):
+        raise ValueError(f"Directory must be inside {settings.RAW_DATA_PATH}")
+    if not target.is_dir():
+        raise ValueError(f"Directory not found: {directory}")
+    return target
+
+
+def _with_throughput(stats: Dict[str, Any], started: float) -> Dict[str, Any]:
+    """Add elapsed time and files/chunks per second to a stats snapshot."""
+    elapsed = max(time.monotonic() - started, 1e-6)
+    done = stats.get('processed_files', 0) + stats.get('failed_files', 0)
+    return {
+        **stats,
+        'elapsed_seconds': round(elapsed, 2),
+        'files_per_second': round(done / elapsed, 3),
+        'chunks_per_second': round(stats.get('total_chunks', 0) / elapsed, 2),
+    }
+
+
+class IngestionJobManager:
+    """This API worker's share of the Postgres-backed ingestion job queue."""
+
+    def __init__(self, workers: int = None):
+        self.workers = workers or settings.INGEST_JOB_WORKERS
+        # Identifies this process as the owner of the jobs it claims
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._tasks: list[asyncio.Task] = []
+        self._cancel_events: Dict[str, threading.Event] = {}
+        self._wake: Optional[asyncio.Event] = None
+        self._queue_depth = 0
+
+    async def start(self):
+        """Fail jobs orphaned by a dead worker and start polling the queue."""
+        await fail_interrupted_ingestion_jobs(settings.INGEST_JOB_STALE_SECONDS)
+        self._wake = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._worker(i)) for i in range(self.workers)
+        ]
+        self._tasks.append(asyncio.create_task(self._heartbeat()))
+        logger.info("Ingestion job workers started", workers=self.workers, owner=self.owner)
+
+    async def stop(self):
+        """Signal running jobs to cancel and stop the workers."""
+        for event in self._cancel_events.values():
+            event.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, directory: Optional[str] = None, tenant_id: str = None, incremental: bool = False) -> str:
+        """
+        Queue an ingestion job.
+
+        Args:
+            directory: Subdirectory of RAW_DATA_PATH to ingest (None = all)
+            tenant_id: Tenant/namespace to ingest into
+            incremental: Skip files unchanged since their last ingestion
+
+        Returns:
+            The new job id
+
+        Raises:
+            ValueError: If the directory is invalid
+        """
+        path = resolve_ingest_directory(directory)
+        job_id = str(uuid.uuid4())
+        await create_ingestion_job(job_id, str(path), tenant_id, incremental)
+        self._queue_depth += 1
+        # Idle workers of this process pick it up now; others on their next poll
+        self._wake.set()
+        logger.info("Ingestion job queued", job_id=job_id, directory=str(path))
+        return job_id
+
+    async def cancel(self, job_id: str) -> bool:
+        """
+        Request cancellation of a queued or running job (on any API worker).
+
+        Returns:
+            True if the job was pending and will be cancelled
+        """
+        if not await request_ingestion_job_cancel(job_id):
+            return False
+        # Running here: stop at once instead of on the next heartbeat
+        event = self._cancel_events.get(job_id)
+        if event is not None:
+            event.set()
+        return True
+
+    def queue_depth(self) -> int:
+        """Number of jobs waiting for a worker (all API workers, as of the last heartbeat)."""
+        return self._queue_depth
+
+    async def _heartbeat(self):
+        """Keep this worker's jobs alive, deliver cancellations and fail jobs of dead workers."""
+        while True:
+            await asyncio.sleep(settings.INGEST_JOB_HEARTBEAT_SECONDS)
+            try:
+                for job_id in await heartbeat_ingestion_jobs(self.owner):
+                    event = self._cancel_events.get(job_id)
+                    if event is not None:
+                        event.set()
+                await fail_interrupted_ingestion_jobs(settings.INGEST_JOB_STALE_SECONDS)
+                self._queue_depth = await count_queued_ingestion_jobs()
+            except Exception as e:
+                logger.warning("Ingestion job heartbeat failed", error=str(e))
+
+    async def _worker(self, worker_id: int):
+        while True:
+            try:
+                job = await claim_ingestion_job(
+                    self.owner, settings.INGEST_JOB_WORKERS, settings.INGEST_JOB_STALE_SECONDS
+                )
+            except Exception as e:
+                logger.warning("Failed to claim ingestion job", worker=worker_id, error=str(e))
+                job = None
+            if job is None:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=settings.INGEST_JOB_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            job_id = job["id"]
+            self._queue_depth = max(self._queue_depth - 1, 0)
+            self._cancel_events[job_id] = threading.Event()
+            try:
+                await self._run(job_id, Path(job["directory"]), job["tenant_id"], job["incremental"])
+            except Exception as e:
+                logger.error("Ingestion job crashed", job_id=job_id, error=str(e))
+                try:
+                    await update_ingestion_job(job_id, status="failed", error=str(e), finished_at=datetime.now(timezone.utc))
+                except Exception:
+                    pass  # Failed by another worker once its heartbeat expires
+            finally:
+                self._cancel_events.pop(job_id, None)
+
+    async def _run(self, job_id: str, path: Path, tenant_id: Optional[str], incremental: bool):
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        last_write = 0.0
+
+        def on_progress(stage: str, stats: Dict[str, Any]):
+            # Runs in the ingestion thread; throttle DB writes except for stage changes
+            nonlocal last_write
+            now = time.monotonic()
+            if stage == "processing" and now - last_write < PROGRESS_INTERVAL:
+                return
+            last_write = now
+            future = asyncio.run_coroutine_threadsafe(
+                update_ingestion_job(job_id, stage=stage, progress=_with_throughput(stats, started)),
+                loop,
+            )
+            try:
+                future.result(timeout=10)
+            except Exception as e:
+                # Progress is informational: a slow or failed write must not fail the file or the job
+                future.cancel()
+                logger.warning("Failed to record ingestion progress", job_id=job_id, stage=stage, error=repr(e))
+
+        # Imported on first job: the ingestion pipeline is not needed to serve chat
+        from app.rag.ingestion import DocumentProcessor, IngestionCancelled
+
+        processor = DocumentProcessor(
+            tenant_id=tenant_id,
+            progress_callback=on_progress,
+            cancel_event=self._cancel_events[job_id],
+        )
+
+        logger.info("Ingestion job started", job_id=job_id)
+
+        try:
+            stats = await asyncio.to_thread(processor.ingest_directory, path, incremental)
+            status, error = "completed", None
+        except IngestionCancelled:
+            stats, status, error = processor.stats, "cancelled", None
+        except Exception as e:
+            stats, status, error = processor.stats, "failed", str(e)
+
+        await update_ingestion_job(
+            job_id,
+            status=status,
+            stage="done",
+            progress=_with_throughput(stats, started),
+            error=error,
+            finished_at=datetime.now(timezone.utc),
+        )
+        logger.info("Ingestion job finished", job_id=job_id, status=status)
+
+
+_job_manager: Optional[IngestionJobManager] = None
+
+
+def get_job_manager() -> IngestionJobManager:
+    """Get or create the ingestion job manager."""
+    global _job_manager
+    if _job_manager is None:
+        _job_manager = IngestionJobManager()
+    return _job_manager
@@ -0,0 +1,342 @@
+"""
+Document Loader Registry Module
+
+Maps file extensions to LangChain document loaders:
+1. Built-in loaders for PDF, TXT, Markdown, HTML, DOCX, CSV, JSONL logs and images
+2. Third-party loaders registered through the `agent_empty.document_loaders`
+   entry-point group (entry point name = extension, value = loader class/factory)
+3. OCR (images and scanned PDFs) runs in a process pool with per-file timeouts;
+   a job that times out has its worker killed (the pool is restarted)
+"""
+
+import json
+import threading
+from concurrent.futures import BrokenExecutor, Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from importlib.metadata import entry_points
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional
+import structlog
+from langchain_core.document_loaders import BaseLoader
+from langchain_core.documents import Document
+
+from app.core.config import settings
+
+logger = structlog.get_logger(__name__)
+
+ENTRY_POINT_GROUP = "agent_empty.document_loaders"
+
+# A PDF is treated as having a text layer if its first pages yield this much text
+PDF_TEXT_SAMPLE_PAGES = 3
+PDF_TEXT_MIN_CHARS = 20
+
+
+class LoaderSpec(NamedTuple):
+    """Registry entry: a file type label and a factory building its loader."""
+    file_type: str
+    factory: Callable[[str], BaseLoader]
+
+
+_registry: Dict[str, LoaderSpec] = {}
+_entry_points_loaded = False
+
+
+def register_loader(extensions: List[str], file_type: str, factory: Callable[[str], BaseLoader]) -> None:
+    """
+    Register a loader factory for one or more file extensions.
+
+    Args:
+        extensions: Extensions including the dot (e.g. ['.md', '.markdown'])
+        file_type: Label stored in chunk metadata (e.g. 'markdown')
+        factory: Callable taking a file path string and returning a BaseLoader
+    """
+    for ext in extensions:
+        _registry[ext.lower()] = LoaderSpec(file_type, factory)
+
+
+def _load_entry_point_loaders() -> None:
+    """Register loaders advertised by installed packages (once per process)."""
+    global _entry_points_loaded
+    if _entry_points_loaded:
+        return
+    _entry_points_loaded = True
+
+    for ep in entry_points(group=ENTRY_POINT_GROUP):
+        ext = ep.name if ep.name.startswith(".") else f".{ep.name}"
+        try:
+            register_loader([ext], ext.lstrip("."), ep.load())
+            logger.info("Registered plugin loader", extension=ext, entry_point=ep.value)
+        except Exception as e:
+            logger.warning("Failed to load plugin loader", extension=ext, error=str(e))
+
+
+def get_loader_spec(file_path: Path) -> Optional[LoaderSpec]:
+    """
+    Look up the registry entry for a file.
+
+    Args:
+        file_path: Path to the file
+
+    Returns:
+        LoaderSpec, or None if the extension is not supported
+    """
+    _load_entry_point_loaders()
+    return _registry.get(file_path.suffix.lower())
+
+
+def supported_extensions() -> Dict[str, str]:
+    """
+    Get all supported extensions.
+
+    Returns:
+        Mapping of extension to file type label
+    """
+    _load_entry_point_loaders()
+    return {ext: spec.file_type for ext, spec in _registry.items()}
+
+
+# --- OCR ---
+
+def _run_ocr(file_path: str, kind: str) -> List[Document]:
+    """Run OCR on a file. Executed inside an OCR worker process."""
+    if kind == "pdf":
+        from langchain_community.document_loaders import UnstructuredPDFLoader
+        return UnstructuredPDFLoader(file_path, strategy="ocr_only").load()
+
+    from langchain_community.document_loaders import UnstructuredImageLoader
+    return UnstructuredImageLoader(file_path).load()
+
+
+def _kill_workers(executor: ProcessPoolExecutor) -> None:
+    """Shut an executor down, killing its worker processes even mid-job."""
+    kill_workers = getattr(executor, "kill_workers", None)  # Python 3.14+
+    if kill_workers is not None:
+        kill_workers()
+        return
+    processes = list((executor._processes or {}).values())
+    executor.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.kill()
+
+
+class OCRPool:
+    """
+    Process pool running OCR jobs off the ingestion thread.
+
+    Jobs are keyed by file path so a file can be prefetched (submitted early,
+    while other files are processed) and collected later by its loader.
+    A running job cannot be cancelled, so a timeout kills the workers and
+    restarts the pool; the other unfinished jobs are resubmitted and their
+    waiters switch to the new futures.
+    """
+
+    def __init__(self, max_workers: int, timeout: float):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._futures: Dict[str, Future] = {}
+        self._kinds: Dict[str, str] = {}
+        # Ingestion job threads share the pool
+        self._lock = threading.Lock()
+
+    def _submit(self, file_path: str, kind: str) -> Future:
+        """Submit a job (lock held)."""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        self._futures[file_path] = self._executor.submit(_run_ocr, file_path, kind)
+        self._kinds[file_path] = kind
+        return self._futures[file_path]
+
+    def _forget(self, file_path: str) -> Optional[Future]:
+        """Drop a job's bookkeeping (lock held)."""
+        self._kinds.pop(file_path, None)
+        return self._futures.pop(file_path, None)
+
+    def submit(self, file_path: str, kind: str) -> Future:
+        """Submit an OCR job unless one is already pending for this file."""
+        with self._lock:
+            future = self._futures.get(file_path)
+            return future if future is not None else self._submit(file_path, kind)
+
+    def _restart(self, timed_out: str) -> None:
+        """Kill the workers (one is stuck on `timed_out`) and resubmit the other unfinished jobs."""
+        with self._lock:
+            self._forget(timed_out)
+            if self._executor is None:
+                return
+            unfinished = {path: self._kinds[path] for path, future in self._futures.items() if not future.done()}
+            _kill_workers(self._executor)
+            self._executor = None
+            for path, kind in unfinished.items():
+                self._submit(path, kind)
+        logger.warning("OCR pool restarted after a timeout", file=timed_out, resubmitted=len(unfinished))
+
+    def result(self, file_path: str, kind: str) -> List[Document]:
+        """
+        Wait for a file's OCR result.
+
+        Raises:
+            TimeoutError: If OCR does not finish within the per-file timeout
+        """
+        future = self.submit(file_path, kind)
+        try:
+            while True:
+                try:
+                    return future.result(timeout=self.timeout)
+                except BrokenExecutor:
+                    # Killed by another file's timeout: wait for the resubmitted job
+                    with self._lock:
+                        current = self._futures.get(file_path)
+                    if current is None or current is future:
+                        raise
+                    future = current
+        except FutureTimeoutError:
+            if not future.cancel():
+                # Already running: only killing its worker stops it
+                self._restart(file_path)
+            raise TimeoutError(f"OCR timed out after {self.timeout}s: {file_path}")
+        finally:
+            with self._lock:
+                # A copy resubmitted by a restart after this job finished is not needed
+                stale = self._forget(file_path)
+            if stale is not None and stale is not future:
+                stale.cancel()
+
+    def discard(self, file_paths: List[str]) -> None:
+        """Cancel and forget jobs for these files that were never collected."""
+        with self._lock:
+            for file_path in file_paths:
+                future = self._forget(file_path)
+                if future is not None:
+                    future.cancel()
+
+    def shutdown(self) -> None:
+        """Stop the worker processes, dropping jobs that have not started."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+            self._futures.clear()
+            self._kinds.clear()
+
+
+_ocr_pool: Optional[OCRPool] = None
+
+
+def get_ocr_pool() -> OCRPool:
+    """Get or create the shared OCR pool."""
+    global _ocr_pool
+    if _ocr_pool is None:
+        _ocr_pool = OCRPool(
+            max_workers=settings.OCR_WORKERS,
+            timeout=settings.OCR_TIMEOUT_SECONDS,
+        )
+    return _ocr_pool
+
+
+class OCRLoader(BaseLoader):
+    """Loader delegating to the OCR pool ('image' or scanned 'pdf')."""
+
+    def __init__(self, file_path: str, kind: str = "image"):
+        self.file_path = file_path
+        self.kind = kind
+
+    def prefetch(self) -> None:
+        """Start OCR in the background so it overlaps with other work."""
+        get_ocr_pool().submit(self.file_path, self.kind)
+
+    def lazy_load(self) -> Iterator[Document]:
+        yield from get_ocr_pool().result(self.file_path, self.kind)
+
+
+# --- Built-in loaders ---
+
+class JSONLinesLoader(BaseLoader):
+    """
+    Loader for JSONL log files: one Document per line.
+
+    The line is kept verbatim as content; malformed lines are kept as text so
+    partially corrupted logs are still searchable.
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+
+    def lazy_load(self) -> Iterator[Document]:
+        with open(self.file_path, encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                metadata = {"source": self.file_path, "line": line_number}
+                try:
+                    record = json.loads(line)
+                    if isinstance(record, dict) and "level" in record:
+                        metadata["level"] = str(record["level"])
+                except json.JSONDecodeError:
+                    pass
+                yield Document(page_content=line, metadata=metadata)
+
+
+def pdf_has_text_layer(file_path: str) -> bool:
+    """
+    Check whether a PDF has extractable text (i.e. is not a pure scan).
+
+    Only the first few pages are sampled to keep the check cheap.
+    """
+    from pypdf import PdfReader
+
+    try:
+        reader = PdfReader(file_path)
+        text = ""
+        for page in reader.pages[:PDF_TEXT_SAMPLE_PAGES]:
+            text += page.extract_text() or ""
+            if len(text.strip()) >= PDF_TEXT_MIN_CHARS:
+                return True
+        return False
+    except Exception as e:
+        # Let the regular loader surface the real error
+        logger.warning("Failed to inspect PDF text layer", file=file_path, error=str(e))
+        return True
+
+
+def _pdf_loader(file_path: str) -> BaseLoader:
+    """Use the text layer when present; fall back to OCR for scanned PDFs."""
+    if pdf_has_text_layer(file_path):
+        from langchain_community.document_loaders import PyPDFLoader
+        return PyPDFLoader(file_path)
+    return OCRLoader(file_path, kind="pdf")
+
+
+def _text_loader(file_path: str) -> BaseLoader:
+    from langchain_community.document_loaders import TextLoader
+    return TextLoader(file_path, encoding="utf-8")
+
+
+def _markdown_loader(file_path: str) -> BaseLoader:
+    from langchain_community.document_loaders import UnstructuredMarkdownLoader
+    return UnstructuredMarkdownLoader(file_path)
+
+
+def _html_loader(file_path: str) -> BaseLoader:
+    from langchain_community.document_loaders import UnstructuredHTMLLoader
+    return UnstructuredHTMLLoader(file_path)
+
+
+def _docx_loader(file_path: str) -> BaseLoader:
+    from langchain_community.document_loaders import UnstructuredWordDocumentLoader
+    return UnstructuredWordDocumentLoader(file_path)
+
+
+def _csv_loader(file_path: str) -> BaseLoader:
+    from langchain_community.document_loaders import CSVLoader
+    return CSVLoader(file_path, encoding="utf-8")
+
+
+register_loader(['.pdf'], 'pdf', _pdf_loader)
+register_loader(['.txt'], 'text', _text_loader)
+register_loader(['.md', '.markdown'], 'markdown', _markdown_loader)
+register_loader(['.html', '.htm'], 'html', _html_loader)
+register_loader(['.docx'], 'docx', _docx_loader)
+register_loader(['.csv'], 'csv', _csv_loader)
+register_loader(['.jsonl'], 'jsonl', JSONLinesLoader)
+register_loader(['.png', '.jpg', '.jpeg', '.gif', '.bmp'], 'image', OCRLoader)
@@ -0,0 +1,523 @@
+"""
+RAG Embedded Vector Store Module
+
+In-process alternative to PGVector (`VECTOR_BACKEND=local`) for development,
+CI and edge deployments without Postgres:
+1. Vectors are L2-normalized float32 rows appended to a raw `vectors.f32` file
+   and opened with `np.memmap`, so startup does not copy or parse them
+2. Texts and metadata live in an append-only `metadata.jsonl` sidecar
+   (one line per row; `{"deleted": [...]}` lines are tombstones)
+3. Search is a batched matrix product over the mapped rows with
+   `argpartition` top-k; with LOCAL_INDEX_IVF_LISTS > 0 an IVF index
+   (numpy k-means) restricts each query to its LOCAL_INDEX_IVF_PROBES
+   closest lists; the list of every row is persisted (`assignments.i32`)
+4. Several processes (API workers, the ingestion CLI) can share a collection:
+   writers serialize on a file lock, and every search first picks up rows,
+   tombstones and IVF lists appended by others since the last one
+5. Exposes the LangChain `VectorStore` interface (`add_texts`,
+   `similarity_search`, ...) and PGVector's `$in`/equality metadata filters,
+   so the agent and ingestion code are unchanged
+"""
+
+import json
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+import structlog
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from app.core.config import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process use only
+    fcntl = None
+
+logger = structlog.get_logger(__name__)
+
+VECTORS_FILE = "vectors.f32"
+METADATA_FILE = "metadata.jsonl"
+CENTROIDS_FILE = "centroids.npy"
+ASSIGNMENTS_FILE = "assignments.i32"
+LOCK_FILE = "write.lock"
+
+# Rows scored per matrix product; bounds temporary memory on large indexes
+SCAN_BLOCK_ROWS = 65536
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE_ROWS = 50_000
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _matches(metadata: Dict[str, Any], search_filter: Dict[str, Any]) -> bool:
+    """Evaluate the subset of PGVector filters used in this repo (`$in`, `$eq`, equality)."""
+    for key, condition in search_filter.items():
+        value = metadata.get(key)
+        if isinstance(condition, dict):
+            if "$in" in condition and value not in condition["$in"]:
+                return False
+            if "$eq" in condition and value != condition["$eq"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class LocalVectorStore(VectorStore):
+    """Memory-mapped NumPy vector index with a JSONL metadata sidecar."""
+
+    def __init__(self, embeddings: Embeddings, collection_name: str, path: Path = None, dimensions: int = None):
+        """
+        Open (or create) a collection.
+
+        Args:
+            embeddings: Embedding model used for texts and queries
+            collection_name: Collection name (one directory per collection)
+            path: Base directory (defaults to LOCAL_INDEX_PATH)
+            dimensions: Vector size (defaults to VECTOR_DIMENSIONS)
+        """
+        self._embeddings = embeddings
+        self.collection_name = collection_name
+        self.dimensions = dimensions or settings.VECTOR_DIMENSIONS
+        self.directory = Path(path or settings.LOCAL_INDEX_PATH) / collection_name
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._ids: List[str] = []
+        self._texts: List[str] = []
+        self._metadatas: List[Dict[str, Any]] = []
+        self._alive = np.zeros(0, dtype=bool)
+        self._vectors = np.zeros((0, self.dimensions), dtype=np.float32)
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments: Optional[np.ndarray] = None
+        # What was read so far, to only parse what other processes appended since
+        self._metadata_offset = 0
+        self._metadata_ino: Optional[int] = None
+        self._centroids_signature: Optional[Tuple[int, int, int]] = None
+        self._load()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embeddings
+
+    # --- Persistence ---
+
+    def _reset(self) -> None:
+        """Forget everything read so far (lock held)."""
+        self._ids, self._texts, self._metadatas = [], [], []
+        self._alive = np.zeros(0, dtype=bool)
+        self._vectors = self._mapped = np.zeros((0, self.dimensions), dtype=np.float32)
+        self._metadata_offset = 0
+        self._metadata_ino = None
+        self._centroids_signature = None
+        self._centroids = self._assignments = None
+
+    def _load(self) -> None:
+        with self._lock:
+            self._reset()
+            self._refresh()
+        logger.info("Local vector store loaded", collection=self.collection_name, rows=int(self._alive.sum()))
+
+    def _refresh(self) -> None:
+        """
+        Pick up rows, tombstones and IVF lists written since the last refresh,
+        by this or another process (lock held).
+
+        Only the metadata appended since then is parsed; a file that was
+        replaced or truncated (`delete_collection`) is read from scratch.
+        """
+        metadata_path = self.directory / METADATA_FILE
+        try:
+            stat = metadata_path.stat()
+        except FileNotFoundError:
+            stat = None
+        if stat is None or stat.st_ino != self._metadata_ino or stat.st_size < self._metadata_offset:
+            if self._metadata_ino is not None:
+                self._reset()
+            self._metadata_ino = stat.st_ino if stat else None
+        if stat is not None and stat.st_size > self._metadata_offset:
+            self._read_metadata(metadata_path)
+
+        self._map_vectors()
+        # Vectors are written before their sidecar lines: rows not described yet are left out
+        rows = min(len(self._ids), len(self._mapped))
+        del self._ids[rows:], self._texts[rows:], self._metadatas[rows:]
+        self._alive = self._alive[:rows]
+        self._vectors = self._mapped[:rows]
+        self._refresh_ivf()
+
+    def _read_metadata(self, metadata_path: Path) -> None:
+        """Parse the sidecar lines after `_metadata_offset` (lock held)."""
+        deleted = []
+        with open(metadata_path, "rb") as f:
+            f.seek(self._metadata_offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # Still being written; read on the next refresh
+                self._metadata_offset += len(line)
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if "deleted" in entry:
+                    deleted.extend(entry["deleted"])
+                    continue
+                self._ids.append(entry["id"])
+                self._texts.append(entry["text"])
+                self._metadatas.append(entry["metadata"])
+        added = len(self._ids) - len(self._alive)
+        if added:
+            self._alive = np.concatenate([self._alive, np.ones(added, dtype=bool)])
+        if deleted:
+            self._alive[[row for row in deleted if row < len(self._alive)]] = False
+
+    def _map_vectors(self) -> None:
+        """(Re)map the whole rows of the vectors file read-only when it grew; no data is copied."""
+        vectors_path = self.directory / VECTORS_FILE
+        row_bytes = self.dimensions * np.dtype(np.float32).itemsize
+        rows = vectors_path.stat().st_size // row_bytes if vectors_path.exists() else 0
+        if rows == len(self._mapped):
+            return
+        if rows == 0:
+            self._mapped = np.zeros((0, self.dimensions), dtype=np.float32)
+            return
+        # A row still being appended (or torn by a crash) is left out
+        self._mapped = np.memmap(vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dimensions))
+
+    def _append_metadata(self, lines: Iterable[Dict[str, Any]]) -> None:
+        with open(self.directory / METADATA_FILE, "a", encoding="utf-8") as f:
+            for line in lines:
+                f.write(json.dumps(line, ensure_ascii=False) + "\n")
+
+    def _truncate_tail(self) -> None:
+        """
+        Cut what a crashed writer left past the last described row: vector
+        rows (or a partial row) without a sidecar line, their assignments and
+        a partial last sidecar line (write lock held). New rows are then
+        appended right after the last described one, so row numbers in the
+        vectors file and the sidecar stay aligned.
+        """
+        rows = len(self._ids)
+        for name, size in (
+            (VECTORS_FILE, rows * self.dimensions * np.dtype(np.float32).itemsize),
+            (ASSIGNMENTS_FILE, rows * np.dtype(np.int32).itemsize),
+            (METADATA_FILE, self._metadata_offset),
+        ):
+            path = self.directory / name
+            if path.exists() and path.stat().st_size > size:
+                logger.warning("Trimming torn local index tail", collection=self.collection_name, file=name)
+                os.truncate(path, size)
+
+    @contextmanager
+    def _write_lock(self) -> Iterator[None]:
+        """
+        Serialize writers across processes, so vector rows and metadata lines
+        stay in the same order. Readers take no lock.
+        """
+        with self._lock, open(self.directory / LOCK_FILE, "w") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            self._refresh()
+            yield
+
+    # --- IVF ---
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        """Closest centroid per row, computed block by block."""
+        assignments = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), SCAN_BLOCK_ROWS):
+            block = vectors[start:start + SCAN_BLOCK_ROWS]
+            assignments[start:start + len(block)] = np.argmax(block @ self._centroids.T, axis=1)
+        return assignments
+
+    def _stored_assignment_count(self) -> int:
+        path = self.directory / ASSIGNMENTS_FILE
+        return path.stat().st_size // np.dtype(np.int32).itemsize if path.exists() else 0
+
+    def _stored_assignments(self, start: int, stop: int) -> np.ndarray:
+        """Persisted list assignments of rows [start, stop), as many as are stored."""
+        count = max(0, min(stop, self._stored_assignment_count()) - start)
+        if count == 0:
+            return np.zeros(0, dtype=np.int32)
+        offset = start * np.dtype(np.int32).itemsize
+        return np.fromfile(self.directory / ASSIGNMENTS_FILE, dtype=np.int32, count=count, offset=offset)
+
+    def _refresh_ivf(self) -> None:
+        """Load new centroids and the list assignments of new rows (lock held)."""
+        centroids_path = self.directory / CENTROIDS_FILE
+        signature = None
+        if settings.LOCAL_INDEX_IVF_LISTS > 0 and centroids_path.exists():
+            stat = centroids_path.stat()
+            signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if signature != self._centroids_signature:
+            self._centroids_signature = signature
+            self._centroids = np.load(centroids_path) if signature else None
+            self._assignments = None
+        if self._centroids is None:
+            self._assignments = None
+            return
+
+        known = 0 if self._assignments is None else len(self._assignments)
+        rows = len(self._vectors)
+        if known >= rows:
+            self._assignments = self._assignments[:rows]
+            return
+        # Persisted assignments first; only rows stored without one are assigned here
+        stored = self._stored_assignments(known, rows)
+        computed = self._assign(self._vectors[known + len(stored):rows])
+        parts = [] if self._assignments is None else [self._assignments]
+        self._assignments = np.concatenate(parts + [stored, computed]).astype(np.int32)
+
+    def build_ivf(self, lists: int = None) -> None:
+        """
+        Train the IVF centroids (spherical k-means on a sample) and assign all rows.
+
+        Centroids and assignments are persisted, so opening the collection
+        does not recompute them.
+
+        Args:
+            lists: Number of inverted lists (defaults to LOCAL_INDEX_IVF_LISTS)
+        """
+        lists = lists or settings.LOCAL_INDEX_IVF_LISTS
+        with self._write_lock():
+            live = np.flatnonzero(self._alive)
+            if lists <= 0 or len(live) < lists:
+                return
+            rng = np.random.default_rng(0)
+            sample = self._vectors[np.sort(rng.choice(live, min(len(live), KMEANS_SAMPLE_ROWS), replace=False))]
+            centroids = sample[rng.choice(len(sample), lists, replace=False)].copy()
+            for _ in range(KMEANS_ITERATIONS):
+                labels = np.argmax(sample @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, labels, sample)
+                empty = np.bincount(labels, minlength=lists) == 0
+                sums[empty] = centroids[empty]
+                centroids = _normalize(sums)
+
+            self._centroids = centroids.astype(np.float32)
+            assignments = self._assign(self._vectors)
+            # Assignments first: readers pair the new centroids with them
+            tmp_path = self.directory / f"{ASSIGNMENTS_FILE}.tmp"
+            assignments.tofile(tmp_path)
+            os.replace(tmp_path, self.directory / ASSIGNMENTS_FILE)
+            tmp_path = self.directory / f"{CENTROIDS_FILE}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, self._centroids)
+            os.replace(tmp_path, self.directory / CENTROIDS_FILE)
+            self._centroids_signature = None
+            self._refresh_ivf()
+        logger.info("IVF index built", collection=self.collection_name, lists=lists, rows=len(live))
+
+    # --- VectorStore interface ---
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        return self.add_embeddings(texts, self.embeddings.embed_documents(texts), metadatas, ids)
+
+    def add_embeddings(
+        self,
+        texts: Sequence[str],
+        embeddings: Sequence[Sequence[float]],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+    ) -> List[str]:
+        """
+        Append precomputed embeddings.
+
+        Args:
+            texts: Chunk texts
+            embeddings: One vector per text
+            metadatas: Optional metadata per text
+            ids: Optional ids (random UUIDs otherwise)
+
+        Returns:
+            Ids of the added rows
+        """
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        vectors = _normalize(np.asarray(embeddings, dtype=np.float32).reshape(len(texts), self.dimensions))
+
+        with self._write_lock():
+            self._truncate_tail()
+            first_row = len(self._ids)
+            with open(self.directory / VECTORS_FILE, "ab") as f:
+                f.write(vectors.astype(np.float32).tobytes())
+            if self._centroids is not None and self._stored_assignment_count() == first_row:
+                with open(self.directory / ASSIGNMENTS_FILE, "ab") as f:
+                    f.write(self._assign(vectors).tobytes())
+            self._append_metadata(
+                {"id": i, "text": t, "metadata": m} for i, t, m in zip(ids, texts, metadatas)
+            )
+            self._refresh()
+        return ids
+
+    def _delete_rows(self, rows: List[int]) -> int:
+        with self._write_lock():
+            rows = [r for r in rows if r < len(self._alive) and self._alive[r]]
+            if rows:
+                self._append_metadata([{"deleted": rows}])
+                self._refresh()
+        return len(rows)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if not ids:
+            return False
+        self.delete_ids(ids)
+        return True
+
+    def delete_ids(self, ids: Iterable[str]) -> int:
+        """
+        Delete rows by id.
+
+        Returns:
+            Number of deleted rows
+        """
+        wanted = set(ids)
+        with self._lock:
+            self._refresh()
+            return self._delete_rows([row for row, id_ in enumerate(self._ids) if id_ in wanted])
+
+    def ids_where(self, key: str, value: Any) -> List[str]:
+        """Ids of the live rows whose metadata `key` equals `value`."""
+        with self._lock:
+            self._refresh()
+            return [
+                self._ids[row] for row, m in enumerate(self._metadatas) if self._alive[row] and m.get(key) == value
+            ]
+
+    def delete_where(self, key: str, value: Any) -> int:
+        """
+        Delete every row whose metadata `key` equals `value`.
+
+        Returns:
+            Number of deleted rows
+        """
+        with self._lock:
+            self._refresh()
+            return self._delete_rows([row for row, m in enumerate(self._metadatas) if m.get(key) == value])
+
+    def delete_collection(self) -> None:
+        """Remove every row and file of the collection."""
+        with self._write_lock():
+            for name in (VECTORS_FILE, METADATA_FILE, CENTROIDS_FILE, ASSIGNMENTS_FILE):
+                (self.directory / name).unlink(missing_ok=True)
+            self._reset()
+
+    def _candidate_rows(self, queries: np.ndarray, search_filter: Optional[Dict[str, Any]]) -> List[Optional[np.ndarray]]:
+        """Rows each query may score: live, matching the filter and (IVF) in a probed list."""
+        mask = self._alive.copy()
+        if search_filter:
+            mask &= np.fromiter(
+                (_matches(m, search_filter) for m in self._metadatas), dtype=bool, count=len(self._metadatas)
+            )
+        if self._centroids is None:
+            return [None if mask.all() else np.flatnonzero(mask)] * len(queries)
+
+        probes = min(settings.LOCAL_INDEX_IVF_PROBES, len(self._centroids))
+        closest = np.argpartition(-(queries @ self._centroids.T), probes - 1, axis=1)[:, :probes]
+        return [np.flatnonzero(mask & np.isin(self._assignments, lists)) for lists in closest]
+
+    def search_by_vectors(
+        self,
+        embeddings: Sequence[Sequence[float]],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        Batched top-k search.
+
+        Args:
+            embeddings: Query vectors
+            k: Results per query
+            filter: Optional PGVector-style metadata filter
+
+        Returns:
+            Per query: (Document, cosine distance) pairs, closest first
+        """
+        queries = _normalize(np.asarray(embeddings, dtype=np.float32).reshape(-1, self.dimensions))
+        with self._lock:
+            self._refresh()
+            vectors = self._vectors
+            candidates = self._candidate_rows(queries, filter)
+            ids, texts, metadatas = self._ids, self._texts, self._metadatas
+
+        if candidates and candidates[0] is None:
+            # Unrestricted: score every query against each block of rows at once
+            scores = np.empty((len(queries), len(vectors)), dtype=np.float32)
+            for start in range(0, len(vectors), SCAN_BLOCK_ROWS):
+                block = vectors[start:start + SCAN_BLOCK_ROWS]
+                scores[:, start:start + len(block)] = queries @ block.T
+            per_query = [(np.arange(len(vectors)), row) for row in scores]
+        else:
+            per_query = [(rows, vectors[rows] @ query) for rows, query in zip(candidates, queries)]
+
+        results = []
+        for rows, scores in per_query:
+            top = min(k, len(rows))
+            if top == 0:
+                results.append([])
+                continue
+            best = np.argpartition(-scores, top - 1)[:top]
+            best = best[np.argsort(-scores[best])]
+            results.append([
+                (
+                    Document(id=ids[rows[i]], page_content=texts[rows[i]], metadata=dict(metadatas[rows[i]])),
+                    float(1.0 - scores[i]),
+                )
+                for i in best
+            ])
+        return results
+
+    def similarity_search_with_score_by_vector(
+        self, embedding: List[float], k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        return self.search_by_vectors([embedding], k=k, filter=filter)[0]
+
+    def similarity_search_by_vector(
+        self, embedding: List[float], k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k, filter)]
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self.embeddings.embed_query(query), k, filter)
+
+    def similarity_search(
+        self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+
+    def _select_relevance_score_fn(self):
+        return self._cosine_relevance_score_fn
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        collection_name: str = None,
+        **kwargs: Any,
+    ) -> "LocalVectorStore":
+        store = cls(embedding, collection_name or settings.VECTOR_COLLECTION_NAME, **kwargs)
+        store.add_texts(texts, metadatas)
+        return store
@@ -0,0 +1,175 @@
+"""
+Ingestion Manifest Module
+
+Tracks which files have been ingested into a collection, so re-ingestion can
+skip unchanged files and replace the chunks of changed ones. The manifest is
+a JSON file in PROCESSED_DATA_PATH (one per collection) storing, per file:
+size, mtime, chunk count and ingestion timestamp.
+
+Changes are buffered and written in batches (every FLUSH_EVERY changes or
+FLUSH_INTERVAL seconds, and on `flush()`), not once per file. Several
+processes (API workers, the ingestion CLI, the watcher) may share a
+manifest: a flush takes an exclusive lock on a sidecar `.lock` file,
+re-reads the manifest and applies only this process's changes on top.
+Changes not yet flushed when a process dies are lost, which only means
+those files are re-ingested by the next incremental run.
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional
+import structlog
+
+from app.core.config import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process use only
+    fcntl = None
+
+logger = structlog.get_logger(__name__)
+
+# Buffered changes written together
+FLUSH_EVERY = 50
+FLUSH_INTERVAL = 5.0
+
+
+class IngestionManifest:
+    """JSON-backed record of ingested files, keyed by absolute file path."""
+
+    def __init__(self, path: Path):
+        """
+        Initialize the manifest, loading existing entries if the file exists.
+
+        Args:
+            path: Location of the manifest JSON file
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        # Changes not written yet: entry, or None for a removal
+        self._pending: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._last_flush = time.monotonic()
+        self._entries = self._read()
+
+    @classmethod
+    def for_collection(cls, collection_name: str) -> "IngestionManifest":
+        """Open the manifest for a vector store collection."""
+        return cls(settings.get_processed_data_dir() / f"{collection_name}.manifest.json")
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        if not self.path.exists():
+            return {}
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError) as e:
+            # A corrupt manifest only costs a full re-ingest
+            logger.warning("Failed to read ingestion manifest", path=str(self.path), error=str(e))
+            return {}
+
+    def flush(self) -> bool:
+        """
+        Write buffered changes, merged into the manifest as it is on disk.
+
+        The write is atomic (temporary file + rename), so a crash never
+        leaves a truncated manifest.
+
+        Returns:
+            True if anything was written
+        """
+        with self._lock:
+            if not self._pending:
+                return False
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path.with_suffix(".lock"), "w") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                # Other processes' changes since our last read, then ours
+                entries = self._read()
+                for key, entry in self._pending.items():
+                    if entry is None:
+                        entries.pop(key, None)
+                    else:
+                        entries[key] = entry
+                tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+                tmp_path.write_text(json.dumps(entries, indent=2), encoding="utf-8")
+                os.replace(tmp_path, self.path)
+            self._entries = entries
+            self._pending.clear()
+            self._last_flush = time.monotonic()
+            return True
+
+    def _changed(self, key: str, entry: Optional[Dict[str, Any]]) -> bool:
+        """Buffer a change (lock held); returns whether a flush is due."""
+        self._pending[key] = entry
+        return len(self._pending) >= FLUSH_EVERY or time.monotonic() - self._last_flush >= FLUSH_INTERVAL
+
+    @staticmethod
+    def _key(file_path: Path) -> str:
+        return str(file_path.resolve())
+
+    def is_current(self, file_path: Path) -> bool:
+        """
+        Check whether a file is already ingested and unchanged since.
+
+        Args:
+            file_path: Path to the file
+
+        Returns:
+            True if size and mtime match the recorded entry
+        """
+        entry = self._entries.get(self._key(file_path))
+        if entry is None:
+            return False
+        try:
+            stat = file_path.stat()
+        except OSError:
+            return False
+        return entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns
+
+    def get(self, file_path: Path) -> Optional[Dict[str, Any]]:
+        """Get the recorded entry for a file, if any."""
+        return self._entries.get(self._key(file_path))
+
+    def record(self, file_path: Path, source_file: str, chunks: int) -> None:
+        """
+        Record a successful ingestion of a file.
+
+        Args:
+            file_path: Path to the file
+            source_file: Value stored in the chunks' `source_file` metadata
+            chunks: Number of chunks stored
+        """
+        stat = file_path.stat()
+        entry = {
+            "source_file": source_file,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "chunks": chunks,
+            "ingested_at": datetime.now(timezone.utc).isoformat(),
+        }
+        key = self._key(file_path)
+        with self._lock:
+            self._entries[key] = entry
+            due = self._changed(key, entry)
+        if due:
+            self.flush()
+
+    def remove(self, file_path: Path) -> None:
+        """Forget a file (e.g. after it was deleted from disk)."""
+        key = self._key(file_path)
+        with self._lock:
+            if self._entries.pop(key, None) is None and key not in self._pending:
+                return
+            due = self._changed(key, None)
+        if due:
+            self.flush()
+
+    def entries(self) -> Dict[str, Dict[str, Any]]:
+        """Get a snapshot of all entries, keyed by absolute file path."""
+        with self._lock:
+            return dict(self._entries)
@@ -0,0 +1,130 @@
+"""
+RAG Multi-Query Retrieval Module
+
+Compound questions ("compare X and Y", "errors in A, B and C") retrieve
+poorly with a single search. `multi_query_search` takes several sub-queries:
+1. Queries are normalized and deduplicated (optionally adding a keyword-only
+   variant of each, MULTI_QUERY_KEYWORD_VARIANTS)
+2. All queries are embedded with one request (cached vectors are reused)
+3. The vector searches run concurrently (one batched scan on the local backend)
+4. Result lists are merged with reciprocal rank fusion, so chunks found by
+   several sub-queries rank first, and duplicates are dropped
+"""
+
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import structlog
+from langchain_core.documents import Document
+
+from app.core.config import settings
+from app.rag.embeddings import embed_queries
+from app.rag.local_store import LocalVectorStore
+from app.rag.store import build_source_filter, search_documents_by_vector
+
+logger = structlog.get_logger(__name__)
+
+# Reciprocal rank fusion damping constant (Cormack et al.)
+RRF_K = 60
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it of on or the "
+    "to was what when where which who why with".split()
+)
+_WORD = re.compile(r"\w+")
+
+
+def keyword_variant(query: str) -> str:
+    """Query reduced to its content words (empty if nothing is left)."""
+    return " ".join(w for w in _WORD.findall(query.lower()) if w not in _STOPWORDS)
+
+
+def prepare_queries(queries: List[str], max_queries: int = None, keyword_variants: bool = None) -> List[str]:
+    """
+    Normalize, deduplicate and cap sub-queries.
+
+    Args:
+        queries: Sub-queries as written by the agent
+        max_queries: Cap on the sub-queries searched (defaults to MULTI_QUERY_MAX)
+        keyword_variants: Also search a stopword-free variant of each query
+            (defaults to MULTI_QUERY_KEYWORD_VARIANTS)
+
+    Returns:
+        Distinct queries, in their original order
+    """
+    max_queries = settings.MULTI_QUERY_MAX if max_queries is None else max_queries
+    keyword_variants = settings.MULTI_QUERY_KEYWORD_VARIANTS if keyword_variants is None else keyword_variants
+
+    prepared, seen = [], set()
+    for query in queries[:max_queries]:
+        query = " ".join(query.split())
+        candidates = [query, keyword_variant(query)] if keyword_variants else [query]
+        for candidate in candidates:
+            if candidate and candidate.lower() not in seen:
+                seen.add(candidate.lower())
+                prepared.append(candidate)
+    return prepared
+
+
+def _doc_key(doc: Document) -> str:
+    return doc.id or f"{doc.metadata.get('source_file')}:{doc.page_content}"
+
+
+def fuse_results(result_lists: List[List[Tuple[Document, float]]], k: int) -> List[Tuple[Document, float]]:
+    """
+    Merge ranked result lists with reciprocal rank fusion.
+
+    Args:
+        result_lists: One ranked list of (Document, distance) pairs per query
+        k: Number of documents to return
+
+    Returns:
+        Distinct (Document, best distance over the queries) pairs, best fused score first
+    """
+    scores: Dict[str, float] = {}
+    docs: Dict[str, Tuple[Document, float]] = {}
+    for results in result_lists:
+        for rank, (doc, distance) in enumerate(results):
+            key = _doc_key(doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (RRF_K + rank + 1)
+            if key not in docs or distance < docs[key][1]:
+                docs[key] = (doc, distance)
+    return [docs[key] for key in sorted(scores, key=scores.get, reverse=True)[:k]]
+
+
+def multi_query_search(
+    vector_store,
+    queries: List[str],
+    k: int,
+    sources: Optional[List[str]] = None,
+) -> List[Tuple[Document, float]]:
+    """
+    Search several sub-queries at once and fuse the results.
+
+    Args:
+        vector_store: Store to search (PGVector or LocalVectorStore)
+        queries: Sub-queries
+        k: Number of results per sub-query (the fused list is capped
+           at k * number of sub-queries, at most MULTI_QUERY_MAX_RESULTS)
+        sources: Optional file names to restrict the search to
+
+    Returns:
+        Fused (Document, cosine distance) pairs, best first
+    """
+    queries = prepare_queries(queries)
+    if not queries:
+        return []
+
+    embeddings = embed_queries(vector_store.embeddings, queries)
+    if isinstance(vector_store, LocalVectorStore):
+        result_lists = vector_store.search_by_vectors(embeddings, k=k, filter=build_source_filter(sources))
+    else:
+        with ThreadPoolExecutor(max_workers=len(embeddings)) as executor:
+            result_lists = list(executor.map(
+                lambda embedding: search_documents_by_vector(vector_store, embedding, k, sources),
+                embeddings,
+            ))
+
+    fused = fuse_results(result_lists, min(k * len(queries), settings.MULTI_QUERY_MAX_RESULTS))
+    logger.info("Multi-query search", queries=len(queries), results=len(fused))
+    return fused
@@ -0,0 +1,313 @@
+"""
+RAG Vector Quantization Module
+
+Shrinks the ANN index by indexing quantized vectors while keeping the
+full-precision `vector` column for exact re-scoring:
+1. 'halfvec': HNSW over `embedding::halfvec(N)` (16-bit floats, ~half the index size)
+2. 'binary':  HNSW over `binary_quantize(embedding)::bit(N)` (1 bit/dim, ~1/32 the size)
+3. Searches walk the quantized index for VECTOR_RESCORE_CANDIDATES candidates,
+   then re-rank those candidates by exact cosine distance on `embedding`;
+   searches scoped to sources rank the scope's rows exactly instead
+
+Select the mode with VECTOR_QUANTIZATION and build the matching indexes with:
+    python -m app.rag.quantization migrate [--tenant ID]
+and check that searches use them with:
+    python -m app.rag.quantization explain [--tenant ID]
+"""
+
+import argparse
+import hashlib
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+import structlog
+from langchain_core.documents import Document
+from sqlalchemy import text
+
+from app.core.config import settings
+
+if TYPE_CHECKING:
+    from langchain_postgres import PGVector
+
+logger = structlog.get_logger(__name__)
+
+QUANTIZATION_MODES = ("none", "halfvec", "binary")
+
+
+def _index_specs(dimensions: int) -> Dict[str, Tuple[str, str]]:
+    """Per mode: (index name prefix, indexed expression + operator class)."""
+    return {
+        "none": ("ix_hnsw_", "embedding vector_cosine_ops"),
+        "halfvec": ("ix_hnsw_half_", f"(embedding::halfvec({dimensions})) halfvec_cosine_ops"),
+        "binary": ("ix_hnsw_bit_", f"(binary_quantize(embedding)::bit({dimensions})) bit_hamming_ops"),
+    }
+
+
+def _order_expression(mode: str, dimensions: int) -> str:
+    """Distance expression matching the mode's index (so the planner uses it)."""
+    query = f"CAST(:query AS vector({dimensions}))"
+    if mode == "halfvec":
+        return f"embedding::halfvec({dimensions}) <=> CAST(:query AS halfvec({dimensions}))"
+    if mode == "binary":
+        return f"binary_quantize(embedding)::bit({dimensions}) <~> binary_quantize({query})"
+    return f"embedding <=> {query}"
+
+
+def index_name(mode: str, collection_name: str) -> str:
+    """
+    Name of a collection's ANN index for a quantization mode.
+
+    Postgres truncates identifiers to 63 bytes, so a long name would collide
+    with another tenant's (and `IF NOT EXISTS` would silently skip the build);
+    such names keep a readable start and end in a hash of the full name.
+    """
+    prefix, _ = _index_specs(settings.VECTOR_DIMENSIONS)[mode]
+    name = f"{prefix}{collection_name}"
+    if len(name) <= 63:
+        return name
+    digest = hashlib.sha1(collection_name.encode("utf-8")).hexdigest()[:12]
+    return f"{name[:50]}_{digest}"
+
+
+def index_status(connection, name: str) -> Optional[bool]:
+    """
+    Whether an index is usable: None if missing, False if invalid (e.g. left
+    by a failed `CREATE INDEX CONCURRENTLY`), True otherwise.
+    """
+    return connection.execute(
+        text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"),
+        {"name": name},
+    ).scalar_one_or_none()
+
+
+def ann_index_sql(mode: str, collection_name: str, collection_uuid: str, concurrently: bool = False) -> str:
+    """
+    Build the CREATE INDEX statement for a collection's partial HNSW index.
+
+    Args:
+        mode: Quantization mode ('none', 'halfvec' or 'binary')
+        collection_name: Collection name (used in the index name)
+        collection_uuid: Collection id (partial index predicate)
+        concurrently: Build without blocking writes (cannot run in a transaction)
+    """
+    _, expression = _index_specs(settings.VECTOR_DIMENSIONS)[mode]
+    return (
+        f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS {index_name(mode, collection_name)} "
+        f"ON langchain_pg_embedding USING hnsw ({expression}) "
+        f"WITH (m = {int(settings.HNSW_M)}, ef_construction = {int(settings.HNSW_EF_CONSTRUCTION)}) "
+        f"WHERE collection_id = '{collection_uuid}'"
+    )
+
+
+def _search_sql(mode: str, dimensions: int, scoped: bool) -> str:
+    """
+    Search statement: two-stage over the ANN index, or exact when scoped.
+
+    The collection id is a bound parameter (not a subquery): the planner only
+    matches the partial index predicate `collection_id = '<uuid>'` against a
+    value it knows when planning.
+
+    A search scoped to `sources` does not walk the HNSW index: its filter
+    would only be applied to the ef_search rows the walk returns, so a narrow
+    scope would come back with fewer than k rows, or none. The scope's rows
+    are selected through the `source_file` / `sources` indexes instead
+    (MATERIALIZED keeps the ORDER BY off the ANN index) and ranked exactly.
+    """
+    if scoped:
+        # A chunk also serves the files whose near-duplicates were skipped at ingestion
+        return f"""
+            WITH scoped AS MATERIALIZED (
+                SELECT id, document, cmetadata, embedding
+                FROM langchain_pg_embedding
+                WHERE collection_id = :collection_id
+                AND (cmetadata->>'source_file' = ANY(:sources) OR cmetadata->'sources' ?| CAST(:sources AS text[]))
+            )
+            SELECT id, document, cmetadata, embedding <=> CAST(:query AS vector({dimensions})) AS distance
+            FROM scoped
+            ORDER BY distance
+            LIMIT :k
+        """
+    return f"""
+        WITH candidates AS (
+            SELECT id, document, cmetadata, embedding
+            FROM langchain_pg_embedding
+            WHERE collection_id = :collection_id
+            ORDER BY {_order_expression(mode, dimensions)}
+            LIMIT :candidates
+        )
+        SELECT id, document, cmetadata, embedding <=> CAST(:query AS vector({dimensions})) AS distance
+        FROM candidates
+        ORDER BY distance
+        LIMIT :k
+    """
+
+
+def _run_search(vector_store: "PGVector", sql: str, params: Dict, candidates: int):
+    with vector_store.session_maker() as session:
+        params = {**params, "collection_id": vector_store.get_collection(session).uuid}
+        # The HNSW scan returns at most ef_search rows; make room for all candidates
+        session.execute(text(f"SET LOCAL hnsw.ef_search = {int(max(candidates, 40))}"))
+        rows = session.execute(text(sql), params).all()
+        session.commit()
+    return rows
+
+
+def quantized_search_by_vector(
+    vector_store: "PGVector",
+    embedding: List[float],
+    k: int,
+    sources: Optional[List[str]] = None,
+    mode: str = None,
+    candidates: int = None,
+) -> List[Tuple[Document, float]]:
+    """
+    Two-stage search: quantized ANN candidates, then exact cosine re-scoring
+    (exact over the scope's rows when `sources` is given).
+
+    Args:
+        vector_store: PGVector store whose collection is searched
+        embedding: Query embedding
+        k: Number of results
+        sources: Optional file names to restrict the search to (`source_file`
+            or listed in `sources` metadata)
+        mode: Quantization mode (defaults to VECTOR_QUANTIZATION)
+        candidates: Candidates taken from the index (defaults to VECTOR_RESCORE_CANDIDATES)
+
+    Returns:
+        (Document, cosine distance) pairs, closest first
+    """
+    mode = mode or settings.VECTOR_QUANTIZATION
+    candidates = max(candidates or settings.VECTOR_RESCORE_CANDIDATES, k)
+    params = {"query": str(list(embedding)), "candidates": candidates, "k": k}
+    if sources:
+        params["sources"] = list(sources)
+
+    rows = _run_search(vector_store, _search_sql(mode, settings.VECTOR_DIMENSIONS, bool(sources)), params, candidates)
+    return [
+        (Document(id=str(row.id), page_content=row.document, metadata=row.cmetadata), row.distance)
+        for row in rows
+    ]
+
+
+def explain_search(vector_store: "PGVector", mode: str = None, sources: Optional[List[str]] = None) -> str:
+    """
+    Query plan of a quantized search (EXPLAIN, not executed).
+
+    Returns:
+        The plan text; it names the collection's ANN index when the search uses it
+    """
+    mode = mode or settings.VECTOR_QUANTIZATION
+    candidates = settings.VECTOR_RESCORE_CANDIDATES
+    query = [1.0] + [0.0] * (settings.VECTOR_DIMENSIONS - 1)
+    params = {"query": str(query), "candidates": candidates, "k": 3}
+    if sources:
+        params["sources"] = list(sources)
+    sql = "EXPLAIN " + _search_sql(mode, settings.VECTOR_DIMENSIONS, bool(sources))
+    return "\n".join(row[0] for row in _run_search(vector_store, sql, params, candidates))
+
+
+# --- Migration CLI ---
+
+def migrate(tenant_id: Optional[str], mode: str, keep_other_indexes: bool = False) -> None:
+    """
+    Build a collection's ANN index for `mode` and drop the indexes of other modes.
+
+    Also types a legacy untyped `embedding` column as vector(VECTOR_DIMENSIONS),
+    which every HNSW index requires.
+    """
+    from app.rag.store import get_engine, get_collection_name
+
+    collection_name = get_collection_name(tenant_id)
+    engine = get_engine().execution_options(isolation_level="AUTOCOMMIT")
+
+    with engine.connect() as conn:
+        column_type = conn.execute(text(
+            "SELECT format_type(atttypid, atttypmod) FROM pg_attribute "
+            "WHERE attrelid = 'langchain_pg_embedding'::regclass AND attname = 'embedding'"
+        )).scalar_one()
+        if column_type == "vector":
+            print(f"Typing embedding column as vector({settings.VECTOR_DIMENSIONS})...")
+            conn.execute(text(
+                f"ALTER TABLE langchain_pg_embedding "
+                f"ALTER COLUMN embedding TYPE vector({settings.VECTOR_DIMENSIONS})"
+            ))
+
+        collection_uuid = conn.execute(
+            text("SELECT uuid FROM langchain_pg_collection WHERE name = :name"),
+            {"name": collection_name},
+        ).scalar_one_or_none()
+        if collection_uuid is None:
+            raise SystemExit(f"Collection not found: {collection_name}")
+
+        name = index_name(mode, collection_name)
+        if index_status(conn, name) is False:
+            # IF NOT EXISTS would keep the leftover of a failed concurrent build
+            print(f"Dropping invalid index {name}...")
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+        print(f"Building {mode} index {name} (CONCURRENTLY)...")
+        conn.execute(text(ann_index_sql(mode, collection_name, collection_uuid, concurrently=True)))
+
+        if not keep_other_indexes:
+            for other in QUANTIZATION_MODES:
+                if other != mode:
+                    conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name(other, collection_name)}"))
+
+    print(f"✅ Done. Set VECTOR_QUANTIZATION={mode} to search through the new index.")
+    status(tenant_id)
+
+
+def status(tenant_id: Optional[str]) -> None:
+    """Print the size of a collection's rows and of each mode's ANN index."""
+    from app.rag.store import get_engine, get_collection_name
+
+    collection_name = get_collection_name(tenant_id)
+    with get_engine().connect() as conn:
+        table_size = conn.execute(
+            text("SELECT pg_size_pretty(pg_total_relation_size('langchain_pg_embedding'))")
+        ).scalar_one()
+        print(f"\nCollection: {collection_name}")
+        print(f"Table size (all collections): {table_size}")
+        for mode in QUANTIZATION_MODES:
+            name = index_name(mode, collection_name)
+            size = conn.execute(
+                text("SELECT pg_size_pretty(pg_relation_size(to_regclass(:name)))"),
+                {"name": name},
+            ).scalar_one()
+            print(f"  {mode:<8} {name:<50} {size or '-'}")
+
+
+def explain(tenant_id: Optional[str], mode: str) -> None:
+    """Print the plan of a search and whether it walks the mode's ANN index."""
+    from app.rag.store import get_vector_store, get_collection_name
+
+    name = index_name(mode, get_collection_name(tenant_id))
+    plan = explain_search(get_vector_store(tenant_id), mode=mode)
+    print(plan)
+    if name in plan:
+        print(f"\n✅ Search uses {name}")
+    else:
+        print(f"\n⚠️ Search does not use {name} (missing index? run `migrate --mode {mode}`)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage quantized vector indexes.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = subparsers.add_parser("migrate", help="Build the index for a quantization mode")
+    migrate_parser.add_argument("--mode", choices=QUANTIZATION_MODES, default=settings.VECTOR_QUANTIZATION)
+    migrate_parser.add_argument("--tenant", help="Tenant/namespace collection")
+    migrate_parser.add_argument("--keep-other-indexes", action="store_true",
+                                help="Keep indexes of other modes (e.g. to switch back without rebuilding)")
+
+    status_parser = subparsers.add_parser("status", help="Show index sizes")
+    status_parser.add_argument("--tenant", help="Tenant/namespace collection")
+
+    explain_parser = subparsers.add_parser("explain", help="Check that searches use the ANN index")
+    explain_parser.add_argument("--mode", choices=QUANTIZATION_MODES, default=settings.VECTOR_QUANTIZATION)
+    explain_parser.add_argument("--tenant", help="Tenant/namespace collection")
+
+    args = parser.parse_args()
+    if args.command == "migrate":
+        migrate(args.tenant, args.mode, args.keep_other_indexes)
+    elif args.command == "explain":
+        explain(args.tenant, args.mode)
+    else:
+        status(args.tenant)
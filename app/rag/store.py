@@ -2,84 +2,578 @@
 RAG Vector Store Connection Module
 
 This module manages the connection to the PGVector store for document embeddings.
-It provides a singleton instance of the vector store configured with Ollama embeddings.
+Each tenant (namespace) gets its own collection; store handles are kept in a
+bounded LRU cache and share a single SQLAlchemy engine and embedding client.
+With VECTOR_BACKEND=local the embedded NumPy store (`local_store.py`) is used instead.
 """
 
-from typing import Optional
-from langchain_postgres import PGVector
-from langchain_ollama import OllamaEmbeddings
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional, List, Dict, Any, Tuple, Union
+from sqlalchemy import text
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from app.core.config import settings
+from app.rag.embeddings import CoalescingEmbeddings
+from app.rag.local_store import LocalVectorStore
+from app.rag.quantization import index_name, index_status, quantized_search_by_vector
 import structlog
 
+# langchain_postgres, the Ollama client and the SQLAlchemy engine are imported
+# on first use, so importing this module (and the API) stays cheap
+if TYPE_CHECKING:
+    from langchain_postgres import PGVector
+    from sqlalchemy.engine import Engine
+
 logger = structlog.get_logger(__name__)
 
-# Global vector store instance (singleton pattern)
-_vector_store: Optional[PGVector] = None
+# Cache of vector store handles keyed by collection name (LRU, bounded)
+_vector_stores: "OrderedDict[str, Union[PGVector, LocalVectorStore]]" = OrderedDict()
+_vector_stores_lock = threading.Lock()
+
+# Shared engine so tenants don't each open their own connection pool
+_engine: "Optional[Engine]" = None
+
+# Knowledge base versions live in Postgres (the local backend: a file next to
+# the collection), never in an evictable cache: a lost version would revive
+# tool results cached against it
+KB_VERSIONS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS knowledge_base_versions (
+    collection TEXT PRIMARY KEY,
+    version BIGINT NOT NULL
+)
+"""
+KB_VERSION_FILE = "kb_version"
+_kb_table_ready = False
+# Versions read recently, so cache lookups skip the database: collection -> (version, monotonic read time)
+_kb_versions_read: Dict[str, Tuple[int, float]] = {}
+
+# Shared embedding client (all collections use the same model)
+_embeddings: Optional[Embeddings] = None
 
+# Tenant ids become part of collection and index names, so keep them identifier-safe
+TENANT_ID_PATTERN = re.compile(r"^[a-z0-9_]{1,40}$")
 
-def get_embeddings() -> OllamaEmbeddings:
+# Expression index backing source-scoped searches. PGVector translates a
+# `{"source_file": {"$in": [...]}}` filter into `cmetadata->>'source_file' IN (...)`,
+# which the built-in `jsonb_path_ops` GIN index cannot serve.
+SOURCE_FILE_INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS ix_cmetadata_source_file
+ON langchain_pg_embedding ((cmetadata->>'source_file'))
+"""
+
+# Backs source-scoped searches over `sources`: files whose near-duplicate chunks
+# were skipped at ingestion and are served by this (canonical) chunk instead
+SOURCES_INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS ix_cmetadata_sources
+ON langchain_pg_embedding USING gin ((cmetadata->'sources'))
+"""
+
+# Backs `delete_file_chunks`, used when a changed file is re-ingested
+FILE_PATH_INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS ix_cmetadata_file_path
+ON langchain_pg_embedding ((cmetadata->>'file_path'))
+"""
+
+
+def get_embeddings() -> Embeddings:
     """
-    Initialize and return Ollama embeddings.
-    
+    Get the shared Ollama embeddings client.
+
+    Concurrent single-query embeddings are coalesced into batched requests
+    (see `app.rag.embeddings`) unless EMBED_BATCH_WINDOW_MS is 0.
+
     Returns:
-        OllamaEmbeddings: Configured embedding model
+        Embeddings: Configured embedding model
     """
-    return OllamaEmbeddings(
-        model=settings.EMBEDDING_MODEL,
-        base_url=settings.OLLAMA_BASE_URL,
-    )
+    global _embeddings
+    if _embeddings is None:
+        from langchain_ollama import OllamaEmbeddings
+        embeddings = OllamaEmbeddings(
+            model=settings.EMBEDDING_MODEL,
+            base_url=settings.OLLAMA_BASE_URL,
+            keep_alive=settings.OLLAMA_KEEP_ALIVE,
+        )
+        if settings.EMBED_BATCH_WINDOW_MS > 0:
+            embeddings = CoalescingEmbeddings(embeddings)
+        _embeddings = embeddings
+    return _embeddings
 
 
-def get_vector_store() -> PGVector:
+def get_engine() -> "Engine":
     """
-    Get or create the PGVector store instance.
-    
-    This function implements a singleton pattern to ensure only one
-    vector store connection is maintained throughout the application.
-    
+    Get or create the SQLAlchemy engine shared by all vector store handles.
+
     Returns:
-        PGVector: Configured vector store instance
-        
+        Engine: Pooled engine bound to DATABASE_URL (the "retrieval" pool, sized
+        from this worker's connection budget, with acquisition wait metrics)
+    """
+    global _engine
+    if _engine is None:
+        from sqlalchemy import create_engine
+        from app.core.database import TimedQueuePool
+        _engine = create_engine(
+            settings.DATABASE_URL,
+            poolclass=TimedQueuePool,
+            pool_pre_ping=True,
+            pool_size=settings.worker_connection_budget()["retrieval"],
+            max_overflow=0,
+            pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        )
+    return _engine
+
+
+def get_collection_name(tenant_id: Optional[str] = None) -> str:
+    """
+    Resolve the collection that holds a tenant's documents.
+
+    Args:
+        tenant_id: Tenant/namespace identifier (None = default collection)
+
+    Returns:
+        Collection name
+
+    Raises:
+        ValueError: If the tenant id is not a valid identifier
+    """
+    if not tenant_id:
+        return settings.VECTOR_COLLECTION_NAME
+    if not TENANT_ID_PATTERN.match(tenant_id):
+        raise ValueError(
+            f"Invalid tenant id: {tenant_id!r}. Use 1-40 lowercase letters, digits or '_'."
+        )
+    return f"{settings.VECTOR_COLLECTION_NAME}__{tenant_id}"
+
+
+def get_vector_store(tenant_id: Optional[str] = None) -> Union["PGVector", LocalVectorStore]:
+    """
+    Get or create the vector store instance for a tenant.
+
+    Handles are cached per collection in a bounded LRU cache
+    (`VECTOR_STORE_CACHE_SIZE`), so repeated requests for the same tenant
+    reuse the same handle while idle tenants are eventually evicted.
+
+    Args:
+        tenant_id: Tenant/namespace identifier (None = default collection)
+
+    Returns:
+        PGVector (or LocalVectorStore when VECTOR_BACKEND=local): Configured vector store instance
+
     Raises:
+        ValueError: If the tenant id is invalid
         Exception: If connection to the database fails
     """
-    global _vector_store
-    
-    if _vector_store is not None:
-        return _vector_store
-    
+    collection_name = get_collection_name(tenant_id)
+
+    with _vector_stores_lock:
+        store = _vector_stores.get(collection_name)
+        if store is not None:
+            _vector_stores.move_to_end(collection_name)
+            return store
+
     try:
         logger.info(
             "Initializing vector store",
-            collection_name=settings.VECTOR_COLLECTION_NAME,
+            collection_name=collection_name,
             embedding_model=settings.EMBEDDING_MODEL,
+            backend=settings.VECTOR_BACKEND,
         )
+
+        if settings.VECTOR_BACKEND == "local":
+            store = LocalVectorStore(embeddings=get_embeddings(), collection_name=collection_name)
+            return _cache_store(collection_name, store)
+
+        from langchain_postgres import PGVector
         
-        embeddings = get_embeddings()
-        
-        # Initialize PGVector with the new langchain-postgres syntax
-        _vector_store = PGVector(
-            embeddings=embeddings,
-            collection_name=settings.VECTOR_COLLECTION_NAME,
-            connection=settings.DATABASE_URL,
+        # Initialize PGVector with the new langchain-postgres syntax.
+        # A fixed embedding_length types the column as vector(N), which ANN indexes require.
+        store = PGVector(
+            embeddings=get_embeddings(),
+            collection_name=collection_name,
+            connection=get_engine(),
+            embedding_length=settings.VECTOR_DIMENSIONS,
             use_jsonb=True,
         )
-        
-        logger.info("Vector store initialized successfully")
-        return _vector_store
-        
+
+        ensure_metadata_indexes(store)
+        ensure_ann_index(store)
+
+        logger.info("Vector store initialized successfully", collection_name=collection_name)
+
     except Exception as e:
         logger.error("Failed to initialize vector store", error=str(e))
         raise
 
+    return _cache_store(collection_name, store)
 
-def reset_vector_store() -> None:
+
+def _cache_store(collection_name: str, store):
+    """Insert a new handle into the LRU cache and return the cached handle."""
+    with _vector_stores_lock:
+        # Another thread may have raced us; keep the first handle
+        store = _vector_stores.setdefault(collection_name, store)
+        _vector_stores.move_to_end(collection_name)
+        while len(_vector_stores) > settings.VECTOR_STORE_CACHE_SIZE:
+            evicted, _ = _vector_stores.popitem(last=False)
+            logger.info("Evicted vector store handle", collection_name=evicted)
+    return store
+
+
+def ensure_metadata_indexes(vector_store: "PGVector") -> None:
+    """
+    Create the metadata indexes used by filtered retrieval.
+
+    Index creation is idempotent, so it is safe to run on every startup.
+    Failures are logged and ignored: searches still work, just unindexed.
+
+    Args:
+        vector_store: An initialized PGVector store (tables must exist)
+    """
+    try:
+        with vector_store.session_maker() as session:
+            session.execute(text(SOURCE_FILE_INDEX_SQL))
+            session.execute(text(FILE_PATH_INDEX_SQL))
+            session.execute(text(SOURCES_INDEX_SQL))
+            session.commit()
+        logger.info("Metadata indexes checked/created")
+    except Exception as e:
+        logger.warning("Failed to create metadata indexes", error=str(e))
+
+
+def ensure_ann_index(vector_store: "PGVector") -> bool:
+    """
+    Check that this store's collection has its HNSW index.
+    
+    All collections live in `langchain_pg_embedding`, so each collection gets a
+    partial index (`WHERE collection_id = ...`) acting as its own partition:
+    a tenant's search walks a graph built from that tenant's vectors only.
+    The indexed expression follows VECTOR_QUANTIZATION (see `app.rag.quantization`).
+    
+    The index is not built here: on a large collection a build takes minutes
+    and this runs on the first request (or during warm-up). A missing index is
+    logged; build it without blocking writes with
+    `python -m app.rag.quantization migrate --mode <VECTOR_QUANTIZATION>`.
+    
+    Args:
+        vector_store: An initialized PGVector store (tables must exist)
+    
+    Returns:
+        True if the index exists and is valid
+    """
+    mode = settings.VECTOR_QUANTIZATION
+    name = index_name(mode, vector_store.collection_name)
+    try:
+        with vector_store.session_maker() as session:
+            valid = index_status(session, name)
+    except Exception as e:
+        logger.warning("Failed to check ANN index", index=name, error=str(e))
+        return False
+    if not valid:
+        logger.warning(
+            "ANN index missing, searches scan the whole collection"
+            if valid is None else
+            "ANN index invalid (failed concurrent build), searches scan the whole collection",
+            index=name,
+            collection_name=vector_store.collection_name,
+            fix=f"python -m app.rag.quantization migrate --mode {mode} [--tenant ID]",
+        )
+    return bool(valid)
+
+
+def search_documents(
+    vector_store: Union["PGVector", LocalVectorStore],
+    query: str,
+    k: int,
+    sources: Optional[List[str]] = None,
+) -> List[Tuple[Document, float]]:
     """
-    Reset the vector store singleton.
+    Similarity search honoring the configured VECTOR_QUANTIZATION mode.
     
+    Source-scoped PGVector searches always go through our own SQL: they also
+    match chunks listing a file in their `sources` metadata (near-duplicates
+    skipped at ingestion), which PGVector's metadata filters cannot express,
+    and rank the scope's rows exactly instead of filtering an HNSW walk.
+    
+    Args:
+        vector_store: Store to search
+        query: Query text
+        k: Number of results
+        sources: Optional file names to restrict the search to
+        
+    Returns:
+        (Document, cosine distance) pairs, most similar first
+    """
+    if _native_search(vector_store, sources):
+        return vector_store.similarity_search_with_score(query, k=k, filter=build_source_filter(sources))
+    
+    embedding = vector_store.embeddings.embed_query(query)
+    return search_documents_by_vector(vector_store, embedding, k, sources)
+
+
+def search_documents_by_vector(
+    vector_store: Union["PGVector", LocalVectorStore],
+    embedding: List[float],
+    k: int,
+    sources: Optional[List[str]] = None,
+) -> List[Tuple[Document, float]]:
+    """
+    Like `search_documents`, for an already computed query embedding.
+    
+    Returns:
+        (Document, cosine distance) pairs, most similar first
+    """
+    if _native_search(vector_store, sources):
+        return vector_store.similarity_search_with_score_by_vector(
+            embedding, k=k, filter=build_source_filter(sources)
+        )
+    
+    return quantized_search_by_vector(vector_store, embedding, k, sources=sources)
+
+
+def _native_search(vector_store: Union["PGVector", LocalVectorStore], sources: Optional[List[str]]) -> bool:
+    """Whether the store's own search serves this query (see `search_documents`)."""
+    if isinstance(vector_store, LocalVectorStore):
+        return True
+    return settings.VECTOR_QUANTIZATION == "none" and not sources
+
+
+def delete_file_chunks(vector_store: Union["PGVector", LocalVectorStore], file_path: str) -> int:
+    """
+    Delete every chunk of a file from the store's collection.
+
+    Args:
+        vector_store: An initialized PGVector store
+        file_path: Value of the chunks' `file_path` metadata
+
+    Returns:
+        Number of deleted chunks
+    """
+    if isinstance(vector_store, LocalVectorStore):
+        return vector_store.delete_where("file_path", file_path)
+
+    with vector_store.session_maker() as session:
+        collection = vector_store.get_collection(session)
+        result = session.execute(
+            text(
+                "DELETE FROM langchain_pg_embedding "
+                "WHERE collection_id = :collection_id AND cmetadata->>'file_path' = :file_path"
+            ),
+            {"collection_id": collection.uuid, "file_path": file_path},
+        )
+        session.commit()
+    return result.rowcount
+
+
+def file_chunk_ids(vector_store: Union["PGVector", LocalVectorStore], file_path: str) -> List[str]:
+    """
+    Ids of a file's chunks in the store's collection.
+
+    Args:
+        vector_store: An initialized vector store
+        file_path: Value of the chunks' `file_path` metadata
+    """
+    if isinstance(vector_store, LocalVectorStore):
+        return vector_store.ids_where("file_path", file_path)
+
+    with vector_store.session_maker() as session:
+        collection = vector_store.get_collection(session)
+        rows = session.execute(
+            text(
+                "SELECT id FROM langchain_pg_embedding "
+                "WHERE collection_id = :collection_id AND cmetadata->>'file_path' = :file_path"
+            ),
+            {"collection_id": collection.uuid, "file_path": file_path},
+        ).scalars().all()
+    return [str(row) for row in rows]
+
+
+def delete_chunks(vector_store: Union["PGVector", LocalVectorStore], ids: List[str]) -> int:
+    """
+    Delete chunks by id from the store's collection.
+
+    Returns:
+        Number of deleted chunks
+    """
+    if not ids:
+        return 0
+    if isinstance(vector_store, LocalVectorStore):
+        return vector_store.delete_ids(ids)
+
+    with vector_store.session_maker() as session:
+        collection = vector_store.get_collection(session)
+        result = session.execute(
+            text("DELETE FROM langchain_pg_embedding WHERE collection_id = :collection_id AND id = ANY(:ids)"),
+            {"collection_id": collection.uuid, "ids": list(ids)},
+        )
+        session.commit()
+    return result.rowcount
+
+
+def set_chunk_sources(
+    vector_store: Union["PGVector", LocalVectorStore], source_file: str, chunk_ids: List[str]
+) -> None:
+    """
+    Make `source_file` listed in the `sources` metadata of exactly these chunks.
+
+    Called after (re-)ingesting a file whose near-duplicate chunks were skipped
+    in favor of other files' chunks, and with no ids when the file is removed.
+    Both updates run in one transaction. No-op for the local backend (it has no
+    ingestion-time dedup).
+
+    Args:
+        vector_store: An initialized vector store
+        source_file: The skipping file's `source_file` name
+        chunk_ids: Canonical chunks now also serving that file
+    """
+    if isinstance(vector_store, LocalVectorStore):
+        return
+
+    with vector_store.session_maker() as session:
+        params = {
+            "collection_id": vector_store.get_collection(session).uuid,
+            "source": source_file,
+            "ids": sorted(set(chunk_ids)),
+        }
+        session.execute(
+            text(
+                "UPDATE langchain_pg_embedding "
+                "SET cmetadata = jsonb_set(cmetadata, '{sources}', (cmetadata->'sources') - CAST(:source AS text)) "
+                "WHERE collection_id = :collection_id AND cmetadata->'sources' ? :source"
+            ),
+            params,
+        )
+        if params["ids"]:
+            session.execute(
+                text(
+                    "UPDATE langchain_pg_embedding SET cmetadata = jsonb_set(cmetadata, '{sources}', "
+                    "COALESCE(cmetadata->'sources', CAST('[]' AS jsonb)) || to_jsonb(CAST(:source AS text))) "
+                    "WHERE collection_id = :collection_id AND id = ANY(:ids)"
+                ),
+                params,
+            )
+        session.commit()
+
+
+def _kb_version_path(collection_name: str) -> Path:
+    return Path(settings.LOCAL_INDEX_PATH) / collection_name / KB_VERSION_FILE
+
+
+def _write_local_kb_version(collection_name: str, version: int) -> None:
+    path = _kb_version_path(collection_name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp_path.write_text(str(version), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def _kb_versions_table(conn) -> None:
+    global _kb_table_ready
+    if not _kb_table_ready:
+        conn.execute(text(KB_VERSIONS_TABLE_SQL))
+        _kb_table_ready = True
+
+
+def knowledge_base_version(tenant_id: Optional[str] = None) -> int:
+    """
+    Version of a tenant's knowledge base, changed on every write.
+
+    Stored in Postgres (VECTOR_BACKEND=local: a file in the collection's
+    directory), so every API worker and the ingestion CLI see the same value
+    and it is never evicted. Caches derived from the collection (e.g. tool
+    results) include it in their keys. A collection without a version yet
+    gets a new one, never a default that older cache entries could match.
+
+    A version read is reused for KB_VERSION_CACHE_SECONDS, so a tool cache
+    hit costs no database round trip; other processes' writes show up after
+    at most that long, this process's own writes right away.
+    """
+    collection_name = get_collection_name(tenant_id)
+    cached = _kb_versions_read.get(collection_name)
+    if cached is not None and time.monotonic() - cached[1] < settings.KB_VERSION_CACHE_SECONDS:
+        return cached[0]
+    version = _read_knowledge_base_version(collection_name)
+    _kb_versions_read[collection_name] = (version, time.monotonic())
+    return version
+
+
+def _read_knowledge_base_version(collection_name: str) -> int:
+    if settings.VECTOR_BACKEND == "local":
+        try:
+            return int(_kb_version_path(collection_name).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            version = time.time_ns()
+            _write_local_kb_version(collection_name, version)
+            return version
+
+    with get_engine().begin() as conn:
+        _kb_versions_table(conn)
+        version = conn.execute(
+            text("SELECT version FROM knowledge_base_versions WHERE collection = :collection"),
+            {"collection": collection_name},
+        ).scalar_one_or_none()
+        if version is None:
+            # Concurrent first readers agree on whichever version was inserted first
+            version = conn.execute(
+                text(
+                    "INSERT INTO knowledge_base_versions (collection, version) VALUES (:collection, :version) "
+                    "ON CONFLICT (collection) DO UPDATE SET version = knowledge_base_versions.version "
+                    "RETURNING version"
+                ),
+                {"collection": collection_name, "version": time.time_ns()},
+            ).scalar_one()
+    return version
+
+
+def mark_knowledge_base_changed(tenant_id: Optional[str] = None) -> None:
+    """Bump a tenant's knowledge base version after chunks were added or removed."""
+    collection_name = get_collection_name(tenant_id)
+    if settings.VECTOR_BACKEND == "local":
+        _write_local_kb_version(collection_name, time.time_ns())
+    else:
+        with get_engine().begin() as conn:
+            _kb_versions_table(conn)
+            conn.execute(
+                text(
+                    "INSERT INTO knowledge_base_versions (collection, version) VALUES (:collection, :version) "
+                    "ON CONFLICT (collection) DO UPDATE "
+                    "SET version = GREATEST(EXCLUDED.version, knowledge_base_versions.version + 1)"
+                ),
+                {"collection": collection_name, "version": time.time_ns()},
+            )
+    # This process sees its own change right away
+    _kb_versions_read.pop(collection_name, None)
+
+
+def build_source_filter(sources: Optional[List[str]]) -> Optional[Dict[str, Any]]:
+    """
+    Build a PGVector metadata filter restricting results to the given files.
+
+    Only matches `source_file`; PGVector searches scoped this way miss
+    near-duplicates served by other files' chunks, so `search_documents`
+    uses its own SQL for scoped PGVector searches.
+
+    Args:
+        sources: File names as stored in the `source_file` metadata key
+
+    Returns:
+        Filter dict for `similarity_search`, or None when no scoping is requested
+    """
+    if not sources:
+        return None
+    return {"source_file": {"$in": list(sources)}}
+
+
+def reset_vector_store() -> None:
+    """
+    Drop all cached vector store handles.
+
     This is useful for testing or when you need to reinitialize
     the connection with different settings.
     """
-    global _vector_store
-    _vector_store = None
+    with _vector_stores_lock:
+        _vector_stores.clear()
     logger.info("Vector store reset")
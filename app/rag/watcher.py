@@ -0,0 +1,139 @@
+"""
+RAG Watch-Mode Ingestion Module
+
+Keeps the vector store in sync with a directory while running:
+1. Watches the directory tree with watchdog
+2. Catches up once with an incremental ingestion (unchanged files are
+   skipped); the observer is already running, so changes made during the
+   catch-up are picked up afterwards
+3. Debounces bursts of filesystem events per file (editors, copies, renames)
+4. Re-ingests changed files and removes chunks of deleted files; a created,
+   deleted or moved directory stands for every file under it
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict
+import structlog
+from watchdog.events import FileSystemEvent, FileSystemEventHandler
+from watchdog.observers import Observer
+
+from app.core.config import settings
+from app.rag.ingestion import DocumentProcessor
+
+logger = structlog.get_logger(__name__)
+
+
+class DebouncedEventHandler(FileSystemEventHandler):
+    """Collects changed paths; a path is ready once it has been quiet for `debounce` seconds."""
+
+    def __init__(self, debounce: float):
+        self.debounce = debounce
+        self._pending: Dict[Path, float] = {}
+        self._lock = threading.Lock()
+
+    def _touch(self, path: str) -> None:
+        with self._lock:
+            self._pending[Path(path)] = time.monotonic()
+
+    def on_any_event(self, event: FileSystemEvent) -> None:
+        # A directory's own "modified"/"closed" events only echo changes to its files
+        if event.is_directory and event.event_type not in ("created", "deleted", "moved"):
+            return
+        if event.event_type in ("created", "modified", "deleted", "closed"):
+            self._touch(event.src_path)
+        elif event.event_type == "moved":
+            self._touch(event.src_path)
+            self._touch(event.dest_path)
+
+    def pop_ready(self) -> list[Path]:
+        """Return (and forget) paths whose last event is older than the debounce window."""
+        now = time.monotonic()
+        with self._lock:
+            ready = [p for p, t in self._pending.items() if now - t >= self.debounce]
+            for path in ready:
+                del self._pending[path]
+        return ready
+
+
+class IngestionWatcher:
+    """Feeds filesystem changes under a directory into incremental ingestion."""
+
+    def __init__(self, processor: DocumentProcessor, directory: Path, debounce: float = None):
+        """
+        Initialize the watcher.
+
+        Args:
+            processor: Processor used for ingestion (determines the tenant)
+            directory: Directory tree to watch
+            debounce: Quiet period before a changed file is ingested
+                (defaults to WATCH_DEBOUNCE_SECONDS)
+        """
+        self.processor = processor
+        self.directory = directory
+        self.handler = DebouncedEventHandler(debounce or settings.WATCH_DEBOUNCE_SECONDS)
+        self._stop = threading.Event()
+
+    def handle(self, path: Path) -> None:
+        """Ingest, re-ingest or remove a changed path; a directory stands for every file under it."""
+        if path.is_dir():
+            files = self.processor.discover_files(path)
+        elif path.exists():
+            files = [path]
+        else:
+            # Deleted or moved away: the file itself, or what was recorded under the directory
+            prefix = os.path.join(str(path.resolve()), "")
+            files = [path] + [Path(key) for key in self.processor.manifest.entries() if key.startswith(prefix)]
+        for file_path in files:
+            self._handle_file(file_path)
+
+    def _handle_file(self, path: Path) -> None:
+        if not self.processor.is_supported(path) or path.name.startswith('.'):
+            return
+        if path.is_file():
+            if not self.processor.manifest.is_current(path):
+                self.processor.process_file(path)
+        elif self.processor.manifest.get(path) is not None:
+            self.processor.remove_file(path)
+
+    def run(self, poll_interval: float = 0.5) -> None:
+        """Start watching, catch up, then process debounced changes until `stop()` is called."""
+        observer = Observer()
+        observer.schedule(self.handler, str(self.directory), recursive=True)
+        observer.start()
+        logger.info("Watching for changes", directory=str(self.directory))
+
+        try:
+            # Events during the catch-up queue up; files it already ingested are current by then
+            self.processor.ingest_directory(self.directory, incremental=True)
+            while not self._stop.wait(poll_interval):
+                ready = self.handler.pop_ready()
+                for path in ready:
+                    self.handle(path)
+                if ready:
+                    self.processor.flush_manifest()
+        finally:
+            observer.stop()
+            observer.join()
+            logger.info("Stopped watching", directory=str(self.directory))
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+def watch_directory(directory: Path = None, tenant_id: str = None) -> None:
+    """
+    Run watch-mode ingestion until interrupted (Ctrl+C).
+
+    Args:
+        directory: Directory to watch (defaults to RAW_DATA_PATH)
+        tenant_id: Tenant/namespace to ingest into (None = default collection)
+    """
+    directory = directory or settings.get_raw_data_dir()
+    watcher = IngestionWatcher(DocumentProcessor(tenant_id=tenant_id), directory)
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        watcher.stop()
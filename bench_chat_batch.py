@@ -0,0 +1,65 @@
+"""
+Benchmark: sequential questions vs. the batch API.
+
+Answers the same questions twice through a stateless graph:
+1. One at a time (what offline jobs did through /chat)
+2. With `answer_batch` (bounded concurrency, coalesced embeddings)
+
+Prerequisites:
+1. Docker containers must be running (docker-compose up -d)
+2. Ollama must be running with the LLM and embedding models pulled
+3. Documents must be ingested (python -m app.rag.ingestion)
+
+Usage:
+    python bench_chat_batch.py [--questions 20] [--concurrency 8]
+"""
+
+import argparse
+import asyncio
+import time
+from app.agent.batch import answer_batch, build_inputs
+from app.agent.graph import create_graph
+
+QUESTIONS = [
+    "How do I configure the database connection?",
+    "What does the error 'connection refused' mean?",
+    "How are documents ingested?",
+    "Which file types are supported?",
+    "How do I restart the service?",
+]
+
+
+async def run(num_questions: int, concurrency: int):
+    graph = create_graph()
+    questions = [{"id": str(i), "message": QUESTIONS[i % len(QUESTIONS)]} for i in range(num_questions)]
+
+    start = time.perf_counter()
+    for q in questions:
+        await graph.ainvoke(build_inputs(q["message"]))
+    sequential = time.perf_counter() - start
+    print(f"{'Sequential':<22} {sequential:8.1f}s  {num_questions / sequential:6.2f} questions/s")
+
+    start = time.perf_counter()
+    failed = 0
+    async for item in answer_batch(graph, questions, concurrency=concurrency):
+        failed += item["error"] is not None
+    batched = time.perf_counter() - start
+    label = f"Batch (concurrency={concurrency})"
+    print(f"{label:<22} {batched:8.1f}s  {num_questions / batched:6.2f} questions/s  failed={failed}")
+    print(f"\nSpeedup: {sequential / batched:.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Batch Chat Benchmark")
+    print("=" * 60)
+    asyncio.run(run(args.questions, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
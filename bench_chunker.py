@@ -0,0 +1,121 @@
+"""
+Benchmark: character-based vs. token-aware chunking.
+
+Measures for both chunkers (`CHUNKER=recursive` and `CHUNKER=token`):
+1. Throughput (chunks/sec and MB/sec) over the corpus repeated N times
+2. Retrieval recall@k: sentences sampled from the corpus are used as queries,
+   and a query is a hit if one of the top-k chunks contains that sentence
+
+Recall needs Ollama running with the embedding model (skip with --no-recall).
+
+Usage:
+    python bench_chunker.py [--repeat 50] [--queries 100] [--k 3] [--no-recall]
+"""
+
+import argparse
+import random
+import time
+import numpy as np
+from pathlib import Path
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from app.core.config import settings
+from app.rag.chunking import TokenAwareChunker, SENTENCE_PATTERN
+from app.rag.ingestion import DocumentProcessor
+from app.rag.store import get_embeddings
+
+CORPUS_DIRS = [Path("data/raw"), Path("data/datasets")]
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.split()).lower()
+
+
+def load_corpus() -> list[Document]:
+    processor = DocumentProcessor()
+    documents = []
+    for directory in CORPUS_DIRS:
+        for file_path in processor.discover_files(directory):
+            documents.extend(processor._load_document(file_path))
+    return documents
+
+
+def measure_throughput(name: str, splitter, documents: list[Document], repeat: int):
+    total_bytes = sum(len(d.page_content.encode("utf-8")) for d in documents) * repeat
+    start = time.perf_counter()
+    chunks = 0
+    for _ in range(repeat):
+        chunks += len(splitter.split_documents(documents))
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name:<10} chunks={chunks:<8} {chunks / elapsed:10.1f} chunks/s "
+        f"{total_bytes / elapsed / 1e6:8.2f} MB/s"
+    )
+
+
+def measure_recall(name: str, splitter, documents: list[Document], queries: list[str], k: int):
+    embeddings = get_embeddings()
+    chunks = [c.page_content for c in splitter.split_documents(documents)]
+
+    chunk_vectors = np.asarray(embeddings.embed_documents(chunks), dtype=np.float32)
+    query_vectors = np.asarray(embeddings.embed_documents(queries), dtype=np.float32)
+    chunk_vectors /= np.linalg.norm(chunk_vectors, axis=1, keepdims=True)
+    query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True)
+
+    top_k = np.argsort(-(query_vectors @ chunk_vectors.T), axis=1)[:, :k]
+    normalized_chunks = [normalize(c) for c in chunks]
+    hits = sum(
+        any(normalize(query) in normalized_chunks[i] for i in row)
+        for query, row in zip(queries, top_k)
+    )
+    print(f"{name:<10} chunks={len(chunks):<6} recall@{k}={hits / len(queries):.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--no-recall", action="store_true")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Chunker Benchmark")
+    print("=" * 60)
+
+    documents = load_corpus()
+    print(f"Corpus: {len(documents)} documents/pages\n")
+
+    splitters = {
+        "recursive": RecursiveCharacterTextSplitter(
+            chunk_size=settings.CHUNK_SIZE,
+            chunk_overlap=settings.CHUNK_OVERLAP,
+            length_function=len,
+            separators=["\n\n", "\n", " ", ""],
+        ),
+        "token": TokenAwareChunker(),
+    }
+
+    print(f"--- Throughput (corpus x{args.repeat}) ---")
+    for name, splitter in splitters.items():
+        measure_throughput(name, splitter, documents, args.repeat)
+
+    if args.no_recall:
+        return
+
+    sentences = [
+        m.group()
+        for d in documents
+        for m in SENTENCE_PATTERN.finditer(d.page_content)
+        if len(m.group().split()) >= 6
+    ]
+    random.seed(0)
+    queries = random.sample(sentences, min(args.queries, len(sentences)))
+
+    print(f"\n--- Retrieval recall ({len(queries)} sampled sentences) ---")
+    for name, splitter in splitters.items():
+        measure_recall(name, splitter, documents, queries, args.k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark: shared DB pool vs. per-purpose sub-pools under contention.
+
+A burst of checkpoint-like work (slow queries from many concurrent graph
+runs) competes with short logging queries. Compares:
+1. The old single pool (min_size=0, max_size=10) used by both workloads
+2. Separate "checkpointer" and "logging" pools sized from Settings
+   (DB_CONNECTION_BUDGET, DB_POOL_*_SHARE, warm DB_POOL_MIN_SIZE)
+
+Reports p50/p99 latency of the logging queries (acquisition wait + query).
+
+Prerequisites:
+1. Docker containers must be running (docker-compose up -d)
+
+Usage:
+    python bench_db_pool.py [--checkpoint-tasks 40] [--log-queries 500] [--query-ms 20]
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from psycopg_pool import AsyncConnectionPool
+from app.core.config import settings
+
+if sys.platform == 'win32':
+    asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+
+async def checkpoint_load(pool: AsyncConnectionPool, query_ms: int, stop: asyncio.Event):
+    while not stop.is_set():
+        async with pool.connection() as conn:
+            await conn.execute("SELECT pg_sleep(%s)", (query_ms / 1000,))
+
+
+async def log_queries(pool: AsyncConnectionPool, count: int) -> list[float]:
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        async with pool.connection() as conn:
+            await conn.execute("SELECT 1")
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.002)
+    return latencies
+
+
+async def scenario(label: str, checkpoint_pool, logging_pool, args):
+    stop = asyncio.Event()
+    load = [
+        asyncio.create_task(checkpoint_load(checkpoint_pool, args.query_ms, stop))
+        for _ in range(args.checkpoint_tasks)
+    ]
+    await asyncio.sleep(0.5)  # Let the checkpoint burst saturate its pool
+    latencies = sorted(await log_queries(logging_pool, args.log_queries))
+    stop.set()
+    await asyncio.gather(*load)
+
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{label:<28} p50={statistics.median(latencies):8.2f}ms p99={p99:8.2f}ms max={latencies[-1]:8.2f}ms")
+
+
+async def run(args):
+    shared = AsyncConnectionPool(
+        settings.DATABASE_URL, min_size=0, max_size=10, timeout=60, kwargs={"autocommit": True}, open=False
+    )
+    await shared.open()
+    await scenario("Shared pool (0..10)", shared, shared, args)
+    await shared.close()
+
+    budget = settings.worker_connection_budget()
+    pools = {}
+    for purpose in ("checkpointer", "logging"):
+        pools[purpose] = AsyncConnectionPool(
+            settings.DATABASE_URL,
+            min_size=min(settings.DB_POOL_MIN_SIZE, budget[purpose]),
+            max_size=budget[purpose],
+            timeout=60,
+            kwargs={"autocommit": True},
+            open=False,
+        )
+        await pools[purpose].open(wait=True)
+    label = f"Sub-pools ({budget['checkpointer']} + {budget['logging']})"
+    await scenario(label, pools["checkpointer"], pools["logging"], args)
+    for p in pools.values():
+        await p.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--checkpoint-tasks", type=int, default=40)
+    parser.add_argument("--log-queries", type=int, default=500)
+    parser.add_argument("--query-ms", type=int, default=20)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("DB Pool Contention Benchmark")
+    print("=" * 60)
+    print(f"{args.checkpoint_tasks} concurrent checkpoint tasks ({args.query_ms}ms queries), "
+          f"{args.log_queries} logging queries\n")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
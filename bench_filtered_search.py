@@ -0,0 +1,130 @@
+"""
+Benchmark: source-scoped vs. unscoped similarity search.
+
+Seeds a synthetic collection (random embeddings, no Ollama needed) spread over
+many source files, then compares query latency for:
+1. Unfiltered search over the whole collection
+2. Search scoped to one or more source files (`search_documents(..., sources=...)`)
+
+Scoped searches must return k rows from the scope, matching an exact scan of
+the scope (recall 1.0); the benchmark fails otherwise.
+
+Prerequisites:
+1. Docker containers must be running (docker-compose up -d)
+
+Usage:
+    python bench_filtered_search.py [total_chunks] [num_sources]
+"""
+
+import sys
+import time
+import random
+import statistics
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_postgres import PGVector
+from sqlalchemy import text
+from app.core.config import settings
+from app.rag.store import ensure_metadata_indexes, search_documents
+
+BENCH_COLLECTION = "bench_filtered_search"
+QUERIES = 50
+K = 3
+
+
+def seed_collection(store: PGVector, total_chunks: int, num_sources: int):
+    """Insert `total_chunks` synthetic chunks spread evenly over `num_sources` files."""
+    print(f"Seeding {total_chunks} chunks across {num_sources} sources...")
+    batch_size = 1000
+    start = time.perf_counter()
+    for offset in range(0, total_chunks, batch_size):
+        size = min(batch_size, total_chunks - offset)
+        texts = [f"synthetic chunk {offset + i}" for i in range(size)]
+        metadatas = [
+            {"source_file": f"doc_{(offset + i) % num_sources}.pdf"}
+            for i in range(size)
+        ]
+        store.add_texts(texts=texts, metadatas=metadatas)
+    print(f"✅ Seeded in {time.perf_counter() - start:.1f}s")
+
+
+def exact_ids(store: PGVector, query: str, sources: list[str]) -> set[str]:
+    """Ids of the true top-K chunks of a scope (`+ 0` keeps the planner off the ANN index)."""
+    with store.session_maker() as session:
+        rows = session.execute(
+            text(
+                "SELECT id FROM langchain_pg_embedding "
+                "WHERE collection_id = :collection_id AND cmetadata->>'source_file' = ANY(:sources) "
+                f"ORDER BY (embedding <=> CAST(:query AS vector({settings.VECTOR_DIMENSIONS}))) + 0 LIMIT :k"
+            ),
+            {
+                "collection_id": store.get_collection(session).uuid,
+                "sources": sources,
+                "query": str(store.embeddings.embed_query(query)),
+                "k": K,
+            },
+        ).all()
+    return {str(row.id) for row in rows}
+
+
+def time_queries(store: PGVector, sources=None) -> tuple[list[float], float | None]:
+    """
+    Run QUERIES searches; returns per-query latencies in milliseconds and,
+    for scoped searches, the mean recall against an exact scan of the scope.
+    """
+    latencies = []
+    recalls = []
+    for i in range(QUERIES):
+        query = f"benchmark query {random.randint(0, 10**6)}"
+        start = time.perf_counter()
+        results = search_documents(store, query, K, sources=sources)
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert len(results) == K, f"expected {K} results, got {len(results)}"
+        if sources:
+            assert all(doc.metadata["source_file"] in sources for doc, _ in results)
+            expected = exact_ids(store, query, sources)
+            recalls.append(len({doc.id for doc, _ in results} & expected) / len(expected))
+    recall = statistics.mean(recalls) if sources else None
+    assert recall in (None, 1.0), f"scoped search missed rows of the scope (recall@{K}={recall:.3f})"
+    return latencies, recall
+
+
+def report(label: str, measured: tuple[list[float], float | None]):
+    latencies, recall = measured
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(
+        f"{label:<28} p50={statistics.median(latencies):8.2f}ms "
+        f"p95={p95:8.2f}ms  mean={statistics.mean(latencies):8.2f}ms"
+        + (f"  recall@{K}={recall:.3f}" if recall is not None else "")
+    )
+
+
+def main():
+    total_chunks = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    num_sources = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    print("=" * 60)
+    print("Filtered Retrieval Benchmark")
+    print("=" * 60)
+
+    store = PGVector(
+        embeddings=DeterministicFakeEmbedding(size=settings.VECTOR_DIMENSIONS),
+        collection_name=BENCH_COLLECTION,
+        connection=settings.DATABASE_URL,
+        use_jsonb=True,
+        pre_delete_collection=True,
+    )
+    ensure_metadata_indexes(store)
+    seed_collection(store, total_chunks, num_sources)
+
+    print(f"\nRunning {QUERIES} queries per scenario (k={K})...\n")
+    report("Unfiltered", time_queries(store))
+    report("Scoped to 1 source", time_queries(store, ["doc_0.pdf"]))
+    report("Scoped to 5 sources", time_queries(store, [f"doc_{i}.pdf" for i in range(5)]))
+
+    store.delete_collection()
+    print("\n✅ Benchmark collection removed")
+
+
+if __name__ == "__main__":
+    main()
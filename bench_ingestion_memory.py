@@ -0,0 +1,75 @@
+"""
+Benchmark: peak memory of eager vs. streaming document ingestion.
+
+Runs the load -> chunk -> embed path twice over the same file and reports the
+tracemalloc peak for each:
+1. Eager: `_load_document` + `_chunk_documents` (whole file in memory)
+2. Streaming: `_iter_chunk_batches` (bounded by INGEST_BATCH_SIZE)
+
+Embeddings are computed with a deterministic fake model so the benchmark
+needs neither Ollama nor Postgres; vectors are discarded after each batch,
+as they would be once written to the store.
+
+Usage:
+    python bench_ingestion_memory.py [path/to/large.pdf] [batch_size]
+"""
+
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from app.core.config import settings
+from app.rag.ingestion import DocumentProcessor
+
+DEFAULT_FILE = Path("data/datasets/Introduction _ Bubble Docs.pdf")
+
+
+def run_eager(processor: DocumentProcessor, embeddings, file_path: Path) -> int:
+    documents = processor._load_document(file_path)
+    chunks = processor._chunk_documents(documents)
+    chunks = processor._add_metadata(chunks, file_path)
+    embeddings.embed_documents([chunk.page_content for chunk in chunks])
+    return len(chunks)
+
+
+def run_streaming(processor: DocumentProcessor, embeddings, file_path: Path, batch_size: int) -> int:
+    total = 0
+    for batch in processor._iter_chunk_batches(file_path, batch_size=batch_size):
+        embeddings.embed_documents([chunk.page_content for chunk in batch])
+        total += len(batch)
+    return total
+
+
+def measure(label: str, fn, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    chunks = fn(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<12} chunks={chunks:<8} peak={peak / 1024 / 1024:8.2f} MiB  time={elapsed:6.2f}s")
+    return peak
+
+
+def main():
+    file_path = Path(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_FILE
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else settings.INGEST_BATCH_SIZE
+
+    print("=" * 60)
+    print("Ingestion Memory Benchmark")
+    print("=" * 60)
+    print(f"File: {file_path} ({file_path.stat().st_size / 1024 / 1024:.1f} MiB)")
+    print(f"Batch size: {batch_size}\n")
+
+    processor = DocumentProcessor()
+    embeddings = DeterministicFakeEmbedding(size=settings.VECTOR_DIMENSIONS)
+
+    eager_peak = measure("Eager", run_eager, processor, embeddings, file_path)
+    stream_peak = measure("Streaming", run_streaming, processor, embeddings, file_path, batch_size)
+
+    print(f"\nStreaming peak is {stream_peak / eager_peak:.1%} of eager peak")
+
+
+if __name__ == "__main__":
+    main()
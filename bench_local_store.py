@@ -0,0 +1,140 @@
+"""
+Benchmark: embedded NumPy store vs. pgvector at the same corpus size.
+
+Seeds both backends with the same synthetic embeddings (clustered random
+vectors, no Ollama needed) and measures:
+1. Startup: time to open the embedded store (memory-mapped, zero-copy)
+2. Single-query latency (p50/p95) for pgvector, local flat and local IVF
+3. Batched throughput of the embedded store (`search_by_vectors`)
+4. Recall@k of local IVF against the exact flat scan
+
+Prerequisites:
+1. Docker containers must be running (docker-compose up -d) for the pgvector rows
+
+Usage:
+    python bench_local_store.py [total_chunks] [--queries 200] [--k 3] [--lists 256] [--no-pgvector]
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+import numpy as np
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from app.core.config import settings
+from app.rag.local_store import LocalVectorStore
+
+BENCH_COLLECTION = "bench_local_store"
+
+
+def make_vectors(total: int, dimensions: int, rng: np.random.Generator) -> np.ndarray:
+    centers = rng.standard_normal((max(total // 100, 1), dimensions))
+    vectors = centers[rng.integers(0, len(centers), total)] + 0.5 * rng.standard_normal((total, dimensions))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def seed(store, vectors: np.ndarray):
+    batch_size = 1000
+    for offset in range(0, len(vectors), batch_size):
+        batch = vectors[offset:offset + batch_size]
+        ids = [str(offset + i) for i in range(len(batch))]
+        store.add_embeddings(
+            texts=[f"synthetic chunk {i}" for i in ids],
+            embeddings=batch.tolist(),
+            metadatas=[{"source_file": f"doc_{int(i) % 100}.pdf"} for i in ids],
+            ids=ids,
+        )
+
+
+def report(label: str, latencies: list[float]):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{label:<22} p50={statistics.median(latencies):8.2f}ms p95={p95:8.2f}ms")
+
+
+def time_queries(store, queries: np.ndarray, k: int) -> tuple[list[float], list[set]]:
+    latencies, found = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results = store.similarity_search_with_score_by_vector(query.tolist(), k=k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        found.append({doc.id for doc, _ in results})
+    return latencies, found
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("total_chunks", type=int, nargs="?", default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--lists", type=int, default=256)
+    parser.add_argument("--no-pgvector", action="store_true")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Embedded Vector Store Benchmark")
+    print("=" * 60)
+
+    dimensions = settings.VECTOR_DIMENSIONS
+    rng = np.random.default_rng(0)
+    vectors = make_vectors(args.total_chunks, dimensions, rng)
+    queries = vectors[rng.integers(0, len(vectors), args.queries)]
+    queries = queries + 0.1 * rng.standard_normal(queries.shape).astype(np.float32)
+    embeddings = DeterministicFakeEmbedding(size=dimensions)
+
+    with tempfile.TemporaryDirectory() as path:
+        print(f"Seeding {args.total_chunks} chunks (local)...")
+        seed(LocalVectorStore(embeddings, BENCH_COLLECTION, path=path), vectors)
+
+        start = time.perf_counter()
+        local = LocalVectorStore(embeddings, BENCH_COLLECTION, path=path)
+        print(f"✅ Local store opened in {(time.perf_counter() - start) * 1000:.1f}ms\n")
+
+        flat_latencies, exact = time_queries(local, queries, args.k)
+        report("local flat", flat_latencies)
+
+        start = time.perf_counter()
+        local.search_by_vectors(queries.tolist(), k=args.k)
+        batched = time.perf_counter() - start
+        print(f"{'local flat (batched)':<22} {len(queries) / batched:8.0f} queries/s")
+
+        start = time.perf_counter()
+        local.build_ivf(args.lists)
+        print(f"\nIVF trained ({args.lists} lists) in {time.perf_counter() - start:.1f}s")
+        ivf_latencies, found = time_queries(local, queries, args.k)
+        report(f"local IVF ({settings.LOCAL_INDEX_IVF_PROBES} probes)", ivf_latencies)
+        recall = sum(len(a & b) for a, b in zip(exact, found)) / (len(queries) * args.k)
+        print(f"{'local IVF recall@' + str(args.k):<22} {recall:.3f}")
+
+    if args.no_pgvector:
+        return
+
+    from langchain_postgres import PGVector
+    from sqlalchemy import text
+    from app.rag.quantization import ann_index_sql
+    from app.rag.store import get_engine
+
+    print(f"\nSeeding {args.total_chunks} chunks (pgvector)...")
+    store = PGVector(
+        embeddings=embeddings,
+        collection_name=BENCH_COLLECTION,
+        connection=get_engine(),
+        embedding_length=dimensions,
+        use_jsonb=True,
+        pre_delete_collection=True,
+    )
+    seed(store, vectors)
+    with store.session_maker() as session:
+        uuid = store.get_collection(session).uuid
+    with get_engine().begin() as conn:
+        # PGVector's own search walks the full-precision index
+        conn.execute(text(ann_index_sql("none", BENCH_COLLECTION, uuid)))
+    pg_latencies, _ = time_queries(store, queries, args.k)
+    report("pgvector HNSW", pg_latencies)
+
+    store.delete_collection()
+    print("\n✅ Benchmark collection removed")
+
+
+if __name__ == "__main__":
+    main()
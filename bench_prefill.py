@@ -0,0 +1,98 @@
+"""
+Benchmark: prompt prefill per turn on multi-turn threads.
+
+Runs the agent graph (in-memory checkpointer) over several threads of
+follow-up questions and reports, per turn, the prompt tokens Ollama had to
+evaluate and the prefill time (`prompt_eval_count` / `prompt_eval_duration`
+of every model call in the turn). Tokens found in Ollama's prompt cache are
+not evaluated again, so with a stable prefix they stay flat as the thread grows.
+
+Compares:
+1. stable: the agent as shipped (static system prompt, append-only history)
+2. unstable: a per-turn nonce at the top of the system prompt, i.e. what a
+   changing prefix (timestamps, per-request context) costs
+
+Prerequisites:
+1. Ollama must be running with the LLM and embedding models pulled
+2. Documents ingested (or VECTOR_BACKEND=local with a local index)
+
+Usage:
+    python bench_prefill.py [--threads 3] [--turns 4] [--mode both|stable|unstable]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+import uuid
+from langchain_core.messages import AIMessage
+from langgraph.checkpoint.memory import InMemorySaver
+
+from app.agent import nodes
+from app.agent.graph import create_graph
+
+QUESTIONS = [
+    "How do I restart the service?",
+    "What does error 502 mean in that context?",
+    "Which logs should I check first?",
+    "Summarize the steps you suggested so far.",
+    "Is there anything else in the documentation about this?",
+]
+
+base_prompt = nodes.SYSTEM_PROMPT
+
+
+def run_thread(graph, turns: int, unstable: bool) -> list[tuple[int, float]]:
+    """Run one thread; returns (prompt tokens evaluated, prefill ms) per turn."""
+    config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+    per_turn = []
+    seen = 0
+    for question in QUESTIONS[:turns]:
+        if unstable:
+            nodes.SYSTEM_PROMPT = f"Request {uuid.uuid4()}\n" + base_prompt
+        result = graph.invoke({"messages": [("user", question)]}, config=config)
+        calls = [m for m in result["messages"][seen:] if isinstance(m, AIMessage)]
+        seen = len(result["messages"])
+        tokens = sum(m.response_metadata.get("prompt_eval_count", 0) for m in calls)
+        prefill_ms = sum(m.response_metadata.get("prompt_eval_duration", 0) for m in calls) / 1e6
+        per_turn.append((tokens, prefill_ms))
+    return per_turn
+
+
+def report(label: str, graph, threads: int, turns: int, unstable: bool):
+    start = time.perf_counter()
+    results = [run_thread(graph, turns, unstable) for _ in range(threads)]
+    elapsed = time.perf_counter() - start
+
+    print(f"\n--- {label} ({elapsed:.1f}s) ---")
+    print(f"{'turn':<6} {'tokens evaluated':>18} {'prefill ms (median)':>22}")
+    for turn in range(turns):
+        tokens = statistics.median(r[turn][0] for r in results)
+        prefill = statistics.median(r[turn][1] for r in results)
+        print(f"{turn + 1:<6} {tokens:>18.0f} {prefill:>22.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=3)
+    parser.add_argument("--turns", type=int, default=4)
+    parser.add_argument("--mode", choices=["both", "stable", "unstable"], default="both")
+    args = parser.parse_args()
+    if not 1 <= args.turns <= len(QUESTIONS):
+        sys.exit(f"--turns must be between 1 and {len(QUESTIONS)}")
+
+    print("=" * 60)
+    print("Prompt Prefill Benchmark")
+    print("=" * 60)
+    print(f"{args.threads} threads x {args.turns} turns")
+
+    graph = create_graph(checkpointer=InMemorySaver())
+    if args.mode in ("both", "stable"):
+        report("stable prefix", graph, args.threads, args.turns, unstable=False)
+    if args.mode in ("both", "unstable"):
+        report("unstable prefix", graph, args.threads, args.turns, unstable=True)
+        nodes.SYSTEM_PROMPT = base_prompt
+
+
+if __name__ == "__main__":
+    main()
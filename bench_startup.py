@@ -0,0 +1,88 @@
+"""
+Benchmark: API cold-start time.
+
+Measures:
+1. `import app.main` in a fresh interpreter (median of N runs) and the
+   slowest modules reported by `python -X importtime`
+2. The `lifespan` startup phase (DB pool, checkpointer, warm-up), per step
+3. Latency of the first retrieval after startup
+
+Prerequisites:
+1. Docker containers must be running (docker-compose up -d)
+2. Ollama must be running with the LLM and embedding models pulled
+
+Usage:
+    python bench_startup.py [--runs 5] [--top 10] [--no-lifespan]
+"""
+
+import argparse
+import asyncio
+import statistics
+import subprocess
+import sys
+import time
+
+
+def measure_import(runs: int) -> float:
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "import app.main"], check=True)
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+def slowest_imports(top: int) -> list[tuple[int, str]]:
+    """Largest cumulative import time (us) per third-party package, from -X importtime."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        check=True, capture_output=True, text=True,
+    )
+    totals = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        package = name.split(".")[0]
+        if package != "app":
+            totals[package] = max(totals.get(package, 0), int(cumulative))
+    return sorted(((us, name) for name, us in totals.items()), reverse=True)[:top]
+
+
+async def measure_lifespan():
+    from app.main import app
+    from app.agent.tools import search_knowledge_base
+
+    start = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        print(f"{'lifespan startup':<22} {time.perf_counter() - start:8.2f}s")
+
+        start = time.perf_counter()
+        await asyncio.to_thread(search_knowledge_base.invoke, {"query": "warm-up benchmark"})
+        print(f"{'first retrieval':<22} {(time.perf_counter() - start) * 1000:8.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--no-lifespan", action="store_true")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("API Startup Benchmark")
+    print("=" * 60)
+
+    print(f"{'import app.main':<22} {measure_import(args.runs):8.2f}s (median of {args.runs})")
+    print("\n--- Slowest imported packages ---")
+    for us, name in slowest_imports(args.top):
+        print(f"{name:<22} {us / 1000:8.1f}ms")
+
+    if args.no_lifespan:
+        return
+    print("\n--- Startup (see 'Warm-up complete' log for per-step timings) ---")
+    asyncio.run(measure_lifespan())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,54 +1,249 @@
-import requests
+import asyncio
+import itertools
+import json
 import os
-from typing import Dict, Any, Optional
 import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+import httpx
+
+# Responses worth retrying. A chat is only retried when it cannot have reached the
+# agent (502/503: API down or starting up); a 504 (proxy timeout) may arrive while
+# the agent is still answering, so only idempotent GETs retry it too
+RETRY_STATUS = {502, 503}
+RETRY_STATUS_IDEMPOTENT = RETRY_STATUS | {504}
+CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout)
 
 class APIClient:
     """
     Client for interacting with the Agent API.
+
+    Keeps one pooled keep-alive connection per host for its lifetime (sync and
+    async), so create it once and reuse it (e.g. `st.cache_resource`).
+    Requests that never reached the agent (connection errors, 502/503) are
+    retried with exponential backoff; GETs are also retried on 504. A chat is
+    not retried on 504 or any other response, since it may have reached the
+    agent, so a thread's turn is not sent twice.
+
+    Environment overrides: API_URL, API_TIMEOUT (seconds to wait for an answer),
+    API_RETRIES, API_RETRY_BACKOFF (seconds, doubled on each retry).
     """
-    
-    def __init__(self, base_url: str = None):
+
+    def __init__(
+        self,
+        base_url: str = None,
+        timeout: float = None,
+        connect_timeout: float = 5.0,
+        retries: int = None,
+        backoff: float = None,
+    ):
         self.base_url = base_url or os.getenv("API_URL", "http://localhost:8000")
-        
+        # Kept above the API's own answer deadline (CHAT_DEADLINE_SECONDS)
+        self.timeout = httpx.Timeout(timeout or float(os.getenv("API_TIMEOUT", "120")), connect=connect_timeout)
+        self.retries = int(os.getenv("API_RETRIES", "2")) if retries is None else retries
+        self.backoff = float(os.getenv("API_RETRY_BACKOFF", "0.5")) if backoff is None else backoff
+        self._client = httpx.Client(base_url=self.base_url, timeout=self.timeout)
+        self._async_client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        # Created on first use, inside the caller's event loop
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout)
+        return self._async_client
+
+    def close(self) -> None:
+        self._client.close()
+
+    async def aclose(self) -> None:
+        self._client.close()
+        if self._async_client is not None:
+            await self._async_client.aclose()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    def _retryable(self, attempt: int, response: Optional[httpx.Response] = None) -> bool:
+        """Whether to retry after a connection error (no response) or a retryable status."""
+        if attempt >= self.retries:
+            return False
+        if response is None:
+            return True
+        retry_status = RETRY_STATUS_IDEMPOTENT if response.request.method == "GET" else RETRY_STATUS
+        return response.status_code in retry_status
+
+    def _request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        for attempt in itertools.count():
+            try:
+                response = self._client.request(method, path, **kwargs)
+            except CONNECT_ERRORS:
+                if not self._retryable(attempt):
+                    raise
+            else:
+                if not self._retryable(attempt, response):
+                    return response
+            time.sleep(self.backoff * 2 ** attempt)
+
+    async def _arequest(self, method: str, path: str, **kwargs) -> httpx.Response:
+        for attempt in itertools.count():
+            try:
+                response = await self.async_client.request(method, path, **kwargs)
+            except CONNECT_ERRORS:
+                if not self._retryable(attempt):
+                    raise
+            else:
+                if not self._retryable(attempt, response):
+                    return response
+            await asyncio.sleep(self.backoff * 2 ** attempt)
+
+    @staticmethod
+    def _payload(message: str, thread_id: Optional[str], sources: Optional[List[str]]) -> Dict[str, Any]:
+        payload = {"message": message}
+        if thread_id:
+            payload["thread_id"] = thread_id
+        if sources:
+            payload["sources"] = sources
+        return payload
+
+    @staticmethod
+    def _error(e: Exception) -> Dict[str, Any]:
+        return {"error": str(e), "response": "Error communicating with the agent."}
+
     def check_health(self) -> bool:
-        """Check if the API is running."""
+        """Check if the API is ready (database, vector store and Ollama reachable)."""
         try:
-            response = requests.get(f"{self.base_url}/", timeout=2)
-            return response.status_code == 200
-        except requests.RequestException:
+            return self._client.get("/health/ready", timeout=5).status_code == 200
+        except httpx.HTTPError:
             return False
 
-    def get_files(self) -> List[str]:
-        """Fetch list of available files from the backend."""
+    async def acheck_health(self) -> bool:
+        """Async variant of `check_health`."""
         try:
-            response = requests.get(f"{self.base_url}/files", timeout=2)
-            if response.status_code == 200:
-                data = response.json()
-                return data.get("files", [])
-            return []
-        except requests.RequestException:
-            return []
-
-    def send_message(self, message: str, thread_id: Optional[str] = None) -> Dict[str, Any]:
+            return (await self.async_client.get("/health/ready", timeout=5)).status_code == 200
+        except httpx.HTTPError:
+            return False
+
+    def list_files(self, offset: int = 0, limit: int = 100, **filters) -> Dict[str, Any]:
+        """
+        Fetch one page of the ingested files catalog.
+
+        Args:
+            offset: Entries to skip
+            limit: Page size
+            **filters: Other GET /files parameters: tenant_id, q, file_type,
+                status, sort, order
+
+        Returns:
+            Dict with `total` and `files` (name, file_type, size, chunks,
+            ingested_at, status); an empty page (and `error`) on failure
+        """
+        params = {"offset": offset, "limit": limit, **{k: v for k, v in filters.items() if v is not None}}
+        try:
+            response = self._request("GET", "/files", params=params, timeout=5)
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPError as e:
+            return {"total": 0, "files": [], "error": str(e)}
+
+    def get_files(self) -> List[str]:
+        """Fetch the names of the ingested files (first page of the catalog)."""
+        return [f["name"] for f in self.list_files(limit=1000)["files"]]
+
+    def send_message(
+        self, message: str, thread_id: Optional[str] = None, sources: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
         """
         Send a chat message to the agent.
-        
+
         Args:
             message: The user's query
             thread_id: Optional session ID for conversation history
-            
+            sources: Optional file names to restrict retrieval to
+
         Returns:
-            Dict containing the response and thread_id
+            Dict containing the response and thread_id (and `error` on failure)
         """
-        payload = {"message": message}
-        if thread_id:
-            payload["thread_id"] = thread_id
-            
         try:
-            # Increased timeout significantly for RAG + LLM generation
-            response = requests.post(f"{self.base_url}/chat", json=payload, timeout=120) 
+            response = self._request("POST", "/chat", json=self._payload(message, thread_id, sources))
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPError as e:
+            return self._error(e)
+
+    async def asend_message(
+        self, message: str, thread_id: Optional[str] = None, sources: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """Async variant of `send_message`."""
+        try:
+            response = await self._arequest("POST", "/chat", json=self._payload(message, thread_id, sources))
             response.raise_for_status()
             return response.json()
-        except requests.RequestException as e:
-            return {"error": str(e), "response": "Error communicating with the agent."}
+        except httpx.HTTPError as e:
+            return self._error(e)
+
+    def stream_message(
+        self, message: str, thread_id: Optional[str] = None, sources: Optional[List[str]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Send a chat message and yield the answer as it is generated (POST /chat/stream).
+
+        Yields:
+            `{"type": "token", "content"}` events, then one `{"type": "done", ...}`
+            event with the /chat response fields, or `{"type": "error", "detail"}`
+        """
+        payload = self._payload(message, thread_id, sources)
+        for attempt in itertools.count():
+            try:
+                with self._client.stream("POST", "/chat/stream", json=payload) as response:
+                    if not self._retryable(attempt, response):
+                        if response.status_code != 200:
+                            response.read()
+                            yield {"type": "error", "detail": f"{response.status_code}: {response.text}"}
+                            return
+                        for line in response.iter_lines():
+                            if line:
+                                yield json.loads(line)
+                        return
+            except CONNECT_ERRORS as e:
+                if not self._retryable(attempt):
+                    yield {"type": "error", "detail": str(e)}
+                    return
+            except httpx.HTTPError as e:
+                yield {"type": "error", "detail": str(e)}
+                return
+            time.sleep(self.backoff * 2 ** attempt)
+
+    async def astream_message(
+        self, message: str, thread_id: Optional[str] = None, sources: Optional[List[str]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Async variant of `stream_message`."""
+        payload = self._payload(message, thread_id, sources)
+        for attempt in itertools.count():
+            try:
+                async with self.async_client.stream("POST", "/chat/stream", json=payload) as response:
+                    if not self._retryable(attempt, response):
+                        if response.status_code != 200:
+                            await response.aread()
+                            yield {"type": "error", "detail": f"{response.status_code}: {response.text}"}
+                            return
+                        async for line in response.aiter_lines():
+                            if line:
+                                yield json.loads(line)
+                        return
+            except CONNECT_ERRORS as e:
+                if not self._retryable(attempt):
+                    yield {"type": "error", "detail": str(e)}
+                    return
+            except httpx.HTTPError as e:
+                yield {"type": "error", "detail": str(e)}
+                return
+            await asyncio.sleep(self.backoff * 2 ** attempt)
@@ -1,16 +1,26 @@
 import streamlit as st
-import requests
 import uuid
-import os
 import time
+from api_client import APIClient
 
 st.set_page_config(page_title="Agent Empty - Debugger", page_icon="🕵️", layout="wide")
 
-API_URL = os.getenv("API_URL", "http://localhost:8000")
-DATA_DIR = "data/raw"  # Caminho local para checar arquivos
+FILES_PAGE_SIZE = 50  # Arquivos por página na barra lateral
 
 st.title("🕵️ Agent RAG Debugger")
 
+@st.cache_resource
+def get_client() -> APIClient:
+    """One client (and its keep-alive connections) shared by every rerun and session."""
+    return APIClient()
+
+client = get_client()
+
+@st.cache_data(ttl=10, show_spinner=False)
+def get_files_page(query: str, page: int) -> dict:
+    """Página do catálogo de arquivos (GET /files); cacheada para não consultar a API a cada rerun."""
+    return client.list_files(offset=page * FILES_PAGE_SIZE, limit=FILES_PAGE_SIZE, q=query or None)
+
 # --- SIDEBAR: Gerenciamento e Status ---
 with st.sidebar:
     st.header("🎮 Controle")
@@ -35,15 +45,18 @@ with st.sidebar:
     
     # Lista de Arquivos Ingeridos (Visualização)
     st.header("📂 Base de Conhecimento")
-    try:
-        files = os.listdir(DATA_DIR)
-        if files:
-            for f in files:
-                st.caption(f"📄 {f}")
-        else:
-            st.warning("Nenhum arquivo em data/raw")
-    except FileNotFoundError:
-        st.error(f"Pasta {DATA_DIR} não encontrada")
+    query = st.text_input("Filtrar arquivos", placeholder="nome contém...")
+    page = st.number_input("Página", min_value=1, value=1, step=1) - 1
+    catalog = get_files_page(query, page)
+    if "error" in catalog:
+        st.error(f"Erro ao listar arquivos: {catalog['error']}")
+    elif catalog["files"]:
+        st.caption(f"{catalog['total']} arquivo(s)")
+        for f in catalog["files"]:
+            status = "📄" if f["status"] == "ingested" else "⚠️"
+            st.caption(f"{status} {f['name']} · {f['chunks']} trechos · {f['ingested_at'][:16].replace('T', ' ')}")
+    else:
+        st.warning("Nenhum arquivo ingerido")
 
 # --- CHAT PRINCIPAL ---
 if "messages" not in st.session_state:
@@ -72,38 +85,38 @@ if prompt := st.chat_input("Pergunte algo aos seus dados..."):
         placeholder.markdown("⏳ *Consultando base de vetores...*")
         
         start_time = time.time()
-        try:
-            payload = {"message": prompt, "thread_id": st.session_state.thread_id}
-            response = requests.post(f"{API_URL}/chat", json=payload)
-            end_time = time.time()
-            latency = end_time - start_time
-            
-            if response.status_code == 200:
-                data = response.json()
-                content = data.get("response", "")
-                sources = data.get("sources", [])
-                
-                # Exibe resposta final
-                placeholder.markdown(content)
-                
-                # Exibe Contexto de RAG (Se houver)
-                if sources:
-                    with st.expander(f"📚 Contexto Recuperado ({len(sources)} trechos) - {latency:.2f}s"):
-                        for idx, source in enumerate(sources):
-                            st.markdown(f"**Trecho {idx+1}:**")
-                            st.info(source)
-                else:
-                    st.caption(f"⏱️ Resposta gerada em {latency:.2f}s (Sem uso de ferramentas)")
-
-                # Salva no histórico com as fontes
-                st.session_state.messages.append({
-                    "role": "assistant", 
-                    "content": content,
-                    "sources": sources
-                })
-                
+        # Resposta renderizada conforme é gerada (POST /chat/stream)
+        streamed = ""
+        data = None
+        for event in client.stream_message(prompt, thread_id=st.session_state.thread_id):
+            if event["type"] == "token":
+                streamed += event["content"]
+                placeholder.markdown(streamed + "▌")
+            elif event["type"] == "done":
+                data = event
             else:
-                placeholder.error(f"Erro {response.status_code}: {response.text}")
+                placeholder.error(f"Erro: {event['detail']}")
+        latency = time.time() - start_time
         
-        except Exception as e:
-            placeholder.error(f"Erro de conexão: {e}")
\ No newline at end of file
+        if data is not None:
+            content = data.get("response", "")
+            sources = [f"{ref['source']} (score {ref['score']:.2f})\n{ref['snippet']}" for ref in data.get("references", [])]
+            
+            # Exibe resposta final
+            placeholder.markdown(content)
+            
+            # Exibe Contexto de RAG (Se houver)
+            if sources:
+                with st.expander(f"📚 Contexto Recuperado ({len(sources)} trechos) - {latency:.2f}s"):
+                    for idx, source in enumerate(sources):
+                        st.markdown(f"**Trecho {idx+1}:**")
+                        st.info(source)
+            else:
+                st.caption(f"⏱️ Resposta gerada em {latency:.2f}s (Sem uso de ferramentas)")
+
+            # Salva no histórico com as fontes
+            st.session_state.messages.append({
+                "role": "assistant", 
+                "content": content,
+                "sources": sources
+            })
@@ -0,0 +1,56 @@
+"""
+Production launcher for the API.
+
+Unlike `run.py` (single process, auto-reload), this starts WEB_WORKERS
+uvicorn worker processes without reload:
+1. Every worker sizes its DB pools from DB_CONNECTION_BUDGET / WEB_WORKERS,
+   so adding workers does not multiply Postgres connections
+2. Caches that should survive across workers use the shared tier
+   (CACHE_BACKEND=local or postgres, see app/core/cache.py)
+
+Usage:
+    python serve.py [--workers N] [--host HOST] [--port PORT]
+
+With gunicorn managing the workers instead, export WEB_WORKERS so the
+connection budget is split the same way:
+    WEB_WORKERS=4 gunicorn app.main:app -k uvicorn.workers.UvicornWorker -w 4 -b 0.0.0.0:8000
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import uvicorn
+
+# Force SelectorEventLoop on Windows for psycopg compatibility
+if sys.platform == 'win32':
+    asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+
+def main():
+    from app.core.config import settings
+
+    parser = argparse.ArgumentParser(description="Run the API with multiple worker processes.")
+    parser.add_argument("--workers", type=int, default=settings.WEB_WORKERS)
+    parser.add_argument("--host", default=settings.WEB_HOST)
+    parser.add_argument("--port", type=int, default=settings.WEB_PORT)
+    args = parser.parse_args()
+
+    # Workers read their settings from the environment: make them agree on the split
+    os.environ["WEB_WORKERS"] = str(args.workers)
+    settings.WEB_WORKERS = args.workers
+    budget = settings.worker_connection_budget()
+    if settings.CACHE_BACKEND == "memory" and args.workers > 1:
+        print("⚠️  CACHE_BACKEND=memory: caches are not shared between workers")
+    print(
+        f"Starting {args.workers} worker(s) on {args.host}:{args.port} "
+        f"(DB connections per worker: {budget['checkpointer']} checkpointer, "
+        f"{budget['logging']} logging, {budget['retrieval']} retrieval; "
+        f"cache: {settings.CACHE_BACKEND})"
+    )
+
+    uvicorn.run("app.main:app", host=args.host, port=args.port, workers=args.workers, reload=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Unit tests for the ingested file catalog (app/rag/catalog.py).
+"""
+
+import json
+
+import pytest
+
+from app.rag import catalog
+from app.rag.manifest import IngestionManifest
+
+FILES = {
+    "guide.pdf": (4000, 12),
+    "api.md": (1200, 5),
+    "blank.txt": (10, 0),
+    "Workflows.PDF": (9000, 30),
+    "notes.md": (300, 1),
+}
+
+
+@pytest.fixture
+def manifest_path(tmp_path, monkeypatch):
+    path = tmp_path / "test.manifest.json"
+    entries = {
+        str((tmp_path / name).resolve()): {
+            "source_file": name,
+            "size": size,
+            "mtime_ns": 0,
+            "chunks": chunks,
+            "ingested_at": f"2024-01-0{i + 1}T00:00:00+00:00",
+        }
+        for i, (name, (size, chunks)) in enumerate(FILES.items())
+    }
+    path.write_text(json.dumps(entries), encoding="utf-8")
+    monkeypatch.setattr(IngestionManifest, "for_collection", classmethod(lambda cls, name: cls(path)))
+    monkeypatch.setattr(catalog, "_catalogs", {})
+    return path
+
+
+def names(page):
+    return [f["name"] for f in page["files"]]
+
+
+def test_pages_cover_all_files_once(manifest_path):
+    first = catalog.list_files(offset=0, limit=2)
+    second = catalog.list_files(offset=2, limit=2)
+    third = catalog.list_files(offset=4, limit=2)
+    assert first["total"] == second["total"] == third["total"] == 5
+    assert names(first) + names(second) + names(third) == sorted(FILES)
+    assert names(catalog.list_files(offset=10)) == []
+
+
+def test_page_size_and_offset_are_clamped(manifest_path):
+    page = catalog.list_files(offset=-3, limit=catalog.MAX_PAGE_SIZE + 1)
+    assert page["offset"] == 0
+    assert page["limit"] == catalog.MAX_PAGE_SIZE
+    assert len(page["files"]) == 5
+
+
+def test_filters(manifest_path):
+    assert names(catalog.list_files(query="WORK")) == ["Workflows.PDF"]
+    assert names(catalog.list_files(file_type=".pdf")) == ["Workflows.PDF", "guide.pdf"]
+    assert names(catalog.list_files(status="empty")) == ["blank.txt"]
+    combined = catalog.list_files(file_type="md", status="ingested", limit=1)
+    assert combined["total"] == 2
+    assert names(combined) == ["api.md"]
+
+
+def test_sorting(manifest_path):
+    assert names(catalog.list_files(sort="size", descending=True, limit=2)) == ["Workflows.PDF", "guide.pdf"]
+    assert names(catalog.list_files(sort="chunks"))[0] == "blank.txt"
+    assert names(catalog.list_files(sort="ingested_at")) == list(FILES)
+    with pytest.raises(ValueError):
+        catalog.list_files(sort="mtime")
+
+
+def test_entries_carry_type_and_status(manifest_path):
+    blank = catalog.list_files(query="blank")["files"][0]
+    assert blank == {
+        "name": "blank.txt",
+        "file_type": "txt",
+        "size": 10,
+        "chunks": 0,
+        "ingested_at": "2024-01-03T00:00:00+00:00",
+        "status": "empty",
+    }
+
+
+def test_changed_manifest_is_picked_up(manifest_path, tmp_path):
+    assert catalog.list_files()["total"] == 5
+    added = tmp_path / "added.md"
+    added.write_text("new file", encoding="utf-8")
+    manifest = IngestionManifest(manifest_path)
+    manifest.record(added, "added.md", chunks=2)
+    manifest.flush()
+    assert "added.md" in names(catalog.list_files())
+
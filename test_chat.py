@@ -1,20 +1,19 @@
-import requests
 import json
+from frontend.api_client import APIClient
 
 try:
-    url = "http://127.0.0.1:8002/chat"
-    payload = {"message": "Como posso otimizar meu repeating group no Bubble?"}
-    headers = {"Content-Type": "application/json"}
-    
-    print(f"Sending request to {url}...")
-    response = requests.post(url, json=payload, headers=headers)
-    
-    print(f"Status Code: {response.status_code}")
-    if response.status_code == 200:
-        print("Response JSON:")
-        print(json.dumps(response.json(), indent=2, ensure_ascii=False))
-    else:
-        print(f"Error: {response.text}")
+    with APIClient("http://127.0.0.1:8002") as client:
+        message = "Como posso otimizar meu repeating group no Bubble?"
+        
+        print(f"Sending request to {client.base_url}/chat/stream...")
+        for event in client.stream_message(message):
+            if event["type"] == "token":
+                print(event["content"], end="", flush=True)
+            elif event["type"] == "done":
+                print("\n\nResponse JSON:")
+                print(json.dumps(event, indent=2, ensure_ascii=False))
+            else:
+                print(f"Error: {event['detail']}")
 
 except Exception as e:
     print(f"Failed to connect: {e}")
@@ -0,0 +1,90 @@
+"""
+Unit tests for the token-aware chunker (app/rag/chunking.py).
+
+A whitespace tokenizer stands in for the HuggingFace one (one token per
+word), so the tests run without downloading a vocabulary.
+"""
+
+import re
+
+import pytest
+from langchain_core.documents import Document
+
+from app.rag.chunking import TokenAwareChunker
+
+
+class _Encoding:
+    def __init__(self, text: str):
+        spans = [m.span() for m in re.finditer(r"\S+", text)]
+        self.ids = list(range(len(spans)))
+        self.offsets = spans
+
+
+class WhitespaceTokenizer:
+    def encode(self, text, add_special_tokens=False):
+        return _Encoding(text)
+
+    def encode_batch(self, texts, add_special_tokens=False):
+        return [_Encoding(t) for t in texts]
+
+
+def make_chunker(chunk_tokens: int, overlap_tokens: int) -> TokenAwareChunker:
+    chunker = TokenAwareChunker.__new__(TokenAwareChunker)
+    chunker.chunk_tokens = chunk_tokens
+    chunker.overlap_tokens = overlap_tokens
+    chunker.tokenizer = WhitespaceTokenizer()
+    return chunker
+
+
+def tokens(text: str) -> int:
+    return len(text.split())
+
+
+def test_chunks_respect_the_token_budget_and_sentence_boundaries():
+    sentences = [f"Sentence number {i} has five." for i in range(10)]
+    chunks = make_chunker(chunk_tokens=12, overlap_tokens=0).split_text(" ".join(sentences))
+    assert all(tokens(c) <= 12 for c in chunks)
+    # Whole sentences only, in order, each exactly once without overlap
+    assert " ".join(chunks) == " ".join(sentences)
+    assert all(c.endswith(".") for c in chunks)
+
+
+def test_overlap_carries_whole_trailing_sentences():
+    sentences = [f"Sentence number {i} has five." for i in range(6)]
+    chunks = make_chunker(chunk_tokens=10, overlap_tokens=5).split_text(" ".join(sentences))
+    assert chunks[0] == " ".join(sentences[0:2])
+    assert chunks[1] == " ".join(sentences[1:3])
+    assert chunks[-1].endswith(sentences[-1])
+
+
+def test_headings_start_new_chunks():
+    text = "# Setup\nInstall the plugin. Add the key.\n# Usage\nCall the action."
+    chunks = make_chunker(chunk_tokens=50, overlap_tokens=0).split_text(text)
+    assert chunks == ["# Setup Install the plugin. Add the key.", "# Usage Call the action."]
+
+
+def test_oversized_sentence_is_split_on_token_offsets():
+    long_sentence = " ".join(f"w{i}" for i in range(25)) + "."
+    chunks = make_chunker(chunk_tokens=10, overlap_tokens=0).split_text(long_sentence)
+    assert [tokens(c) for c in chunks] == [10, 10, 5]
+    assert " ".join(chunks) == long_sentence
+
+
+def test_pure_overlap_chunks_are_dropped():
+    assert TokenAwareChunker._dedupe(["a b c", "b c", "", "c d"]) == ["a b c", "c d"]
+
+
+def test_split_documents_copies_metadata():
+    chunker = make_chunker(chunk_tokens=6, overlap_tokens=0)
+    source = Document(page_content="One two three. Four five six. Seven eight.", metadata={"page": 2})
+    docs = chunker.split_documents([source])
+    assert [d.page_content for d in docs] == ["One two three. Four five six.", "Seven eight."]
+    assert all(d.metadata == {"page": 2} for d in docs)
+    docs[0].metadata["extra"] = True
+    assert source.metadata == {"page": 2}
+    assert docs[1].metadata == {"page": 2}
+
+
+def test_overlap_must_be_smaller_than_chunk():
+    with pytest.raises(ValueError):
+        TokenAwareChunker(chunk_tokens=10, overlap_tokens=10)
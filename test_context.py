@@ -0,0 +1,44 @@
+"""
+Unit tests for retrieval payload rendering (app/agent/context.py).
+"""
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from app.agent.context import prepare_messages, render_references
+from app.core.config import settings
+
+
+def tool_result(i: int) -> ToolMessage:
+    artifact = {
+        "query": f"q{i}",
+        "chunks": [
+            {"id": f"{i}-{j}", "source": f"doc{i}.md", "score": 0.9, "snippet": "word " * 200}
+            for j in range(5)
+        ],
+    }
+    return ToolMessage(content=render_references(artifact), artifact=artifact, tool_call_id=f"call_{i}")
+
+
+def tool_call(i: int) -> AIMessage:
+    return AIMessage(content="", tool_calls=[{"name": "search_knowledge_base", "args": {"query": f"q{i}"}, "id": f"call_{i}"}])
+
+
+def test_earlier_results_render_the_same_after_more_tool_rounds():
+    messages = [HumanMessage(content="question"), tool_call(0), tool_result(0)]
+    first_call = prepare_messages(messages)
+    messages += [tool_call(1), tool_result(1)]
+    second_call = prepare_messages(messages)
+    assert second_call[:3] == first_call
+    assert second_call[2].content != messages[2].content
+
+
+def test_each_result_stays_within_its_share_of_the_budget():
+    messages = [HumanMessage(content="question"), tool_call(0), tool_result(0)]
+    share = settings.RETRIEVAL_CONTEXT_TOKENS // settings.AGENT_MAX_TOOL_ITERATIONS
+    assert len(prepare_messages(messages)[2].content) <= share * 4
+
+
+def test_previous_turns_keep_their_references():
+    old = [HumanMessage(content="earlier"), tool_call(0), tool_result(0), AIMessage(content="answer")]
+    prepared = prepare_messages(old + [HumanMessage(content="next")])
+    assert prepared[2].content == old[2].content
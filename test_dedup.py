@@ -0,0 +1,78 @@
+"""
+Unit tests for SimHash near-duplicate detection (app/rag/dedup.py).
+"""
+
+import pytest
+from langchain_core.documents import Document
+from pydantic import ValidationError
+
+from app.core.config import Settings
+from app.rag.dedup import BANDS, BAND_BITS, _bands, _to_signed, _to_unsigned, dedupe_documents, hamming, simhash
+
+TEXT = (
+    "To schedule a backend workflow, open the Backend workflows editor, create a new "
+    "API workflow and call it from a page workflow with Schedule API workflow."
+)
+
+
+def test_simhash_is_deterministic_64_bit():
+    signature = simhash(TEXT)
+    assert signature == simhash(TEXT)
+    assert 0 <= signature < 1 << 64
+
+
+def test_simhash_ignores_case_and_punctuation():
+    assert simhash(TEXT) == simhash(TEXT.upper().replace(",", " "))
+
+
+def test_near_duplicates_are_closer_than_unrelated_text():
+    edited = TEXT.replace("new", "fresh")
+    unrelated = "Privacy rules restrict which fields of a data type each user role can read or search."
+    assert hamming(simhash(TEXT), simhash(edited)) < hamming(simhash(TEXT), simhash(unrelated))
+
+
+def test_bands_split_the_signature():
+    signature = simhash(TEXT)
+    bands = _bands(signature)
+    assert len(bands) == BANDS
+    assert all(0 <= band < 1 << BAND_BITS for band in bands)
+    assert sum(band << (BAND_BITS * i) for i, band in enumerate(bands)) == signature
+
+
+@pytest.mark.parametrize("flipped", [(0,), (0, 16), (3, 21, 40), (15, 31, 47)])
+def test_signatures_within_three_bits_share_a_band(flipped):
+    signature = simhash(TEXT)
+    other = signature
+    for bit in flipped:
+        other ^= 1 << bit
+    assert hamming(signature, other) == len(flipped)
+    assert any(a == b for a, b in zip(_bands(signature), _bands(other)))
+
+
+def test_signed_storage_round_trips():
+    for signature in (0, 1, (1 << 63) - 1, 1 << 63, (1 << 64) - 1):
+        stored = _to_signed(signature)
+        assert -(1 << 63) <= stored < 1 << 63
+        assert _to_unsigned(stored) == signature
+
+
+def test_dedupe_documents_keeps_best_ranked_copy():
+    docs = [
+        Document(page_content=TEXT, metadata={"source_file": "v1.pdf"}),
+        Document(page_content=TEXT, metadata={"source_file": "v2.pdf"}),
+        Document(page_content="Option sets define a static list of values.", metadata={"source_file": "a.md"}),
+    ]
+    kept = dedupe_documents(docs)
+    assert [d.metadata["source_file"] for d in kept] == ["v1.pdf", "a.md"]
+    assert dedupe_documents(docs, k=1) == docs[:1]
+
+
+def test_dedupe_documents_uses_stored_signature():
+    marked = Document(page_content="anything", metadata={"simhash": format(simhash(TEXT), "016x")})
+    assert dedupe_documents([Document(page_content=TEXT), marked]) == [Document(page_content=TEXT)]
+
+
+def test_max_hamming_above_band_guarantee_is_rejected():
+    assert Settings(DEDUP_MAX_HAMMING=3).DEDUP_MAX_HAMMING == 3
+    with pytest.raises(ValidationError):
+        Settings(DEDUP_MAX_HAMMING=4)
@@ -0,0 +1,112 @@
+"""
+Unit tests for query embedding coalescing (app/rag/embeddings.py).
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from app.rag import embeddings as embeddings_module
+from app.rag.embeddings import CoalescingEmbeddings, embed_queries
+
+
+def vector(text: str) -> List[float]:
+    return [float(len(text)), float(sum(map(ord, text)))]
+
+
+class FakeEmbeddings(Embeddings):
+    """Vectors derived from the text; records every request."""
+
+    def __init__(self, fail: bool = False):
+        self.requests: List[List[str]] = []
+        self.fail = fail
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.requests.append(list(texts))
+        if self.fail:
+            raise ConnectionError("ollama unavailable")
+        return [vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+class DictCache:
+    def __init__(self):
+        self.values = {}
+
+    def get(self, namespace, key):
+        return self.values.get((namespace, key))
+
+    def set(self, namespace, key, value, ttl=None):
+        self.values[(namespace, key)] = value
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = DictCache()
+    monkeypatch.setattr(embeddings_module, "get_cache", lambda: cache)
+    return cache
+
+
+def embed_concurrently(embeddings: CoalescingEmbeddings, texts: List[str]):
+    with ThreadPoolExecutor(max_workers=len(texts)) as pool:
+        return list(pool.map(embeddings.embed_query, texts))
+
+
+def test_concurrent_queries_share_one_request(cache):
+    inner = FakeEmbeddings()
+    embeddings = CoalescingEmbeddings(inner, window_ms=2000, max_batch=4)
+    texts = ["alpha", "beta", "gamma", "delta"]
+    # A full batch is sent without waiting for the window to close
+    vectors = embed_concurrently(embeddings, texts)
+    assert vectors == [vector(text) for text in texts]
+    assert len(inner.requests) == 1
+    assert sorted(inner.requests[0]) == sorted(texts)
+
+
+def test_batches_are_capped_at_max_batch(cache):
+    inner = FakeEmbeddings()
+    embeddings = CoalescingEmbeddings(inner, window_ms=200, max_batch=2)
+    texts = [f"query {i}" for i in range(5)]
+    assert embed_concurrently(embeddings, texts) == [vector(text) for text in texts]
+    assert all(len(request) <= 2 for request in inner.requests)
+    assert sorted(text for request in inner.requests for text in request) == texts
+
+
+def test_identical_queries_are_embedded_once(cache):
+    inner = FakeEmbeddings()
+    embeddings = CoalescingEmbeddings(inner, window_ms=200, max_batch=8)
+    vectors = embed_concurrently(embeddings, ["same"] * 4)
+    assert all(vector == vectors[0] for vector in vectors)
+    assert [text for request in inner.requests for text in request] == ["same"]
+
+
+def test_cached_queries_skip_the_model(cache):
+    inner = FakeEmbeddings()
+    embeddings = CoalescingEmbeddings(inner, window_ms=0, max_batch=8)
+    first = embeddings.embed_query("cached")
+    assert embeddings.embed_query("cached") == first
+    assert len(inner.requests) == 1
+
+
+def test_request_errors_reach_every_caller(cache):
+    embeddings = CoalescingEmbeddings(FakeEmbeddings(fail=True), window_ms=200, max_batch=8)
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        futures = [pool.submit(embeddings.embed_query, text) for text in ("a", "b", "c")]
+        for future in futures:
+            with pytest.raises(ConnectionError):
+                future.result()
+    assert cache.values == {}
+
+
+def test_embed_queries_fetches_only_missing_vectors(cache):
+    inner = FakeEmbeddings()
+    embeddings = CoalescingEmbeddings(inner, window_ms=0, max_batch=8)
+    cached = embeddings.embed_query("known")
+    vectors = embed_queries(embeddings, ["known", "new one", "other"])
+    assert vectors[0] == cached
+    assert vectors[1:] == [vector("new one"), vector("other")]
+    assert inner.requests == [["known"], ["new one", "other"]]
@@ -0,0 +1,121 @@
+"""
+Unit tests for the embedded vector store (app/rag/local_store.py); no Postgres needed.
+"""
+
+from typing import List
+
+import numpy as np
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from app.core.config import settings
+from app.rag.local_store import METADATA_FILE, VECTORS_FILE, LocalVectorStore
+
+DIMENSIONS = 4
+
+AXES = {
+    "a": [1.0, 0.0, 0.0, 0.0],
+    "b": [0.0, 1.0, 0.0, 0.0],
+    "c": [0.0, 0.0, 1.0, 0.0],
+    "d": [0.0, 0.0, 0.0, 1.0],
+}
+
+
+class AxisEmbeddings(Embeddings):
+    """Texts starting with a-d map onto that axis."""
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [AXES[text[0]] for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return AXES[text[0]]
+
+
+@pytest.fixture
+def open_store(tmp_path):
+    def open_store():
+        return LocalVectorStore(AxisEmbeddings(), "test", path=tmp_path, dimensions=DIMENSIONS)
+    return open_store
+
+
+@pytest.fixture
+def store(open_store):
+    store = open_store()
+    store.add_texts(
+        ["a1", "b1", "c1", "d1"],
+        metadatas=[{"source_file": f"{name}.md"} for name in "abcd"],
+        ids=["a1", "b1", "c1", "d1"],
+    )
+    return store
+
+
+def test_embeddings_property(store):
+    assert isinstance(store.embeddings, AxisEmbeddings)
+
+
+def test_search_returns_closest_rows_with_cosine_distance(store):
+    results = store.similarity_search_with_score("b?", k=2)
+    assert results[0][0].id == "b1"
+    assert results[0][0].page_content == "b1"
+    assert results[0][1] == pytest.approx(0.0)
+    assert results[1][1] == pytest.approx(1.0)
+    assert [len(r) for r in store.search_by_vectors([AXES["a"], AXES["d"]], k=10)] == [4, 4]
+
+
+def test_metadata_filters(store):
+    docs = store.similarity_search("a?", k=4, filter={"source_file": {"$in": ["c.md", "d.md"]}})
+    assert sorted(d.id for d in docs) == ["c1", "d1"]
+    assert [d.id for d in store.similarity_search("a?", k=4, filter={"source_file": "b.md"})] == ["b1"]
+    assert store.similarity_search("a?", filter={"source_file": {"$eq": "missing.md"}}) == []
+
+
+def test_deletes_and_reopen(store, open_store):
+    assert store.delete_ids(["a1"]) == 1
+    assert store.delete_where("source_file", "b.md") == 1
+    assert store.delete_ids(["a1"]) == 0
+    assert store.ids_where("source_file", "c.md") == ["c1"]
+
+    reopened = open_store()
+    assert sorted(d.id for d in reopened.similarity_search("a?", k=10)) == ["c1", "d1"]
+
+
+def test_rows_added_by_another_instance_are_visible(store, open_store):
+    other = open_store()
+    other.add_texts(["a2"], ids=["a2"])
+    assert sorted(d.id for d in store.similarity_search("a?", k=2)) == ["a1", "a2"]
+
+
+def test_torn_tail_is_trimmed_before_appending(store, open_store):
+    # A crashed writer left one orphan vector row and half a sidecar line
+    with open(store.directory / VECTORS_FILE, "ab") as f:
+        f.write(np.asarray(AXES["d"], dtype=np.float32).tobytes())
+        f.write(b"\0\0")
+    with open(store.directory / METADATA_FILE, "a", encoding="utf-8") as f:
+        f.write('{"id": "orphan", "te')
+
+    recovered = open_store()
+    assert len(recovered.similarity_search("a?", k=10)) == 4
+    recovered.add_texts(["b2"], ids=["b2"])
+    best, distance = recovered.similarity_search_with_score("b?", k=2)[1]
+    assert best.id in {"b1", "b2"}
+    assert distance == pytest.approx(0.0)
+    assert (store.directory / VECTORS_FILE).stat().st_size == 5 * DIMENSIONS * 4
+    assert sorted(d.id for d in open_store().similarity_search("b?", k=2)) == ["b1", "b2"]
+
+
+def test_ivf_search_and_persisted_lists(store, open_store, monkeypatch):
+    monkeypatch.setattr(settings, "LOCAL_INDEX_IVF_LISTS", 2)
+    monkeypatch.setattr(settings, "LOCAL_INDEX_IVF_PROBES", 2)
+    store.add_texts(["a2", "b2", "c2", "d2"], ids=["a2", "b2", "c2", "d2"])
+    store.build_ivf()
+    assert store._centroids.shape == (2, DIMENSIONS)
+    assert len(store._assignments) == 8
+
+    # With every list probed, IVF returns the same rows as the flat scan
+    assert sorted(d.id for d in store.similarity_search("c?", k=2)) == ["c1", "c2"]
+
+    reopened = open_store()
+    np.testing.assert_array_equal(reopened._assignments, store._assignments)
+    reopened.add_texts(["a3"], ids=["a3"])
+    assert len(reopened._assignments) == 9
+    assert sorted(d.id for d in open_store().similarity_search("a?", k=3)) == ["a1", "a2", "a3"]
@@ -0,0 +1,54 @@
+"""
+Unit tests for the batched ingestion manifest (app/rag/manifest.py).
+"""
+
+from app.rag import manifest as manifest_module
+from app.rag.manifest import IngestionManifest
+
+
+def write_files(tmp_path, *names):
+    for name in names:
+        (tmp_path / name).write_text(name, encoding="utf-8")
+    return [tmp_path / name for name in names]
+
+
+def sources(path):
+    return {e["source_file"] for e in IngestionManifest(path).entries().values()}
+
+
+def test_changes_are_buffered_until_flush(tmp_path):
+    path = tmp_path / "test.manifest.json"
+    manifest = IngestionManifest(path)
+    (doc,) = write_files(tmp_path, "a.md")
+    manifest.record(doc, "a.md", chunks=3)
+    assert manifest.is_current(doc)
+    assert not path.exists()
+    assert manifest.flush()
+    assert not manifest.flush()
+    assert sources(path) == {"a.md"}
+
+
+def test_flush_is_due_after_flush_every_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(manifest_module, "FLUSH_EVERY", 2)
+    path = tmp_path / "test.manifest.json"
+    manifest = IngestionManifest(path)
+    first, second = write_files(tmp_path, "a.md", "b.md")
+    manifest.record(first, "a.md", chunks=1)
+    assert not path.exists()
+    manifest.record(second, "b.md", chunks=1)
+    assert sources(path) == {"a.md", "b.md"}
+
+
+def test_flush_merges_other_writers(tmp_path):
+    path = tmp_path / "test.manifest.json"
+    shared, one_file, two_file = write_files(tmp_path, "shared.md", "one.md", "two.md")
+    seed = IngestionManifest(path)
+    seed.record(shared, "shared.md", chunks=1)
+    seed.flush()
+
+    one, two = IngestionManifest(path), IngestionManifest(path)
+    one.record(one_file, "one.md", chunks=1)
+    two.record(two_file, "two.md", chunks=1)
+    two.remove(shared)
+    assert one.flush() and two.flush()
+    assert sources(path) == {"one.md", "two.md"}
@@ -0,0 +1,70 @@
+"""
+Unit tests for multi-query preparation and reciprocal rank fusion (app/rag/multi_query.py).
+"""
+
+from langchain_core.documents import Document
+
+from app.rag.multi_query import RRF_K, fuse_results, keyword_variant, prepare_queries
+
+
+def doc(doc_id: str) -> Document:
+    return Document(id=doc_id, page_content=f"chunk {doc_id}", metadata={"source_file": "a.md"})
+
+
+def test_documents_found_by_several_queries_rank_first():
+    fused = fuse_results(
+        [
+            [(doc("a"), 0.10), (doc("b"), 0.20)],
+            [(doc("c"), 0.05), (doc("b"), 0.30)],
+        ],
+        k=3,
+    )
+    assert [d.id for d, _ in fused] == ["b", "a", "c"]
+
+
+def test_fused_scores_follow_rrf():
+    # Rank 1 in one list beats rank 2 in one list; two rank-3 hits beat a single rank-1 hit
+    assert 1 / (RRF_K + 3) * 2 > 1 / (RRF_K + 1)
+    fused = fuse_results(
+        [
+            [(doc("x"), 0.1), (doc("y"), 0.2), (doc("z"), 0.3)],
+            [(doc("w"), 0.1), (doc("v"), 0.2), (doc("z"), 0.3)],
+        ],
+        k=1,
+    )
+    assert [d.id for d, _ in fused] == ["z"]
+
+
+def test_duplicates_keep_their_best_distance():
+    fused = fuse_results([[(doc("a"), 0.40)], [(doc("a"), 0.15)]], k=5)
+    assert len(fused) == 1
+    assert fused[0][1] == 0.15
+
+
+def test_documents_without_id_are_keyed_by_content():
+    same = [Document(page_content="text", metadata={"source_file": "a.md"}) for _ in range(2)]
+    other = Document(page_content="text", metadata={"source_file": "b.md"})
+    fused = fuse_results([[(same[0], 0.1), (other, 0.2)], [(same[1], 0.1)]], k=5)
+    assert len(fused) == 2
+
+
+def test_k_caps_the_result():
+    fused = fuse_results([[(doc(str(i)), i / 10) for i in range(5)]], k=2)
+    assert [d.id for d, _ in fused] == ["0", "1"]
+    assert fuse_results([], k=3) == []
+
+
+def test_prepare_queries_normalizes_dedupes_and_caps():
+    queries = ["  How do I  use workflows? ", "how do i use workflows?", "Privacy rules", "Option sets"]
+    assert prepare_queries(queries, max_queries=3, keyword_variants=False) == [
+        "How do I use workflows?",
+        "Privacy rules",
+    ]
+
+
+def test_keyword_variants_are_added_once():
+    assert keyword_variant("What is the API connector?") == "api connector"
+    assert prepare_queries(["the api connector", "api connector"], keyword_variants=True) == [
+        "the api connector",
+        "api connector",
+    ]
@@ -0,0 +1,17 @@
+"""
+Unit tests for ANN index naming (app/rag/quantization.py).
+"""
+
+from app.rag.quantization import QUANTIZATION_MODES, index_name
+
+
+def test_short_names_are_kept():
+    assert index_name("halfvec", "bubble_docs") == "ix_hnsw_half_bubble_docs"
+
+
+def test_long_tenant_names_stay_distinct_within_63_bytes():
+    base = "bubble_docs__" + "t" * 39  # 40-character tenant ids
+    names = {index_name(mode, base + suffix) for mode in QUANTIZATION_MODES for suffix in ("a", "b")}
+    assert len(names) == 2 * len(QUANTIZATION_MODES)
+    assert all(len(name) <= 63 for name in names)
+    assert index_name("binary", base + "a") == index_name("binary", base + "a")
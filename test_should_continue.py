@@ -0,0 +1,73 @@
+"""
+Unit tests for the agent's routing decisions (app/agent/nodes.py).
+"""
+
+import time
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from app.agent import nodes
+from app.core.config import settings
+
+
+def tool_call_message(i: int = 0) -> AIMessage:
+    return AIMessage(
+        content="",
+        tool_calls=[{"name": "search_knowledge_base", "args": {"query": f"q{i}"}, "id": f"call_{i}"}],
+    )
+
+
+def turn(tool_rounds: int) -> list:
+    """A user question followed by `tool_rounds` tool-calling model turns."""
+    messages = [HumanMessage(content="How do I schedule a workflow?")]
+    for i in range(tool_rounds):
+        if i:
+            messages.append(ToolMessage(content="result", tool_call_id=f"call_{i - 1}"))
+        messages.append(tool_call_message(i))
+    return messages
+
+
+def deadline_in(seconds: float) -> dict:
+    return {"configurable": {"deadline": time.monotonic() + seconds}}
+
+
+@pytest.fixture(autouse=True)
+def limits(monkeypatch):
+    monkeypatch.setattr(settings, "AGENT_MAX_TOOL_ITERATIONS", 2)
+    monkeypatch.setattr(settings, "AGENT_ANSWER_RESERVE_SECONDS", 5.0)
+
+
+def test_tool_calls_go_to_tools():
+    assert nodes.should_continue({"messages": turn(1)}, {}) == "tools"
+    assert nodes.should_continue({"messages": turn(2)}, deadline_in(60)) == "tools"
+
+
+def test_iteration_limit_finalizes():
+    assert nodes.should_continue({"messages": turn(3)}, {}) == "finalize"
+
+
+def test_iterations_count_from_the_last_user_message():
+    messages = turn(2) + [AIMessage(content="Done."), HumanMessage(content="And recurring ones?")] + turn(1)[1:]
+    assert nodes.should_continue({"messages": messages}, {}) == "tools"
+
+
+def test_deadline_inside_answer_reserve_finalizes():
+    assert nodes.should_continue({"messages": turn(1)}, deadline_in(2)) == "finalize"
+    assert nodes.should_continue({"messages": turn(1)}, deadline_in(-1)) == "finalize"
+
+
+def test_final_answer_ends_the_run():
+    messages = turn(1) + [ToolMessage(content="result", tool_call_id="call_0"), AIMessage(content="Use the editor.")]
+    assert nodes.should_continue({"messages": messages}, deadline_in(1)) == "__end__"
+
+
+def test_dropped_router_draft_goes_to_answer_tier():
+    assert nodes.should_continue({"messages": turn(0)}, {}) == "answer"
+
+
+def test_after_tools_respects_the_deadline():
+    state = {"messages": turn(1)}
+    assert nodes.after_tools(state, {}) == "agent"
+    assert nodes.after_tools(state, deadline_in(60)) == "agent"
+    assert nodes.after_tools(state, deadline_in(1)) == "finalize"
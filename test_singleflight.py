@@ -0,0 +1,158 @@
+"""
+Unit tests for single-flight request coalescing (app/core/singleflight.py).
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.core.singleflight import AsyncSingleFlight, SingleFlight, singleflight_stats
+
+
+def wait_for_calls(group, calls: int, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while group.calls < calls:
+        assert time.monotonic() < deadline, "callers did not join in time"
+        time.sleep(0.005)
+
+
+def test_concurrent_calls_share_one_execution():
+    group = SingleFlight("test_sync_share")
+    release = threading.Event()
+    runs = []
+
+    def work():
+        runs.append(1)
+        release.wait(5)
+        return "answer"
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(group.do, "q", work) for _ in range(4)]
+        wait_for_calls(group, 4)
+        release.set()
+        assert [f.result() for f in futures] == ["answer"] * 4
+
+    assert len(runs) == 1
+    assert singleflight_stats()["test_sync_share"] == {"calls": 4, "executions": 1, "coalesced": 3, "in_flight": 0}
+
+
+def test_followers_get_the_leaders_exception():
+    group = SingleFlight("test_sync_error")
+    release = threading.Event()
+
+    def work():
+        release.wait(5)
+        raise RuntimeError("backend down")
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        futures = [pool.submit(group.do, "q", work) for _ in range(3)]
+        wait_for_calls(group, 3)
+        release.set()
+        for future in futures:
+            with pytest.raises(RuntimeError, match="backend down"):
+                future.result()
+
+    # The failed call is not cached: the next caller runs the work again
+    assert group.do("q", lambda: "recovered") == "recovered"
+
+
+def test_different_keys_do_not_coalesce():
+    group = SingleFlight("test_sync_keys")
+    assert [group.do(k, lambda k=k: k * 2) for k in (1, 2)] == [2, 4]
+    assert group.executions == 2
+
+
+def test_cancelled_waiter_leaves_shared_work_running():
+    async def scenario():
+        group = AsyncSingleFlight("test_async_one_cancelled")
+        release = asyncio.Event()
+        runs = []
+
+        async def work():
+            runs.append(1)
+            await release.wait()
+            return "answer"
+
+        first = asyncio.ensure_future(group.do("q", work))
+        second = asyncio.ensure_future(group.do("q", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        assert await second == "answer"
+        assert first.cancelled()
+        assert len(runs) == 1
+
+    asyncio.run(scenario())
+
+
+def test_work_is_cancelled_when_every_waiter_is_gone():
+    async def scenario():
+        group = AsyncSingleFlight("test_async_all_cancelled")
+        started, cancelled = asyncio.Event(), asyncio.Event()
+
+        async def work():
+            started.set()
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        waiters = [asyncio.ensure_future(group.do("q", work)) for _ in range(2)]
+        await started.wait()
+        for waiter in waiters:
+            waiter.cancel()
+            await asyncio.sleep(0)
+        await asyncio.wait_for(cancelled.wait(), 5)
+        await asyncio.sleep(0)
+        assert group.stats()["in_flight"] == 0
+        # A new caller starts fresh work instead of joining the cancelled one
+        assert await group.do("q", _value) == "fresh"
+
+    asyncio.run(scenario())
+
+
+def test_caller_arriving_while_work_is_cancelled_starts_fresh_work():
+    async def scenario():
+        group = AsyncSingleFlight("test_async_rejoin")
+        started = asyncio.Event()
+
+        async def slow():
+            started.set()
+            await asyncio.sleep(60)
+
+        waiter = asyncio.ensure_future(group.do("q", slow))
+        await started.wait()
+        waiter.cancel()
+        # The cancelled task's done callback has not run yet
+        follower = asyncio.ensure_future(group.do("q", _value))
+        await asyncio.sleep(0)
+        assert await follower == "fresh"
+        assert waiter.cancelled()
+        await asyncio.sleep(0)
+        assert group.stats()["in_flight"] == 0
+
+    asyncio.run(scenario())
+
+
+async def _value():
+    return "fresh"
+
+
+def test_async_exception_reaches_every_waiter():
+    async def scenario():
+        group = AsyncSingleFlight("test_async_error")
+
+        async def work():
+            await asyncio.sleep(0)
+            raise RuntimeError("backend down")
+
+        results = await asyncio.gather(*(group.do("q", work) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert group.executions == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,77 @@
+"""
+Unit tests for watch-mode event handling (app/rag/watcher.py).
+"""
+
+from pathlib import Path
+
+from watchdog.events import DirModifiedEvent, DirMovedEvent, FileModifiedEvent
+
+from app.rag.watcher import DebouncedEventHandler, IngestionWatcher
+
+
+class FakeManifest:
+    def __init__(self):
+        self.recorded = {}
+
+    def entries(self):
+        return dict(self.recorded)
+
+    def get(self, path):
+        return self.recorded.get(str(path.resolve()))
+
+    def is_current(self, path):
+        return self.get(path) is not None
+
+
+class FakeProcessor:
+    def __init__(self):
+        self.manifest = FakeManifest()
+        self.processed, self.removed = [], []
+
+    def is_supported(self, path):
+        return path.suffix == ".md"
+
+    def discover_files(self, directory):
+        return sorted(p for p in directory.rglob("*.md") if not p.name.startswith("."))
+
+    def process_file(self, path):
+        self.processed.append(path.name)
+        self.manifest.recorded[str(path.resolve())] = {"source_file": path.name}
+
+    def remove_file(self, path):
+        self.removed.append(path.name)
+        del self.manifest.recorded[str(path.resolve())]
+
+
+def make_tree(root: Path, *names: str) -> None:
+    for name in names:
+        (root / name).parent.mkdir(parents=True, exist_ok=True)
+        (root / name).write_text(name, encoding="utf-8")
+
+
+def test_directory_modified_events_are_ignored():
+    handler = DebouncedEventHandler(debounce=0)
+    handler.on_any_event(DirModifiedEvent("/data/docs"))
+    handler.on_any_event(FileModifiedEvent("/data/docs/a.md"))
+    assert handler.pop_ready() == [Path("/data/docs/a.md")]
+
+
+def test_directory_moves_touch_both_paths():
+    handler = DebouncedEventHandler(debounce=0)
+    handler.on_any_event(DirMovedEvent("/data/old", "/data/new"))
+    assert sorted(handler.pop_ready()) == [Path("/data/new"), Path("/data/old")]
+
+
+def test_moved_directory_is_ingested_and_removed_file_by_file(tmp_path):
+    processor = FakeProcessor()
+    watcher = IngestionWatcher(processor, tmp_path, debounce=0.1)
+    make_tree(tmp_path, "old/a.md", "old/sub/b.md", "old/skip.bin")
+    watcher.handle(tmp_path / "old")
+    assert processor.processed == ["a.md", "b.md"]
+
+    (tmp_path / "old").rename(tmp_path / "new")
+    watcher.handle(tmp_path / "old")
+    watcher.handle(tmp_path / "new")
+    assert sorted(processor.removed) == ["a.md", "b.md"]
+    assert processor.processed[2:] == ["a.md", "b.md"]
+    assert all("new" in key for key in processor.manifest.recorded)
@@ -1,4 +1,4 @@
-import requests
+from frontend.api_client import APIClient
 import time
 import uuid
 import sys
@@ -23,26 +23,18 @@ def verify_persistence():
         thread_id = str(uuid.uuid4())
         print(f"Using Thread ID: {thread_id}")
         
-        url = f"http://127.0.0.1:{PORT}/chat"
-        headers = {"Content-Type": "application/json"}
+        # Both turns go over the same keep-alive connection
+        client = APIClient(f"http://127.0.0.1:{PORT}")
         
         # Step 1: Give context
         print("\nStep 1: Sending 'Hi, I am verifying persistence.'")
-        payload1 = {
-            "message": "Hi, I am verifying persistence. My secret code is 12345.",
-            "thread_id": thread_id
-        }
-        resp1 = requests.post(url, json=payload1, headers=headers)
-        print(f"Response 1: {resp1.json()['response']}")
+        resp1 = client.send_message("Hi, I am verifying persistence. My secret code is 12345.", thread_id=thread_id)
+        print(f"Response 1: {resp1['response']}")
         
         # Step 2: Ask for context
         print("\nStep 2: Asking 'What is my secret code?'")
-        payload2 = {
-            "message": "What is my secret code?",
-            "thread_id": thread_id
-        }
-        resp2 = requests.post(url, json=payload2, headers=headers)
-        content = resp2.json()['response']
+        resp2 = client.send_message("What is my secret code?", thread_id=thread_id)
+        content = resp2['response']
         print(f"Response 2: {content}")
         
         if "12345" in content: